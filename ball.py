@@ -5,6 +5,8 @@ import math
 
 
 class BallBase:
+    __slots__ = ("x_origin", "y_origin", "x", "y", "width", "height")
+
     def __init__(self, x, y, size):
         self.x_origin = x
         self.y_origin = y
@@ -49,8 +51,10 @@ class BallBase:
     #     self.y = (self.y + self.y_vel)        
 
     def render(self):
+        self.render_sprite()
+
+    def render_sprite(self):
         pyxel.rect(self.x,self.y,self.width,self.height,7)
-        pass
 
     def register_to_managers(self, managers):
         for manager in managers:
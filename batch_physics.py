@@ -0,0 +1,139 @@
+"""
+Benchmark-only prototype of a vectorized server ball engine (see
+benchmarks/bench_batch_physics). It is not wired into pong_server.tick_matches:
+it implements the one-pixel-per-tick rules only, and a server running faster
+balls (BALL_SPEED) needs `Ball.sweep`, which it does not vectorize.
+"""
+import numpy as np
+from pong_global import FIELD_WIDTH, FIELD_HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT
+
+class BatchBallEngine:
+    """
+    Struct-of-arrays ball engine for the server.
+    Holds the ball and paddle state of every match in NumPy arrays and steps,
+    collides, bounces and scores all of them in one vectorized call per tick,
+    with the same integer results as stepping each pong_core.Ball one pixel per
+    tick (`Ball.step`, which `Ball.sweep` reduces to at that speed).
+    """
+    def __init__(self, capacity=1024, paddles_per_match=2, game_width=FIELD_WIDTH,
+                 game_height=FIELD_HEIGHT, paddle_width=PADDLE_WIDTH, paddle_height=PADDLE_HEIGHT):
+        self.game_width = game_width
+        self.game_height = game_height
+        self.paddle_width = paddle_width
+        self.paddle_height = paddle_height
+        self.paddles_per_match = paddles_per_match
+        self.count = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.dx = np.ones(capacity, dtype=np.int32)
+        self.dy = np.ones(capacity, dtype=np.int32)
+        self.size = np.zeros(capacity, dtype=np.int32)
+        # Paddle columns, one row per ball; `paddle_present` masks empty slots.
+        self.paddle_x = np.zeros((capacity, self.paddles_per_match), dtype=np.int32)
+        self.paddle_y = np.zeros((capacity, self.paddles_per_match), dtype=np.int32)
+        self.paddle_present = np.zeros((capacity, self.paddles_per_match), dtype=bool)
+        # Points per ball: column 0 is the left player, column 1 the right one.
+        self.scores = np.zeros((capacity, 2), dtype=np.int32)
+
+    def _grow(self):
+        old = (self.x, self.y, self.dx, self.dy, self.size,
+               self.paddle_x, self.paddle_y, self.paddle_present, self.scores)
+        self._allocate(self.capacity * 2)
+        new = (self.x, self.y, self.dx, self.dy, self.size,
+               self.paddle_x, self.paddle_y, self.paddle_present, self.scores)
+        for old_column, new_column in zip(old, new):
+            new_column[:len(old_column)] = old_column
+
+    def add_ball(self, x, y, size, dx=1, dy=1):
+        """
+        Appends a ball and returns its slot index.
+        """
+        if self.count == self.capacity:
+            self._grow()
+        slot = self.count
+        self.x[slot] = x
+        self.y[slot] = y
+        self.dx[slot] = dx
+        self.dy[slot] = dy
+        self.size[slot] = size
+        self.paddle_present[slot] = False
+        self.scores[slot] = 0
+        self.count += 1
+        return slot
+
+    def set_paddle(self, slot, client_id, x, y):
+        self.paddle_x[slot, client_id] = x
+        self.paddle_y[slot, client_id] = y
+        self.paddle_present[slot, client_id] = True
+
+    def load_matches(self, matches):
+        """
+        Copies the balls, scores and paddle tables of pong_server.Match objects into
+        the arrays. Slot i holds matches[i].
+
+        :raises ValueError: If a ball moves more than one pixel per tick.
+        """
+        self.count = 0
+        for match in matches:
+            ball = match.ball
+            if ball.speed != 1:
+                raise ValueError(f"Match {match.match_id}: the batch engine steps balls one pixel per tick, "
+                                 f"not {ball.speed}")
+            slot = self.add_ball(ball.x, ball.y, ball.size, ball.dx, ball.dy)
+            self.scores[slot] = match.scores
+            for client_id, (paddle_x, paddle_y) in match.paddles.items():
+                self.set_paddle(slot, client_id, paddle_x, paddle_y)
+
+    def store_matches(self, matches):
+        """
+        Writes ball state and scores back to the Match objects loaded with `load_matches`.
+        """
+        xs, ys = self.x.tolist(), self.y.tolist()
+        dxs, dys = self.dx.tolist(), self.dy.tolist()
+        scores = self.scores.tolist()
+        for slot, match in enumerate(matches):
+            ball = match.ball
+            ball.x, ball.y, ball.dx, ball.dy = xs[slot], ys[slot], dxs[slot], dys[slot]
+            match.scores = scores[slot]
+
+    def step(self):
+        """
+        Advances every ball by one tick: update, paddle collision, wall bounce, goal.
+
+        :return: Tuple of boolean arrays (left_goal, right_goal) for this tick.
+        """
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        dx, dy = self.dx[:n], self.dy[:n]
+        size = self.size[:n, None]
+
+        x += dx
+        y += dy
+
+        paddle_x = self.paddle_x[:n]
+        paddle_y = self.paddle_y[:n]
+        x_column = x[:, None]
+        y_column = y[:, None]
+        hit = (self.paddle_present[:n]
+               & (paddle_x - size <= x_column) & (x_column <= paddle_x + self.paddle_width)
+               & (paddle_y <= y_column) & (y_column <= paddle_y + self.paddle_height)).any(axis=1)
+        np.negative(dx, out=dx, where=hit)
+
+        bounce = (y <= 0) | (y >= self.game_height - 1)
+        np.negative(dy, out=dy, where=bounce)
+
+        # Ball past the left paddle: the right player scores, and vice versa.
+        left_goal = x < self.paddle_width
+        right_goal = (x > self.game_width - self.paddle_width) & ~left_goal
+        goal = left_goal | right_goal
+        x[goal] = self.game_width // 2
+        y[goal] = self.game_height // 2
+        dx[left_goal] = 1
+        dx[right_goal] = -1
+        self.scores[:n, 1] += left_goal
+        self.scores[:n, 0] += right_goal
+        return left_goal, right_goal
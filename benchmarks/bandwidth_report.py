@@ -0,0 +1,146 @@
+"""
+Downstream bandwidth report: legacy POSITION relays vs SNAPSHOT vs compact DELTA.
+
+Replays a recorded session (JSON lines, one match state per server tick) or
+simulates one, encodes it in each wire format for one client and prints bytes
+per client per second, as payload and with UDP/IPv4 headers.
+
+Usage:
+  python -m benchmarks.bandwidth_report [--ticks 3600] [--record session.jsonl]
+  python -m benchmarks.bandwidth_report --session session.jsonl [--loss 0.05] [--snapshot-rate 20]
+"""
+import argparse
+import json
+import random
+
+import pong_codec
+import pong_server
+
+UDP_IPV4_OVERHEAD = 28
+# Legacy clients sent their paddle every other frame at 30 fps.
+LEGACY_POSITION_RATE = 15
+
+def simulate_session(ticks, tick_rate, seed):
+    """
+    Runs one match with two bot paddles that step 10 pixels now and then,
+    and returns its per-tick states.
+    """
+    rng = random.Random(seed)
+    match = pong_server.Match(0)
+    match.paddles[0] = (10, 40)
+    match.paddles[1] = (140, 40)
+    moves_every = max(1, tick_rate // 4)
+    states = []
+    for tick in range(ticks):
+        if tick % moves_every == 0:
+            for client_id, (x_pos, y_pos) in list(match.paddles.items()):
+                match.paddles[client_id] = (x_pos, min(max(y_pos + rng.choice((-10, 0, 10)), 0), 80))
+        pong_server.step_simulation(match)
+        states.append(pong_server.match_state(match))
+    return states
+
+def save_session(path, states):
+    with open(path, "w") as session_file:
+        for state in states:
+            session_file.write(json.dumps(state) + "\n")
+
+def load_session(path):
+    states = []
+    with open(path) as session_file:
+        for line in session_file:
+            state = json.loads(line)
+            states.append(tuple(tuple(slot) if slot is not None else None for slot in state))
+    return states
+
+def legacy_bytes(states, tick_rate):
+    """
+    One 17-byte ball POSITION per tick plus the opponent's relayed POSITION packets.
+    """
+    ticks = len(states)
+    relayed = ticks * LEGACY_POSITION_RATE // tick_rate
+    datagrams = ticks + relayed
+    return datagrams * pong_codec.POSITION_PACKET_LENGTH, datagrams
+
+def snapshot_bytes(states):
+    return len(states) * pong_codec.snapshot_length(3), len(states)
+
+def delta_bytes(states, keyframe_interval, history_length, ack_delay, loss, seed):
+    """
+    Encodes DELTA packets the way pong_server.broadcast_delta does, for one client
+    whose acks reach the server `ack_delay` packets late and whose packets are lost
+    with probability `loss`. Every decoded state is checked against the original.
+    """
+    rng = random.Random(seed)
+    server_history = {}
+    client_history = {}
+    pending_acks = []
+    acked = None
+    total = 0
+    for tick, state in enumerate(states):
+        sequence = tick % 256
+        while pending_acks and pending_acks[0][0] <= tick:
+            acked = pending_acks.pop(0)[1]
+        if acked == sequence:
+            acked = None
+        server_history[sequence] = state
+        server_history.pop((sequence - history_length) % 256, None)
+        base = None if sequence % keyframe_interval == 0 else acked
+        if base not in server_history:
+            base = None
+        packet = pong_codec.encode_delta(sequence, state, base,
+                                         server_history[base] if base is not None else None)
+        total += len(packet)
+        if rng.random() < loss:
+            continue
+        decoded = pong_codec.decode_delta(packet, client_history)
+        if decoded is None:
+            continue
+        if decoded[1] != tuple(tuple(slot) if slot is not None else None for slot in state):
+            raise SystemExit(f"DELTA decode mismatch at tick {tick}")
+        client_history[sequence] = decoded[1]
+        client_history.pop((sequence - history_length) % 256, None)
+        pending_acks.append((tick + ack_delay, sequence))
+    return total, len(states)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--session", help="recorded session to replay (JSON lines)")
+    parser.add_argument("--record", help="write the simulated session to this file")
+    parser.add_argument("--ticks", type=int, default=3600)
+    parser.add_argument("--tick-rate", type=int, default=pong_server.TICK_RATE)
+    parser.add_argument("--snapshot-rate", type=int, default=None,
+                        help="DELTA packets per second (defaults to the tick rate)")
+    parser.add_argument("--ack-delay", type=int, default=6, help="round trip in DELTA packets")
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    pong_server.DEBUG_MODE = False
+    if args.session:
+        states = load_session(args.session)
+    else:
+        states = simulate_session(args.ticks, args.tick_rate, args.seed)
+        if args.record:
+            save_session(args.record, states)
+
+    seconds = len(states) / args.tick_rate
+    snapshot_rate = args.snapshot_rate or args.tick_rate
+    delta_states = states[::max(1, args.tick_rate // snapshot_rate)]
+    results = [
+        ("legacy POSITION", legacy_bytes(states, args.tick_rate)),
+        ("SNAPSHOT", snapshot_bytes(states)),
+        (f"DELTA @ {snapshot_rate} Hz",
+         delta_bytes(delta_states, pong_server.KEYFRAME_INTERVAL, pong_server.STATE_HISTORY_LENGTH,
+                     args.ack_delay, args.loss, args.seed)),
+    ]
+    legacy_rate = results[0][1][0] / seconds
+    print(f"{len(states)} ticks at {args.tick_rate} Hz ({seconds:.1f} s), "
+          f"loss {args.loss:.0%}, ack delay {args.ack_delay} packets")
+    for name, (payload, datagrams) in results:
+        payload_rate = payload / seconds
+        wire_rate = (payload + datagrams * UDP_IPV4_OVERHEAD) / seconds
+        print(f"{name:>17}: {payload_rate:8,.0f} B/s payload ({legacy_rate / payload_rate:5.1f}x smaller), "
+              f"{wire_rate:8,.0f} B/s on the wire")
+
+if __name__ == "__main__":
+    main()
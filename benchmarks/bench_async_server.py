@@ -0,0 +1,83 @@
+"""
+Throughput benchmark for the asyncio server over the in-memory loopback transport.
+
+Registers N bot clients, then has each of them send POSITION packets every
+loop iteration for a fixed duration while the server ticks, and reports how
+many datagrams per second the server handled and emitted.
+
+Usage: python -m benchmarks.bench_async_server [--clients 200] [--seconds 2]
+"""
+import argparse
+import asyncio
+import time
+
+import pong_codec
+import pong_server
+from pong_global import ObjectType, PacketType
+from pong_server_async import AsyncPongServer, LoopbackNetwork
+
+SERVER_ADDRESS = ("127.0.0.1", pong_server.PORT)
+
+class BotProtocol(asyncio.DatagramProtocol):
+    """
+    Minimal headless client: registers, then sends POSITION packets on demand.
+    """
+    def __init__(self):
+        self.transport = None
+        self.client_id = -1
+        self.packet_counter = 0
+        self.received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.received += 1
+        if data[0] == PacketType.REQUEST_ID:
+            self.client_id = data[1]
+
+    def register(self):
+        self.transport.sendto(pong_codec.encode_request_id(10, 40), SERVER_ADDRESS)
+
+    def send_position(self, y_pos):
+        packet = pong_codec.encode_position(ObjectType.PLAYER, self.client_id,
+                                            self.packet_counter, 10, y_pos)
+        self.transport.sendto(packet, SERVER_ADDRESS)
+        self.packet_counter = (self.packet_counter + 1) % 256
+
+async def run(num_clients, seconds, tick_rate):
+    network = LoopbackNetwork()
+    server = AsyncPongServer(tick_rate)
+    await server.start(network.bind(SERVER_ADDRESS, server.protocol))
+    bots = [BotProtocol() for _ in range(num_clients)]
+    for i, bot in enumerate(bots):
+        network.bind(("127.0.0.1", 20000 + i), bot)
+        bot.register()
+    await asyncio.sleep(0.05)
+
+    start_delivered = network.delivered
+    start = time.perf_counter()
+    sent = 0
+    while time.perf_counter() - start < seconds:
+        for bot in bots:
+            bot.send_position(sent % 80)
+        sent += num_clients
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    await server.stop()
+
+    delivered = network.delivered - start_delivered
+    print(f"{num_clients} clients, {len(server.match_maker.matches)} matches at {tick_rate} Hz: "
+          f"{sent / elapsed:,.0f} packets in/s, {(delivered - sent) / elapsed:,.0f} packets out/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--tick-rate", type=int, default=pong_server.TICK_RATE)
+    args = parser.parse_args()
+    pong_server.DEBUG_MODE = False
+    asyncio.run(run(args.clients, args.seconds, args.tick_rate))
+
+if __name__ == "__main__":
+    main()
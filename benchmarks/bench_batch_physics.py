@@ -0,0 +1,69 @@
+"""
+Scalar pong_server.Ball versus the vectorized BatchBallEngine.
+
+Builds N random matches, steps them with both implementations, checks the
+resulting ball states and scores are identical, and reports steps per second.
+
+Usage: python -m benchmarks.bench_batch_physics [--balls 1000 10000 100000] [--ticks 60]
+"""
+import argparse
+import random
+import time
+
+import pong_server
+from batch_physics import BatchBallEngine
+
+def random_matches(num_matches, seed):
+    rng = random.Random(seed)
+    matches = []
+    for match_id in range(num_matches):
+        match = pong_server.Match(match_id)
+        match.ball.x = rng.randrange(10, 150)
+        match.ball.y = rng.randrange(1, 118)
+        match.ball.dx = rng.choice((-1, 1))
+        match.ball.dy = rng.choice((-1, 1))
+        match.paddles[0] = (10, rng.randrange(0, 80))
+        match.paddles[1] = (140, rng.randrange(0, 80))
+        matches.append(match)
+    return matches
+
+def ball_states(matches):
+    return [(m.ball.x, m.ball.y, m.ball.dx, m.ball.dy, m.scores) for m in matches]
+
+def run(num_balls, ticks, seed):
+    # The batch engine implements the one-pixel-per-tick rules (Match balls default to that speed).
+    scalar_matches = random_matches(num_balls, seed)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for match in scalar_matches:
+            pong_server.step_simulation(match)
+    scalar_time = time.perf_counter() - start
+
+    batch_matches = random_matches(num_balls, seed)
+    engine = BatchBallEngine(capacity=num_balls)
+    engine.load_matches(batch_matches)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        engine.step()
+    batch_time = time.perf_counter() - start
+    engine.store_matches(batch_matches)
+
+    identical = ball_states(scalar_matches) == ball_states(batch_matches)
+    steps = num_balls * ticks
+    print(f"{num_balls:>7} balls: scalar {steps / scalar_time:>12,.0f} steps/s, "
+          f"batch {steps / batch_time:>14,.0f} steps/s, x{scalar_time / batch_time:6.1f}, "
+          f"identical={identical}")
+    return identical
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--balls", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--ticks", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    results = [run(num_balls, args.ticks, args.seed) for num_balls in args.balls]
+    if not all(results):
+        raise SystemExit("Batch engine diverged from the scalar Ball logic")
+
+if __name__ == "__main__":
+    main()
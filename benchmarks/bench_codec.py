@@ -0,0 +1,89 @@
+"""
+Encode/decode micro-benchmark for pong_codec.
+
+Compares the previous hand-rolled approach (format strings parsed per call and
+the CRC checked by re-packing every field) with the precompiled codec for
+POSITION and SNAPSHOT packets, in operations per second.
+
+Usage: python -m benchmarks.bench_codec [--iterations 200000]
+"""
+import argparse
+import struct
+import time
+import zlib
+
+import pong_codec
+from pong_global import ObjectType, PacketType
+
+SNAPSHOT_ENTITIES = [(pong_codec.OBJECT_PLAYER, 0, 10, 40), (pong_codec.OBJECT_PLAYER, 1, 140, 60),
+                     (pong_codec.OBJECT_BALL, 0, 80, 60)]
+
+def legacy_encode_position():
+    packet = struct.pack(">BBBBBII", PacketType.POSITION, ObjectType.PLAYER, 1, 7, 17, 140, 60)
+    return packet + struct.pack(">I", zlib.crc32(packet))
+
+def legacy_decode_position(data):
+    (packet_type, object_type, client_id, packet_counter,
+     packet_length, x_pos, y_pos, crc) = struct.unpack(">BBBBBIII", data)
+    if packet_length == len(data):
+        data_packed = struct.pack(">BBBBBII", packet_type, object_type, client_id,
+                                  packet_counter, packet_length, x_pos, y_pos)
+        if crc == zlib.crc32(data_packed):
+            return object_type, client_id, packet_counter, x_pos, y_pos
+    return None
+
+def legacy_encode_snapshot():
+    packet = struct.pack(">BBBB", PacketType.SNAPSHOT, 0, pong_codec.snapshot_length(3), 3)
+    for entity in SNAPSHOT_ENTITIES:
+        packet += struct.pack(">BBII", *entity)
+    packet += struct.pack(">HH", 1, 2)
+    return packet + struct.pack(">I", zlib.crc32(packet))
+
+def codec_decode_snapshot(data):
+    counter, entity_count, scores = pong_codec.decode_snapshot(data)
+    for _ in pong_codec.iter_snapshot_entities(data, entity_count):
+        pass
+
+def legacy_decode_snapshot(data):
+    _, _, packet_length, entity_count = struct.unpack(">BBBB", data[:4])
+    crc = struct.unpack(">I", data[packet_length - 4:])[0]
+    if crc == zlib.crc32(data[:packet_length - 4]):
+        for offset in range(4, 4 + 10 * entity_count, 10):
+            struct.unpack(">BBII", data[offset:offset + 10])
+
+def measure(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return iterations / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    args = parser.parse_args()
+
+    position = pong_codec.encode_position(ObjectType.PLAYER, 1, 7, 140, 60)
+    assert position == legacy_encode_position()
+    buffer = memoryview(bytearray(pong_codec.POSITION_PACKET_LENGTH))
+    writer = pong_codec.SnapshotWriter()
+    snapshot = bytes(writer.encode(0, SNAPSHOT_ENTITIES, (1, 2)))
+    assert snapshot == legacy_encode_snapshot()
+
+    cases = [
+        ("position encode", legacy_encode_position,
+         lambda: pong_codec.pack_position_into(buffer, 0, pong_codec.OBJECT_PLAYER, 1, 7, 140, 60)),
+        ("position decode", lambda: legacy_decode_position(position),
+         lambda: pong_codec.decode_position(position)),
+        ("snapshot encode", legacy_encode_snapshot,
+         lambda: writer.encode(0, SNAPSHOT_ENTITIES, (1, 2))),
+        ("snapshot decode", lambda: legacy_decode_snapshot(snapshot),
+         lambda: codec_decode_snapshot(snapshot)),
+    ]
+    for name, legacy, codec in cases:
+        legacy_rate = measure(legacy, args.iterations)
+        codec_rate = measure(codec, args.iterations)
+        print(f"{name}: legacy {legacy_rate:>12,.0f} ops/s, codec {codec_rate:>12,.0f} ops/s, "
+              f"x{codec_rate / legacy_rate:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Cold-start benchmark: import time and peak memory of a fresh interpreter.
+
+Starts a new Python process per run that imports one module (the headless core,
+the server, or the client that still needs pyxel) and reports the median wall
+time and peak resident memory of the process, next to an empty interpreter.
+The server must start without loading pyxel; this is checked on every run.
+
+Usage: python -m benchmarks.bench_cold_start [--runs 10] [--modules pong_core pong_server]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = ["pong_core", "pong_server", "pong_server_async", "pyxel", "pong_client"]
+# Modules that must never pull in the graphics engine.
+HEADLESS_MODULES = {"pong_core", "managers", "pong_server", "pong_server_async", "pong_launcher"}
+
+def start_once(module, root):
+    """
+    Imports `module` in a fresh interpreter.
+
+    :return: Tuple of (seconds, peak RSS in KiB, whether pyxel got loaded).
+    """
+    if module is None:
+        code = "pass"
+    else:
+        code = f"import sys, {module}; sys.exit(2 if 'pyxel' in sys.modules else 0)"
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=root)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    exit_code = os.waitstatus_to_exitcode(status)
+    if exit_code not in (0, 2):
+        raise SystemExit(f"importing {module} failed with exit code {exit_code}")
+    return elapsed, usage.ru_maxrss, exit_code == 2
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for module in [None] + args.modules:
+        runs = [start_once(module, root) for _ in range(args.runs)]
+        elapsed = statistics.median(run[0] for run in runs)
+        peak_rss = max(run[1] for run in runs)
+        loads_pyxel = any(run[2] for run in runs)
+        name = module or "(empty interpreter)"
+        print(f"{name:>20}: {elapsed * 1000:7.1f} ms median, {peak_rss / 1024:6.1f} MiB peak RSS"
+              f"{', loads pyxel' if loads_pyxel else ''}")
+        if module in HEADLESS_MODULES and loads_pyxel:
+            raise SystemExit(f"{module} must not import pyxel")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Entity storage benchmark: dict-backed objects versus __slots__ objects versus EntityColumns.
+
+Measures the memory per entity (tracemalloc) of the client BallBase and
+PlayerBase and the server Ball, each against a dict-backed copy of the same
+class, and of an EntityColumns row. Then times a frame of moving and bouncing
+N balls: per-object `update()`/`check_bounce()` calls on dict-backed and slotted
+server balls versus one TickManager and one PhysicsManager pass over an
+EntityColumns store.
+
+Usage: python -m benchmarks.bench_entities [--entities 10000] [--frames 200]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from ball import BallBase
+from entities import EntityColumns
+from managers import PhysicsManager, TickManager
+from player import PlayerBase
+from pong_core import Ball, Field, NullInput
+
+def unslotted(cls):
+    """
+    Dict-backed copy of a class using __slots__ (the layout before slots were added).
+    """
+    namespace = {name: value for name, value in vars(cls).items()
+                 if name not in cls.__slots__ and name not in ("__slots__", "__dict__", "__weakref__")}
+    return type(f"Dict{cls.__name__}", (), namespace)
+
+def bytes_per_entity(factory, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    entities = factory(count)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del entities
+    return used / count
+
+def make_balls(cls, count, seed):
+    rng = random.Random(seed)
+    field = Field()
+    balls = []
+    for _ in range(count):
+        ball = cls(rng.randrange(10, 150), rng.randrange(1, 118), field.ball_size, field)
+        ball.dx = rng.choice((-1, 1))
+        ball.dy = rng.choice((-1, 1))
+        balls.append(ball)
+    return balls
+
+def make_columns(count, seed):
+    rng = random.Random(seed)
+    field = Field()
+    store = EntityColumns(capacity=count, field=field)
+    for _ in range(count):
+        store.add(rng.randrange(10, 150), rng.randrange(1, 118), field.ball_size, field.ball_size,
+                  rng.choice((-1, 1)), rng.choice((-1, 1)))
+    return store
+
+def time_object_frames(balls, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        for ball in balls:
+            ball.update()
+            ball.check_bounce()
+    return (time.perf_counter() - start) / frames
+
+def time_column_frames(store, frames):
+    tick_manager = TickManager()
+    physics_manager = PhysicsManager(store.field)
+    tick_manager.register_columns(store)
+    physics_manager.register_columns(store)
+    start = time.perf_counter()
+    for _ in range(frames):
+        tick_manager.manage()
+        physics_manager.manage()
+    return (time.perf_counter() - start) / frames
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entities", type=int, default=10000)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    count = args.entities
+    field = Field()
+    null_input = NullInput()
+
+    print("memory per entity:")
+    rows = [
+        ("client BallBase", lambda cls: (lambda n: [cls(80, 60, 4) for _ in range(n)]), BallBase),
+        ("client PlayerBase", lambda cls: (lambda n: [cls(10, 40, 0, 1, "Player", True, field, null_input)
+                                                      for _ in range(n)]), PlayerBase),
+        ("server Ball", lambda cls: (lambda n: make_balls(cls, n, args.seed)), Ball),
+    ]
+    for label, factory, cls in rows:
+        dict_bytes = bytes_per_entity(factory(unslotted(cls)), count)
+        slot_bytes = bytes_per_entity(factory(cls), count)
+        print(f"  {label:<18} dict {dict_bytes:6.0f} B   slots {slot_bytes:6.0f} B   "
+              f"({dict_bytes / slot_bytes:.1f}x smaller)")
+    column_bytes = bytes_per_entity(lambda n: make_columns(n, args.seed), count)
+    print(f"  {'EntityColumns row':<18} {column_bytes:6.0f} B")
+
+    print(f"move and bounce {count:,} balls, per frame:")
+    dict_time = time_object_frames(make_balls(unslotted(Ball), count, args.seed), args.frames)
+    slot_time = time_object_frames(make_balls(Ball, count, args.seed), args.frames)
+    column_time = time_column_frames(make_columns(count, args.seed), args.frames)
+    print(f"  dict objects  {dict_time * 1000:8.3f} ms")
+    print(f"  slot objects  {slot_time * 1000:8.3f} ms ({dict_time / slot_time:.2f}x)")
+    print(f"  EntityColumns {column_time * 1000:8.3f} ms ({dict_time / column_time:.0f}x)")
+
+if __name__ == "__main__":
+    main()
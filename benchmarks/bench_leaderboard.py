@@ -0,0 +1,76 @@
+"""
+Leaderboard benchmark: legacy text GameSave versus the indexed Leaderboard store.
+
+Writes a ladder of N players in the legacy "name:points" format, then times
+startup-to-top-10 (legacy: read and parse everything, then sort; store:
+migrate once, then read only the first lines of the sorted file), rank
+lookups and score updates.
+
+Usage: python -m benchmarks.bench_leaderboard [--players 300000] [--queries 10000]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from leaderboard import Leaderboard
+
+def write_legacy(path, num_players, seed):
+    rng = random.Random(seed)
+    with open(path, "w") as legacy_file:
+        for i in range(num_players):
+            legacy_file.write(f"player{i}:{rng.randrange(10000)}\n")
+
+def legacy_load(path):
+    players_data = {}
+    with open(path, "r") as save_handle:
+        for line in save_handle.readlines():
+            players_data[line.split(":")[0]] = int(line.split(":")[1])
+    return players_data
+
+def legacy_rank(players_data, name):
+    points = players_data[name]
+    return sum(1 for other in players_data.values() if other > points) + 1
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=300000)
+    parser.add_argument("--queries", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = [f"player{rng.randrange(args.players)}" for _ in range(args.queries)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "save_file.txt")
+        write_legacy(path, args.players, args.seed)
+
+        legacy, legacy_load_time = timed(legacy_load, path)
+        _, legacy_top_time = timed(lambda: sorted(legacy.items(), key=lambda item: -item[1])[:10])
+        legacy_queries = max(1, args.queries // 100)
+        _, legacy_rank_time = timed(lambda: [legacy_rank(legacy, name) for name in names[:legacy_queries]])
+
+        _, migrate_time = timed(lambda: Leaderboard(path).save())
+        store = Leaderboard(path)
+        top, store_top_time = timed(store.top, 10)
+        assert [points for _, points in top] == sorted(legacy.values(), reverse=True)[:10]
+        _, store_load_time = timed(store.load)
+        _, store_rank_time = timed(lambda: [store.rank(name) for name in names])
+        _, store_update_time = timed(lambda: [store.__setitem__(name, store[name] + 1) for name in names])
+
+    print(f"{args.players:,} players")
+    print(f"startup to top 10: legacy {(legacy_load_time + legacy_top_time) * 1000:9.1f} ms, "
+          f"store {store_top_time * 1000:9.3f} ms (one-time migration {migrate_time * 1000:.0f} ms, "
+          f"full index load {store_load_time * 1000:.0f} ms)")
+    print(f"rank lookup:       legacy {legacy_rank_time / legacy_queries * 1e6:9.1f} us, "
+          f"store {store_rank_time / args.queries * 1e6:9.3f} us")
+    print(f"score update:      store {store_update_time / args.queries * 1e6:9.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Adaptive snapshot rate: a LAN client and a congested client in one match, on simulated links.
+
+Runs the server logic (handle_packet and tick_matches) for S simulated seconds
+at 60 Hz against two minimal clients, each behind a link with its own one-way
+delay and loss. The clients register, send POSITION packets every other tick,
+ACK every state they decode (with the received bits) and answer PINGs. Reports,
+per client, the states sent and received per second and the round-trip time,
+loss and snapshot interval the server measured, with ADAPTIVE_RATES on and off.
+
+Usage: python -m benchmarks.bench_link_adapt [--seconds 60] [--delay 150] [--loss 0.2]
+"""
+import argparse
+import heapq
+import random
+
+import link_quality
+import pong_codec
+import pong_server
+from pong_global import ObjectType, PacketType
+
+TICK_RATE = 60
+SERVER_ADDRESS = ("10.0.0.1", 12345)
+
+class SimulatedNetwork:
+    """
+    Delivers datagrams after a per-address one-way delay (in ticks), dropping
+    a share of them in both directions.
+    """
+    def __init__(self, links, rng):
+        # Mapping of client addresses to (delay ticks, loss ratio).
+        self.links = links
+        self.rng = rng
+        self.queue = []
+        self.order = 0
+        self.sent = {address: 0 for address in links}
+
+    def send(self, tick, source, destination, data):
+        client = destination if destination != SERVER_ADDRESS else source
+        delay, loss = self.links[client]
+        if destination != SERVER_ADDRESS:
+            self.sent[client] += data[0] in (PacketType.DELTA, PacketType.SNAPSHOT)
+        if self.rng.random() < loss:
+            return
+        self.order += 1
+        heapq.heappush(self.queue, (tick + delay, self.order, source, destination, bytes(data)))
+
+    def due(self, tick):
+        while self.queue and self.queue[0][0] <= tick:
+            _, _, source, destination, data = heapq.heappop(self.queue)
+            yield source, destination, data
+
+class ServerSocket:
+    def __init__(self, network):
+        self.network = network
+        self.tick = 0
+
+    def sendto(self, data, address):
+        self.network.send(self.tick, SERVER_ADDRESS, address, data)
+
+class Client:
+    """
+    Headless client speaking the state, ACK and PING parts of the protocol.
+    """
+    def __init__(self, address, network):
+        self.address = address
+        self.network = network
+        self.client_id = -1
+        self.packet_counter = 0
+        self.history = {}
+        self.received_states = link_quality.ReceiveWindow()
+        self.pending_ack = None
+        self.states = 0
+
+    def send(self, tick, data):
+        self.network.send(tick, self.address, SERVER_ADDRESS, data)
+
+    def receive(self, tick, data):
+        packet_type = data[0]
+        if packet_type == PacketType.REQUEST_ID:
+            self.client_id = pong_codec.decode_id_response(data)
+        elif packet_type == PacketType.DELTA:
+            decoded = pong_codec.decode_delta(data, self.history)
+            if decoded is not None:
+                sequence, state = decoded
+                self.history[sequence] = state
+                self.received_states.note(sequence)
+                self.pending_ack = sequence
+                self.states += 1
+        elif packet_type == PacketType.PING:
+            self.send(tick, pong_codec.encode_pong(pong_codec.decode_ping(data)))
+
+    def step(self, tick):
+        if self.client_id == -1:
+            self.send(tick, pong_codec.encode_request_id(10, 40))
+            return
+        if self.pending_ack is not None:
+            self.send(tick, pong_codec.encode_ack(self.pending_ack,
+                                                  self.received_states.ack_bits(self.pending_ack)))
+            self.pending_ack = None
+        if tick % 2 == 0:
+            self.send(tick, pong_codec.encode_position(ObjectType.PLAYER, self.client_id,
+                                                       self.packet_counter, 10, 40))
+            self.packet_counter = (self.packet_counter + 1) % 256
+
+def run(seconds, links, adaptive, seed):
+    """
+    :return: List of per-client result dicts, in the order of `links`.
+    """
+    pong_server.ADAPTIVE_RATES = adaptive
+    network = SimulatedNetwork(links, random.Random(seed))
+    server_socket = ServerSocket(network)
+    match_maker = pong_server.MatchMaker(tick_rate=TICK_RATE)
+    clients = [Client(address, network) for address in links]
+    by_address = {client.address: client for client in clients}
+    interval = pong_server.snapshot_interval(TICK_RATE)
+    for tick in range(seconds * TICK_RATE):
+        server_socket.tick = tick
+        for source, destination, data in list(network.due(tick)):
+            if destination == SERVER_ADDRESS:
+                pong_server.handle_packet(server_socket, data, source, match_maker)
+            else:
+                by_address[destination].receive(tick, data)
+        for client in clients:
+            client.step(tick)
+        pong_server.tick_matches(server_socket, match_maker, 1, tick % interval == 0)
+    results = []
+    for client in clients:
+        match = match_maker.lookup(client.address)
+        link = match.links[match.addresses[client.address]]
+        results.append({
+            "sent": network.sent[client.address] / seconds,
+            "received": client.states / seconds,
+            **link.stats(),
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=60)
+    parser.add_argument("--delay", type=int, default=150, help="congested client one-way delay, ms")
+    parser.add_argument("--loss", type=float, default=0.2, help="congested client loss ratio, each way")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    pong_server.DEBUG_MODE = False
+
+    links = {("10.0.0.2", 5000): (0, 0.0),
+             ("10.0.0.3", 5000): (round(args.delay / 1000 * TICK_RATE), args.loss)}
+    labels = ["LAN", f"{args.delay} ms, {args.loss:.0%} loss"]
+    print(f"{args.seconds} s at {TICK_RATE} Hz, snapshots at {pong_server.SNAPSHOT_RATE} Hz")
+    print(f"{'client':<22} {'adaptive':>8} {'sent/s':>7} {'recv/s':>7} {'rtt ms':>7} "
+          f"{'loss':>6} {'up loss':>7} {'interval':>8}")
+    for adaptive in (False, True):
+        for label, result in zip(labels, run(args.seconds, links, adaptive, args.seed)):
+            rtt = result["rtt"] * 1000 if result["rtt"] is not None else float("nan")
+            print(f"{label:<22} {'on' if adaptive else 'off':>8} {result['sent']:>7.1f} "
+                  f"{result['received']:>7.1f} {rtt:>7.0f} {result['loss']:>6.1%} "
+                  f"{result['uplink_loss']:>7.1%} {result['snapshot_interval']:>8}")
+
+if __name__ == "__main__":
+    main()
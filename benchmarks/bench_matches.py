@@ -0,0 +1,60 @@
+"""
+Matches-per-core benchmark for the multi-match server.
+
+Fills a MatchMaker with N two-player matches, then times `tick_matches`
+(ball stepping, plus snapshot packing and one sendto per client at
+pong_server.SNAPSHOT_RATE) against a socket stub, and reports how many matches
+one core sustains at the target rate.
+
+Usage: python -m benchmarks.bench_matches [--tick-rate 60] [--matches 1000 5000]
+"""
+import argparse
+import time
+
+import pong_server
+
+class NullSocket:
+    """
+    Socket stand-in that only counts sendto calls.
+    """
+    def __init__(self):
+        self.sent = 0
+
+    def sendto(self, data, address):
+        self.sent += 1
+
+def build_matches(num_matches):
+    match_maker = pong_server.MatchMaker()
+    for i in range(num_matches * match_maker.players_per_match):
+        match, client_id = match_maker.join(("127.0.0.1", 20000 + i))
+        match.paddles[client_id] = (10 if client_id == 0 else 140, 40)
+        if match.is_full():
+            match.ball.send_position = True
+    return match_maker
+
+def run(num_matches, tick_rate, ticks):
+    match_maker = build_matches(num_matches)
+    server_socket = NullSocket()
+    interval = pong_server.snapshot_interval(tick_rate)
+    start = time.perf_counter()
+    for tick in range(ticks):
+        pong_server.tick_matches(server_socket, match_maker, 1, tick % interval == 0)
+    elapsed = time.perf_counter() - start
+    per_match_tick = elapsed / (ticks * num_matches)
+    matches_per_core = int(1.0 / (per_match_tick * tick_rate))
+    print(f"{num_matches:>7} matches: {elapsed / ticks * 1000:8.3f} ms/tick, "
+          f"{per_match_tick * 1e6:6.2f} us/match-tick, "
+          f"~{matches_per_core} matches/core at {tick_rate} Hz")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tick-rate", type=int, default=pong_server.TICK_RATE)
+    parser.add_argument("--ticks", type=int, default=120)
+    parser.add_argument("--matches", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+    pong_server.DEBUG_MODE = False
+    for num_matches in args.matches:
+        run(num_matches, args.tick_rate, args.ticks)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Loopback throughput benchmark for the multi-process launcher.
+
+For each worker count, starts a Launcher, drives it with one load-generator
+process per worker (each owning many client sockets that register and then
+re-send REQUEST_ID as fast as possible; the server answers each one after
+updating the paddle), and reports answered requests per second along with the
+speed-up relative to a single worker.
+
+Usage: python -m benchmarks.bench_multicore [--max-workers 4] [--mode reuseport]
+"""
+import argparse
+import multiprocessing
+import os
+import select
+import socket
+import time
+
+import pong_codec
+import pong_server
+from pong_global import PacketType
+from pong_launcher import Launcher
+
+def load_generator(port, num_sockets, seconds, results):
+    server_address = ("127.0.0.1", port)
+    sockets = []
+    for _ in range(num_sockets):
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        client_socket.bind(("127.0.0.1", 0))
+        client_socket.setblocking(False)
+        sockets.append(client_socket)
+
+    # Register every socket; registered sockets then keep re-requesting their ID.
+    request = pong_codec.encode_request_id(10, 40)
+    registered = set()
+    deadline = time.monotonic() + 2.0
+    while len(registered) < num_sockets and time.monotonic() < deadline:
+        for client_socket in sockets:
+            if client_socket not in registered:
+                client_socket.sendto(request, server_address)
+        read_sockets, _, _ = select.select(sockets, [], [], 0.05)
+        for client_socket in read_sockets:
+            try:
+                data = client_socket.recv(1024)
+            except BlockingIOError:
+                continue
+            if data[0] == PacketType.REQUEST_ID:
+                registered.add(client_socket)
+
+    sent = 0
+    received = 0
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        for client_socket in registered:
+            try:
+                client_socket.sendto(request, server_address)
+                sent += 1
+            except BlockingIOError:
+                pass
+        read_sockets, _, _ = select.select(sockets, [], [], 0)
+        for client_socket in read_sockets:
+            while True:
+                try:
+                    data = client_socket.recv(1024)
+                except BlockingIOError:
+                    break
+                if data[0] == PacketType.REQUEST_ID:
+                    received += 1
+    results.put((sent, received))
+
+def run(num_workers, mode, port, sockets_per_generator, seconds):
+    launcher = Launcher(num_workers, "127.0.0.1", port, mode=mode)
+    launcher_process = multiprocessing.Process(target=launcher.run)
+    launcher_process.start()
+    time.sleep(0.5)
+
+    results = multiprocessing.Queue()
+    generators = [multiprocessing.Process(target=load_generator,
+                                          args=(port, sockets_per_generator, seconds, results))
+                  for _ in range(num_workers)]
+    for generator in generators:
+        generator.start()
+    totals = [results.get() for _ in generators]
+    for generator in generators:
+        generator.join()
+    launcher_process.terminate()
+    launcher_process.join()
+
+    sent = sum(total[0] for total in totals)
+    received = sum(total[1] for total in totals)
+    return sent / seconds, received / seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--mode", choices=["reuseport", "dispatcher"], default="reuseport")
+    parser.add_argument("--port", type=int, default=pong_server.PORT + 100)
+    parser.add_argument("--sockets", type=int, default=64, help="client sockets per generator")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    baseline = None
+    for num_workers in range(1, args.max_workers + 1):
+        sent_rate, received_rate = run(num_workers, args.mode, args.port, args.sockets, args.seconds)
+        baseline = baseline or received_rate
+        print(f"{num_workers:>2} workers: {sent_rate:>10,.0f} requests/s, "
+              f"{received_rate:>10,.0f} answered/s, x{received_rate / baseline:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Spectator fan-out benchmark: viewers subscribed to the game server directly versus through relays.
+
+Runs the asyncio server, two players and V viewers of their match on the
+in-memory loopback network. Viewers either subscribe straight to the server
+(pong_server.MAX_SUBSCRIBERS raised to V) or to a relay tree: a root relay
+subscribed to the server, feeding ceil(V / fan-out) leaf relays once V exceeds
+the fan-out. Reports the server's datagrams out per second for the match, its
+mean time per tick run, and the states per second each viewer received.
+Everything shares one event loop (one core), so the viewer rate also reflects
+the cost of the fan-out wherever it happens.
+
+Usage: python -m benchmarks.bench_relay [--viewers 0 100 1000 5000] [--seconds 3] [--fanout 1000]
+"""
+import argparse
+import asyncio
+import math
+import time
+
+import link_quality
+import pong_codec
+import pong_server
+from pong_global import PacketType
+from pong_relay import SpectatorRelay, SUBSCRIBE_INTERVAL
+from pong_server_async import AsyncPongServer, LoopbackNetwork
+
+SERVER_ADDRESS = ("127.0.0.1", pong_server.PORT)
+ROOT_RELAY_ADDRESS = ("127.0.0.2", 30000)
+MATCH_ID = 0
+
+class Player(asyncio.DatagramProtocol):
+    """
+    Headless player: registers, ACKs states and answers PINGs.
+    """
+    def __init__(self):
+        self.transport = None
+        self.client_id = -1
+        self.received_states = link_quality.ReceiveWindow()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        packet_type = data[0]
+        if packet_type == PacketType.REQUEST_ID:
+            self.client_id = pong_codec.decode_id_response(data)
+        elif packet_type == PacketType.DELTA:
+            sequence = data[2]
+            self.received_states.note(sequence)
+            self.transport.sendto(pong_codec.encode_ack(sequence, self.received_states.ack_bits(sequence)), addr)
+        elif packet_type == PacketType.PING:
+            self.transport.sendto(pong_codec.encode_pong(pong_codec.decode_ping(data)), addr)
+
+class Viewer(asyncio.DatagramProtocol):
+    """
+    Spectator: subscribes to a relay (or the server) and counts the states it gets.
+    """
+    def __init__(self, upstream):
+        self.upstream = upstream
+        self.transport = None
+        self.states = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.states += 1
+
+    def subscribe(self):
+        self.transport.sendto(pong_codec.encode_subscribe(MATCH_ID), self.upstream)
+
+def egress():
+    counters = pong_server.counters
+    return counters[pong_server.DELTA_OUT] + counters[pong_server.SNAPSHOT_OUT] + counters["spectator_packets"]
+
+async def run(num_viewers, relayed, fanout, seconds):
+    network = LoopbackNetwork()
+    server = AsyncPongServer()
+    await server.start(network.bind(SERVER_ADDRESS, server.protocol))
+    for index in range(2):
+        player = Player()
+        network.bind(("127.0.0.1", 20000 + index), player)
+        player.transport.sendto(pong_codec.encode_request_id(10, 40), SERVER_ADDRESS)
+    await asyncio.sleep(0.05)
+
+    relays = []
+    upstreams = [SERVER_ADDRESS]
+    if relayed and num_viewers:
+        root = SpectatorRelay(SERVER_ADDRESS, MATCH_ID, fanout)
+        await root.start(network.bind(ROOT_RELAY_ADDRESS, root.protocol))
+        relays.append(root)
+        upstreams = [ROOT_RELAY_ADDRESS]
+        if num_viewers > fanout:
+            upstreams = []
+            for index in range(math.ceil(num_viewers / fanout)):
+                address = ("127.0.0.3", 30000 + index)
+                leaf = SpectatorRelay(ROOT_RELAY_ADDRESS, MATCH_ID, fanout)
+                await leaf.start(network.bind(address, leaf.protocol))
+                relays.append(leaf)
+                upstreams.append(address)
+    else:
+        pong_server.MAX_SUBSCRIBERS = max(num_viewers, 1)
+    viewers = []
+    for index in range(num_viewers):
+        viewer = Viewer(upstreams[index // fanout % len(upstreams)])
+        network.bind(("127.0.1.1", 10000 + index), viewer)
+        viewers.append(viewer)
+
+    async def renew():
+        while True:
+            for viewer in viewers:
+                viewer.subscribe()
+            await asyncio.sleep(SUBSCRIBE_INTERVAL)
+    renew_task = asyncio.ensure_future(renew())
+    await asyncio.sleep(0.5)
+
+    for viewer in viewers:
+        viewer.states = 0
+    start_egress = egress()
+    tick_runs = pong_server.tick_duration.count
+    tick_time = pong_server.tick_duration.total
+    start = time.perf_counter()
+    await asyncio.sleep(seconds)
+    elapsed = time.perf_counter() - start
+    server_packets = (egress() - start_egress) / elapsed
+    mean_tick = (pong_server.tick_duration.total - tick_time) / max(pong_server.tick_duration.count - tick_runs, 1)
+    viewer_rate = sum(viewer.states for viewer in viewers) / len(viewers) / elapsed if viewers else 0.0
+
+    renew_task.cancel()
+    await asyncio.gather(renew_task, return_exceptions=True)
+    for relay in relays:
+        await relay.stop()
+    await server.stop()
+    return server_packets, mean_tick, viewer_rate, len(relays)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--viewers", type=int, nargs="+", default=[0, 100, 1000, 5000])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--fanout", type=int, default=1000, help="viewers per relay")
+    args = parser.parse_args()
+    pong_server.DEBUG_MODE = False
+    max_subscribers = pong_server.MAX_SUBSCRIBERS
+
+    print(f"{'viewers':>7} {'mode':>7} {'relays':>6} {'server pkts/s':>13} {'tick us':>8} {'viewer states/s':>15}")
+    for num_viewers in args.viewers:
+        for relayed in (False, True):
+            pong_server.MAX_SUBSCRIBERS = max_subscribers
+            server_packets, mean_tick, viewer_rate, relays = asyncio.run(
+                run(num_viewers, relayed, args.fanout, args.seconds))
+            print(f"{num_viewers:>7} {'relay' if relayed else 'direct':>7} {relays:>6} {server_packets:>13,.0f} "
+                  f"{mean_tick * 1e6:>8.1f} {viewer_rate:>15.1f}")
+
+if __name__ == "__main__":
+    main()
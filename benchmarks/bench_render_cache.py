@@ -0,0 +1,113 @@
+"""
+Render benchmark: per-frame clear-and-redraw versus the cached, change-driven RenderManager.
+
+Draws N paddle-sized objects plus two score labels onto an offscreen pyxel Image
+(no window needed) and times a frame when nothing moves, when one object (the
+ball) moves, and when every object but the two scoring paddles moves. Scores
+change every 60 frames. The final frame of each cached run is compared pixel by
+pixel with the legacy renderer's output (the paddles stay clear of the labels,
+which the cache draws beneath the sprites).
+
+Usage: python -m benchmarks.bench_render_cache [--objects 3 100 1000] [--frames 600]
+"""
+import argparse
+import random
+import time
+
+import pyxel
+
+from managers import RenderManager
+from render_cache import RenderCache
+
+WIDTH = 160
+HEIGHT = 120
+
+class Box:
+    def __init__(self, screen, x, y, width, height):
+        self.screen = screen
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def render(self):
+        self.render_sprite()
+
+    def render_sprite(self):
+        self.screen.rect(self.x, self.y, self.width, self.height, 7)
+
+class ScoreBox(Box):
+    """
+    Box drawing a score label like the local players do.
+    """
+    def __init__(self, screen, x, y, name, hud_position):
+        super().__init__(screen, x, y, 10, 40)
+        self.name = name
+        self.points = 0
+        self.hud_position = hud_position
+
+    def render(self):
+        super().render()
+        self.screen.text(*self.hud_position, f"{self.name}: {self.points}", 5)
+
+    def update_hud(self, cache):
+        cache.label(self, *self.hud_position, 5, "{}: {}", self.name, self.points)
+
+def make_objects(screen, count, seed):
+    rng = random.Random(seed)
+    objects = [ScoreBox(screen, 10, 40, "Player One", (10, 10)),
+               ScoreBox(screen, 140, 40, "Player Two", (100, 10))]
+    while len(objects) < count:
+        objects.append(Box(screen, rng.randrange(WIDTH - 4), rng.randrange(HEIGHT - 4), 4, 4))
+    return objects
+
+def step(objects, frame, movers, rng):
+    if frame % 60 == 59:
+        objects[frame // 60 % 2].points += 1
+    for obj in objects[2:][-movers:] if movers else ():
+        obj.x = (obj.x + rng.choice((-1, 1))) % (WIDTH - obj.width)
+        obj.y = (obj.y + rng.choice((-1, 1))) % (HEIGHT - obj.height)
+
+def run(count, frames, movers, cached, seed):
+    """
+    :return: Tuple of (seconds per frame, final screen, manager).
+    """
+    screen = pyxel.Image(WIDTH, HEIGHT)
+    objects = make_objects(screen, count, seed)
+    manager = RenderManager(RenderCache(WIDTH, HEIGHT, screen=screen) if cached else None)
+    for obj in objects:
+        manager.register_object(obj)
+    rng = random.Random(seed)
+    elapsed = 0.0
+    for frame in range(frames):
+        step(objects, frame, movers, rng)
+        start = time.perf_counter()
+        if not cached:
+            screen.cls(0)
+        manager.manage()
+        elapsed += time.perf_counter() - start
+    return elapsed / frames, screen, manager
+
+def same_pixels(first, second):
+    return all(first.pget(x, y) == second.pget(x, y) for y in range(HEIGHT) for x in range(WIDTH))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--objects", type=int, nargs="+", default=[3, 100, 1000])
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'objects':>7} {'moving':>7} {'legacy us':>10} {'cached us':>10} {'speedup':>8}  frames full/partial/skipped")
+    for count in args.objects:
+        for movers in sorted({0, 1, count - 2}):
+            legacy_time, legacy_screen, _ = run(count, args.frames, movers, False, args.seed)
+            cached_time, cached_screen, manager = run(count, args.frames, movers, True, args.seed)
+            if not same_pixels(legacy_screen, cached_screen):
+                raise SystemExit(f"Cached frame differs from the legacy frame ({count} objects, {movers} moving)")
+            print(f"{count:>7} {movers:>7} {legacy_time * 1e6:>10.1f} {cached_time * 1e6:>10.1f} "
+                  f"{legacy_time / cached_time:>7.1f}x  "
+                  f"{manager.full_frames}/{manager.partial_frames}/{manager.skipped_frames}")
+
+if __name__ == "__main__":
+    main()
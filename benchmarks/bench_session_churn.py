@@ -0,0 +1,135 @@
+"""
+Session churn: a long-running server's table, memory and egress with and without idle eviction.
+
+Runs the server logic (handle_packet and tick_matches) for S simulated seconds
+at 60 Hz while players keep arriving, two per second by default. Each plays for
+30 to 120 seconds (POSITION every 6 ticks, PONG to every PING), then half of
+them send LEAVE and the other half just go silent, as crashed or closed clients
+do. Reports the clients and matches the server still holds, the traced memory
+of its match maker and its datagrams out per second over the last 10 simulated
+seconds; "off" ignores LEAVE and never evicts, which is how the server behaved
+before sessions ended.
+
+Usage: python -m benchmarks.bench_session_churn [--seconds 600] [--arrivals 2]
+"""
+import argparse
+import copy
+import random
+import tracemalloc
+
+import pong_codec
+import pong_server
+from pong_global import ObjectType, PacketType
+
+TICK_RATE = 60
+# Ticks between two POSITION packets of an active player.
+POSITION_INTERVAL = 6
+# Egress is measured over this many final seconds.
+MEASURE_SECONDS = 10
+
+class Player:
+    __slots__ = ("address", "client_id", "packet_counter", "leaves_at", "sends_leave")
+
+    def __init__(self, address, leaves_at, sends_leave):
+        self.address = address
+        self.client_id = -1
+        self.packet_counter = 0
+        self.leaves_at = leaves_at
+        self.sends_leave = sends_leave
+
+class ChurnSocket:
+    """
+    Server socket: counts datagrams out and hands REQUEST_ID replies and PINGs
+    for active players back to the run loop.
+    """
+    def __init__(self):
+        self.sent = 0
+        self.replies = []
+
+    def sendto(self, data, address):
+        self.sent += 1
+        if data[0] in (PacketType.REQUEST_ID, PacketType.PING):
+            self.replies.append((address, bytes(data)))
+
+def run(seconds, arrivals, sessions_end, seed):
+    """
+    :return: Tuple of (clients held, matches held, match maker bytes, datagrams out per second).
+    """
+    rng = random.Random(seed)
+    server_socket = ChurnSocket()
+    match_maker = pong_server.MatchMaker(tick_rate=TICK_RATE)
+    if not sessions_end:
+        match_maker.client_timeout = seconds * TICK_RATE + 1
+    interval = pong_server.snapshot_interval(TICK_RATE)
+    active = {}
+    next_address = 0
+    arrival_ticks = TICK_RATE / arrivals
+    next_arrival = 0.0
+    measure_from = (seconds - MEASURE_SECONDS) * TICK_RATE
+    for tick in range(seconds * TICK_RATE):
+        if tick == measure_from:
+            sent_before = server_socket.sent
+        while tick >= next_arrival:
+            next_arrival += arrival_ticks
+            next_address += 1
+            address = (f"10.{next_address >> 16 & 255}.{next_address >> 8 & 255}.{next_address & 255}", 5000)
+            player = Player(address, tick + rng.randint(30, 120) * TICK_RATE, rng.random() < 0.5)
+            active[address] = player
+            pong_server.handle_packet(server_socket, pong_codec.encode_request_id(10, 40), address, match_maker)
+        for address, data in server_socket.replies:
+            player = active.get(address)
+            if player is None:
+                continue
+            if data[0] == PacketType.REQUEST_ID:
+                player.client_id = pong_codec.decode_id_response(data)
+            else:
+                pong_server.handle_packet(server_socket, pong_codec.encode_pong(pong_codec.decode_ping(data)),
+                                          address, match_maker)
+        server_socket.replies.clear()
+        for address, player in list(active.items()):
+            if tick >= player.leaves_at:
+                del active[address]
+                if player.sends_leave and sessions_end:
+                    pong_server.handle_packet(server_socket, pong_codec.encode_leave(), address, match_maker)
+            elif player.client_id != -1 and tick % POSITION_INTERVAL == 0:
+                data = pong_codec.encode_position(ObjectType.PLAYER, player.client_id,
+                                                  player.packet_counter, 10, 40)
+                player.packet_counter = (player.packet_counter + 1) % 256
+                pong_server.handle_packet(server_socket, data, address, match_maker)
+        pong_server.tick_matches(server_socket, match_maker, 1, tick % interval == 0)
+    egress = (server_socket.sent - sent_before) / MEASURE_SECONDS
+    return len(match_maker.client_matches), len(match_maker.matches), traced_size(match_maker), egress
+
+def traced_size(match_maker):
+    """
+    Bytes allocated by a deep copy of the match maker, i.e. the memory its
+    session table, matches and links hold (tracing the whole run would slow
+    it down several times over).
+    """
+    tracemalloc.start()
+    clone = copy.deepcopy(match_maker)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del clone
+    return size
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=600)
+    parser.add_argument("--arrivals", type=float, default=2.0, help="players arriving per second")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.seconds <= MEASURE_SECONDS:
+        parser.error(f"--seconds must be more than {MEASURE_SECONDS}")
+    pong_server.DEBUG_MODE = False
+
+    print(f"{args.seconds} s at {TICK_RATE} Hz, {args.arrivals:g} players arriving per second, "
+          f"about {args.arrivals * 75:.0f} playing at a time")
+    print(f"{'sessions end':>12} {'clients':>8} {'matches':>8} {'memory KiB':>11} {'pkts out/s':>11}")
+    for sessions_end in (False, True):
+        clients, matches, memory, egress = run(args.seconds, args.arrivals, sessions_end, args.seed)
+        print(f"{'on' if sessions_end else 'off':>12} {clients:>8} {matches:>8} "
+              f"{memory / 1024:>11,.0f} {egress:>11,.0f}")
+
+if __name__ == "__main__":
+    main()
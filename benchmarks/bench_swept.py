@@ -0,0 +1,103 @@
+"""
+Swept versus discrete ball collision at one pixel per tick and at 20 Hz.
+
+Plays N matches of M simulated seconds with random paddle moves (decided 20
+times per second, the same for every run) and a ball at S pixels per second:
+discrete and swept at S Hz (1 pixel per tick, 120 Hz by default), and discrete
+and swept at 20 Hz (S / 20 pixels per tick). Compares each run's goals (scorer
+and 50 ms window), final scores and final ball state with the one pixel per
+tick discrete reference, and reports the CPU time per simulated second. A
+swept run that scores in its last tick ends before moving the pixels left
+over after the goal (see Ball.sweep), so its end state differs then.
+
+Usage: python -m benchmarks.bench_swept [--matches 200] [--seconds 60] [--ball-speed 120]
+"""
+import argparse
+import random
+import time
+
+from pong_core import Ball, Field
+
+# Rate paddle moves are decided at; both tick rates are multiples of it.
+PADDLE_RATE = 20
+
+def paddle_schedule(field, seconds, rng):
+    """
+    :return: List of {client_id: (x, y)} paddle tables, one per 1/PADDLE_RATE s.
+    """
+    left_y = right_y = (field.height - field.paddle_height) // 2
+    schedule = []
+    for _ in range(seconds * PADDLE_RATE):
+        left_y = min(max(left_y + rng.choice((-10, 0, 0, 10)), 0), field.height - field.paddle_height)
+        right_y = min(max(right_y + rng.choice((-10, 0, 0, 10)), 0), field.height - field.paddle_height)
+        schedule.append({0: (field.paddle_width, left_y),
+                         1: (field.width - 2 * field.paddle_width, right_y)})
+    return schedule
+
+def play(start, schedule, tick_rate, ball_speed, swept, field):
+    """
+    :return: Tuple of (goals as (50 ms window, scorer), final scores, final ball state, seconds).
+    """
+    x, y, dx, dy = start
+    step_ticks = tick_rate // PADDLE_RATE
+    ball = Ball(x, y, field.ball_size, field, ball_speed // tick_rate)
+    ball.dx, ball.dy = dx, dy
+    advance = ball.sweep if swept else ball.step
+    goals = []
+    scores = [0, 0]
+    begin = time.perf_counter()
+    for window, paddles in enumerate(schedule):
+        for _ in range(step_ticks):
+            scorer = advance(paddles)
+            if scorer is not None:
+                goals.append((window, scorer))
+                scores[scorer] += 1
+    elapsed = time.perf_counter() - begin
+    return goals, scores, (ball.x, ball.y, ball.dx, ball.dy), elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--matches", type=int, default=200)
+    parser.add_argument("--seconds", type=int, default=60)
+    parser.add_argument("--ball-speed", type=int, default=120,
+                        help=f"pixels per second, a multiple of {PADDLE_RATE}")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if args.ball_speed % PADDLE_RATE:
+        parser.error(f"--ball-speed must be a multiple of {PADDLE_RATE}")
+
+    field = Field()
+    rng = random.Random(args.seed)
+    fine_rate = args.ball_speed
+    runs = [(f"discrete {fine_rate:>3} Hz", fine_rate, False), (f"swept    {fine_rate:>3} Hz", fine_rate, True),
+            (f"discrete {PADDLE_RATE:>3} Hz", PADDLE_RATE, False), (f"swept    {PADDLE_RATE:>3} Hz", PADDLE_RATE, True)]
+    same_goals = [0] * len(runs)
+    same_scores = [0] * len(runs)
+    same_state = [0] * len(runs)
+    cpu = [0.0] * len(runs)
+    total_goals = [0] * len(runs)
+    for _ in range(args.matches):
+        start = (rng.randrange(20, field.width - 20), rng.randrange(1, field.height - 1),
+                 rng.choice((-1, 1)), rng.choice((-1, 1)))
+        schedule = paddle_schedule(field, args.seconds, rng)
+        results = [play(start, schedule, tick_rate, args.ball_speed, swept, field)
+                   for _, tick_rate, swept in runs]
+        reference = results[0]
+        for index, (goals, scores, state, elapsed) in enumerate(results):
+            same_goals[index] += goals == reference[0]
+            same_scores[index] += scores == reference[1]
+            same_state[index] += state == reference[2]
+            cpu[index] += elapsed
+            total_goals[index] += len(goals)
+
+    simulated = args.matches * args.seconds
+    print(f"{args.matches} matches x {args.seconds} s, ball {args.ball_speed} px/s; "
+          f"matches agreeing with discrete {fine_rate} Hz:")
+    print(f"{'run':<16} {'goals':>7} {'same goals':>11} {'same score':>11} {'same end':>9} {'us/sim s':>9}")
+    for index, (label, _, _) in enumerate(runs):
+        print(f"{label:<16} {total_goals[index]:>7} {same_goals[index] / args.matches:>10.1%} "
+              f"{same_scores[index] / args.matches:>10.1%} {same_state[index] / args.matches:>8.1%} "
+              f"{cpu[index] / simulated * 1e6:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Synthetic client swarm: thousands of headless bots against a real pong_server over UDP.
+
+Each bot speaks the PongClient protocol: it registers with REQUEST_ID, then sends
+POSITION packets at --position-rate and, at --probe-rate, re-requests its ID as
+a latency probe (the server answers every REQUEST_ID, and a bot keeps at most
+one probe in flight so replies need no sequence number). Bots run on one asyncio
+loop per process, spread over --processes worker processes.
+
+Bots also answer the server's PINGs and ACK states with the received bits,
+like PongClient. Reports the offered load, the datagrams the server answered
+per second, probe and match-state (SNAPSHOT/DELTA) loss, the state rate each
+bot actually got (it drops when the server falls behind its tick rate, and
+states the server's rate control withholds from a slow link count as missed)
+and probe round-trip percentiles.
+
+Usage:
+  python -m benchmarks.load_swarm [--bots 1000] [--seconds 10] [--processes 2]
+  python -m benchmarks.load_swarm --no-spawn --host 127.0.0.1 --port 12345
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import statistics
+import time
+
+import link_quality
+import pong_codec
+import pong_server
+from pong_global import ObjectType, PacketType
+
+# A probe without a reply after this many seconds is counted as lost.
+PROBE_TIMEOUT = 1.0
+# Bots are checked for due sends this many times per second.
+SCHEDULER_RATE = 100
+REGISTER_RETRY = 0.5
+
+class SwarmBot(asyncio.DatagramProtocol):
+    """
+    Headless client: registers, moves its paddle and measures probe round trips.
+    """
+    def __init__(self, server_address, rng):
+        self.server_address = server_address
+        self.transport = None
+        self.client_id = -1
+        self.packet_counter = 0
+        self.y_pos = rng.randrange(0, 80, 10)
+        self.next_register = 0.0
+        # Random phases so the swarm does not send in lockstep.
+        self.next_position = rng.random()
+        self.next_probe = rng.random()
+        self.probe_sent = None
+        self.rtts = []
+        self.sent = 0
+        self.received = 0
+        self.probes = 0
+        self.lost_probes = 0
+        self.states = 0
+        self.missed_states = 0
+        self.last_sequence = None
+        self.received_states = link_quality.ReceiveWindow()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def error_received(self, exc):
+        pass
+
+    def datagram_received(self, data, addr):
+        self.received += 1
+        packet_type = data[0]
+        if packet_type == PacketType.REQUEST_ID:
+            if self.client_id == -1:
+                self.client_id = pong_codec.decode_id_response(data)
+            elif self.probe_sent is not None:
+                self.rtts.append(time.perf_counter() - self.probe_sent)
+                self.probe_sent = None
+        elif packet_type == PacketType.DELTA or packet_type == PacketType.SNAPSHOT:
+            self.states += 1
+            # The 8-bit sequence: a SNAPSHOT's counter follows the type byte (then its
+            # length); a DELTA's follows the type and version bytes.
+            sequence = data[2] if packet_type == PacketType.DELTA else data[1]
+            if self.last_sequence is not None:
+                gap = pong_codec.sequence_distance(sequence, self.last_sequence)
+                if gap > 1:
+                    self.missed_states += gap - 1
+            if self.last_sequence is None or pong_codec.sequence_newer(sequence, self.last_sequence):
+                self.last_sequence = sequence
+            self.received_states.note(sequence)
+            if packet_type == PacketType.DELTA:
+                self.transport.sendto(pong_codec.encode_ack(sequence, self.received_states.ack_bits(sequence)),
+                                      self.server_address)
+                self.sent += 1
+        elif packet_type == PacketType.PING:
+            # Unanswered pings would make the server throttle this bot's state rate.
+            self.send(pong_codec.encode_pong(pong_codec.decode_ping(data)))
+
+    def send(self, packet):
+        self.transport.sendto(packet, self.server_address)
+        self.sent += 1
+
+    def step(self, now, position_interval, probe_interval):
+        """
+        Sends whatever is due at `now` (seconds since the swarm started).
+        """
+        if self.client_id == -1:
+            if now >= self.next_register:
+                self.send(pong_codec.encode_request_id(10, self.y_pos))
+                self.next_register = now + REGISTER_RETRY
+            return
+        if position_interval and now >= self.next_position:
+            self.y_pos = (self.y_pos + 10) % 80
+            self.send(pong_codec.encode_position(ObjectType.PLAYER, self.client_id,
+                                                 self.packet_counter, 10, self.y_pos))
+            self.packet_counter = (self.packet_counter + 1) % 256
+            self.next_position += position_interval
+        if self.probe_sent is not None and time.perf_counter() - self.probe_sent > PROBE_TIMEOUT:
+            self.lost_probes += 1
+            self.probe_sent = None
+        if probe_interval and now >= self.next_probe and self.probe_sent is None:
+            self.probes += 1
+            self.probe_sent = time.perf_counter()
+            self.send(pong_codec.encode_request_id(10, self.y_pos))
+            self.next_probe = now + probe_interval
+
+async def swarm(host, port, num_bots, seconds, position_rate, probe_rate, seed):
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    server_address = (host, port)
+    bots = []
+    for _ in range(num_bots):
+        bot = SwarmBot(server_address, rng)
+        await loop.create_datagram_endpoint(lambda bot=bot: bot, local_addr=("127.0.0.1", 0))
+        bots.append(bot)
+
+    position_interval = 1.0 / position_rate if position_rate > 0 else 0
+    probe_interval = 1.0 / probe_rate if probe_rate > 0 else 0
+    start = time.perf_counter()
+    # Registration is not part of the measurement.
+    measure_from = None
+    while True:
+        now = time.perf_counter() - start
+        if measure_from is None and (all(bot.client_id != -1 for bot in bots) or now > 5.0):
+            measure_from = now
+            for bot in bots:
+                bot.sent = bot.received = bot.probes = bot.lost_probes = 0
+                bot.states = bot.missed_states = 0
+                bot.rtts.clear()
+                bot.probe_sent = None
+                bot.next_position = now + rng.random() * position_interval
+                bot.next_probe = now + rng.random() * probe_interval
+        if measure_from is not None and now - measure_from >= seconds:
+            break
+        for bot in bots:
+            bot.step(now, position_interval, probe_interval)
+        await asyncio.sleep(1.0 / SCHEDULER_RATE)
+
+    for bot in bots:
+        if bot.probe_sent is not None:
+            # Still in flight at the end: neither answered nor lost.
+            bot.probes -= 1
+        bot.transport.close()
+    return {
+        "bots": num_bots,
+        "registered": sum(bot.client_id != -1 for bot in bots),
+        "sent": sum(bot.sent for bot in bots),
+        "received": sum(bot.received for bot in bots),
+        "probes": sum(bot.probes for bot in bots),
+        "lost_probes": sum(bot.lost_probes for bot in bots),
+        "states": sum(bot.states for bot in bots),
+        "missed_states": sum(bot.missed_states for bot in bots),
+        "rtts": [rtt for bot in bots for rtt in bot.rtts],
+    }
+
+def run_worker(host, port, num_bots, seconds, position_rate, probe_rate, seed):
+    return asyncio.run(swarm(host, port, num_bots, seconds, position_rate, probe_rate, seed))
+
+def serve(port, tick_rate):
+    pong_server.DEBUG_MODE = False
+    pong_server.start_server(tick_rate, pong_server.create_server_socket("127.0.0.1", port))
+
+def percentiles(samples):
+    """
+    :return: Tuple of the (p50, p95, p99) of the samples, or None with fewer than two.
+    """
+    if len(samples) < 2:
+        return None
+    cut_points = statistics.quantiles(samples, n=100, method="inclusive")
+    return cut_points[49], cut_points[94], cut_points[98]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bots", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--processes", type=int, default=1, help="bot processes")
+    parser.add_argument("--position-rate", type=float, default=15.0,
+                        help="POSITION packets per bot per second")
+    parser.add_argument("--probe-rate", type=float, default=2.0,
+                        help="latency probes per bot per second")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=pong_server.PORT + 300)
+    parser.add_argument("--no-spawn", action="store_true",
+                        help="target a running server instead of starting one")
+    parser.add_argument("--tick-rate", type=int, default=pong_server.TICK_RATE)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    server_process = None
+    if not args.no_spawn:
+        server_process = multiprocessing.Process(target=serve, args=(args.port, args.tick_rate), daemon=True)
+        server_process.start()
+        time.sleep(0.3)
+
+    shares = [args.bots // args.processes + (i < args.bots % args.processes) for i in range(args.processes)]
+    jobs = [(args.host, args.port, share, args.seconds, args.position_rate, args.probe_rate, args.seed + i)
+            for i, share in enumerate(shares) if share]
+    try:
+        if len(jobs) == 1:
+            results = [run_worker(*jobs[0])]
+        else:
+            with multiprocessing.Pool(len(jobs)) as pool:
+                results = pool.starmap(run_worker, jobs)
+    finally:
+        if server_process is not None:
+            server_process.terminate()
+            server_process.join()
+
+    totals = {key: sum(result[key] for result in results) for key in results[0] if key != "rtts"}
+    rtts = [rtt for result in results for rtt in result["rtts"]]
+    expected_states = totals["states"] + totals["missed_states"]
+    print(f"{totals['registered']}/{totals['bots']} bots registered, {args.processes} process(es), "
+          f"{args.seconds:.0f} s measured")
+    print(f"offered load: {totals['sent'] / args.seconds:>10,.0f} packets/s "
+          f"({args.position_rate:g} POSITION + {args.probe_rate:g} probes per bot per second, plus ACKs)")
+    print(f"server sent:  {totals['received'] / args.seconds:>10,.0f} packets/s")
+    print(f"probe loss:   {totals['lost_probes'] / max(totals['probes'], 1):>10.2%} "
+          f"of {totals['probes']:,} probes")
+    print(f"state loss:   {totals['missed_states'] / max(expected_states, 1):>10.2%} "
+          f"of {expected_states:,} SNAPSHOT/DELTA packets")
+    target_rate = args.tick_rate / pong_server.snapshot_interval(args.tick_rate)
+    print(f"state rate:   {totals['states'] / max(totals['registered'], 1) / args.seconds:>10.1f} "
+          f"per bot per second (server target {target_rate:g})")
+    rtt_percentiles = percentiles(rtts)
+    if rtt_percentiles is None:
+        print("round trip:   not enough probe replies")
+    else:
+        p50, p95, p99 = rtt_percentiles
+        print(f"round trip:   p50 {p50 * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Benchmark suite: physics, manager dispatch, codec, server stepping and loopback throughput.
+
+Runs every case (or those matching --only), prints one line per case and writes
+the results as JSON. Every result is a rate, so higher is better. With --compare,
+each case is checked against a previous results file and the run fails when any
+case got slower than the threshold allows, so two commits can be compared by
+running the suite on each.
+
+Usage:
+  python -m benchmarks.suite [--output results.json] [--only codec server]
+  python -m benchmarks.suite --compare baseline.json [--threshold 0.25]
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import queue
+import random
+import subprocess
+import sys
+import time
+import timeit
+
+import pong_codec
+import pong_server
+from managers import GridPhysicsManager, PhysicsManager, RenderManager, TickManager
+from pong_global import ObjectType
+from benchmarks.bench_broadphase import Box
+from benchmarks.bench_matches import NullSocket, build_matches
+from benchmarks.bench_multicore import load_generator
+
+# Registered cases as (name, unit, setup, measures_rate); setup returns the
+# function to time, or with `measures_rate` a function returning its own rate.
+CASES = []
+SUITE_FORMAT_VERSION = 1
+DEFAULT_THRESHOLD = 0.25
+LOOPBACK_PORT = pong_server.PORT + 200
+
+def case(name, unit, measures_rate=False):
+    def register(setup):
+        CASES.append((name, unit, setup, measures_rate))
+        return setup
+    return register
+
+def measure(function, repeat, min_time):
+    """
+    Returns the best calls per second over `repeat` runs of at least `min_time` seconds.
+    """
+    timer = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return number / min(timer.repeat(repeat, number))
+
+def physics_case(manager_class, num_objects):
+    def setup():
+        manager = manager_class()
+        rng = random.Random(1)
+        for _ in range(num_objects):
+            manager.register_object(Box(rng))
+        return manager.manage
+    return setup
+
+for num_objects in (10, 100, 1000):
+    case(f"physics.manage.{num_objects}", "frames/s")(physics_case(PhysicsManager, num_objects))
+case("physics.grid_manage.1000", "frames/s")(physics_case(GridPhysicsManager, 1000))
+
+class NoOp:
+    def tick(self):
+        pass
+
+    def render(self):
+        pass
+
+@case("managers.tick_dispatch.1000", "frames/s")
+def tick_dispatch():
+    manager = TickManager()
+    for _ in range(1000):
+        manager.register_object(NoOp())
+    return manager.manage
+
+@case("managers.render_dispatch.1000", "frames/s")
+def render_dispatch():
+    manager = RenderManager()
+    for _ in range(1000):
+        manager.register_object(NoOp())
+    return manager.manage
+
+@case("codec.crc32", "packets/s")
+def crc32():
+    packet = pong_codec.encode_position(ObjectType.PLAYER, 1, 7, 140, 60)
+    return lambda: pong_codec.has_valid_crc(packet, len(packet))
+
+@case("codec.position_encode", "packets/s")
+def position_encode():
+    view = memoryview(bytearray(pong_codec.POSITION_PACKET_LENGTH))
+    return lambda: pong_codec.pack_position_into(view, 0, pong_codec.OBJECT_PLAYER, 1, 7, 140, 60)
+
+@case("codec.position_decode", "packets/s")
+def position_decode():
+    packet = pong_codec.encode_position(ObjectType.PLAYER, 1, 7, 140, 60)
+    return lambda: pong_codec.decode_position(packet)
+
+SNAPSHOT_ENTITIES = [(pong_codec.OBJECT_PLAYER, 0, 10, 40), (pong_codec.OBJECT_PLAYER, 1, 140, 60),
+                     (pong_codec.OBJECT_BALL, 0, 80, 60)]
+
+@case("codec.snapshot_encode", "packets/s")
+def snapshot_encode():
+    writer = pong_codec.SnapshotWriter()
+    return lambda: writer.encode(0, SNAPSHOT_ENTITIES, (1, 2))
+
+@case("codec.snapshot_decode", "packets/s")
+def snapshot_decode():
+    packet = bytes(pong_codec.SnapshotWriter().encode(0, SNAPSHOT_ENTITIES, (1, 2)))
+
+    def decode():
+        _, entity_count, _ = pong_codec.decode_snapshot(packet)
+        for _ in pong_codec.iter_snapshot_entities(packet, entity_count):
+            pass
+    return decode
+
+DELTA_BASE = ((10, 40), (140, 60), (80, 60), (1, 2))
+DELTA_STATE = ((10, 40), (140, 70), (81, 61), (1, 2))
+
+@case("codec.delta_encode", "packets/s")
+def delta_encode():
+    return lambda: pong_codec.encode_delta(1, DELTA_STATE, 0, DELTA_BASE)
+
+@case("codec.delta_decode", "packets/s")
+def delta_decode():
+    packet = pong_codec.encode_delta(1, DELTA_STATE, 0, DELTA_BASE)
+    history = {0: DELTA_BASE}
+    return lambda: pong_codec.decode_delta(packet, history)
+
+@case("server.step_simulation", "steps/s")
+def step_simulation():
+    match_maker = build_matches(1)
+    match = match_maker.matches[0]
+    return lambda: pong_server.step_simulation(match)
+
+@case("server.tick_matches.1000", "ticks/s")
+def tick_matches():
+    match_maker = build_matches(1000)
+    server_socket = NullSocket()
+    return lambda: pong_server.tick_matches(server_socket, match_maker, 1)
+
+def serve(port):
+    pong_server.DEBUG_MODE = False
+    pong_server.start_server(server_socket=pong_server.create_server_socket("127.0.0.1", port))
+
+@case("server.loopback", "packets/s", measures_rate=True)
+def loopback():
+    """
+    REQUEST_ID round trips answered per second by a real server process over loopback.
+    """
+    def run():
+        server_process = multiprocessing.Process(target=serve, args=(LOOPBACK_PORT,), daemon=True)
+        server_process.start()
+        time.sleep(0.3)
+        results = queue.Queue()
+        seconds = 1.0
+        try:
+            load_generator(LOOPBACK_PORT, 32, seconds, results)
+        finally:
+            server_process.terminate()
+            server_process.join()
+        return results.get()[1] / seconds
+    return run
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(only, repeat, min_time):
+    results = {}
+    for name, unit, setup, measures_rate in CASES:
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        function = setup()
+        if measures_rate:
+            # Each run takes a fixed duration; keep the best of a few.
+            value = max(function() for _ in range(min(repeat, 3)))
+        else:
+            value = measure(function, repeat, min_time)
+        results[name] = {"value": value, "unit": unit}
+        print(f"{name:>32}: {value:>14,.1f} {unit}")
+    return results
+
+def compare(results, baseline, threshold):
+    """
+    Prints the change of every case against `baseline`.
+
+    :return: List of names of the cases slower than `threshold` allows.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        change = result["value"] / previous["value"] - 1
+        regressed = change < -threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:>32}: {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="previous results file to check against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown per case, as a fraction")
+    parser.add_argument("--only", nargs="+", help="run cases whose names start with these prefixes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per timed run")
+    args = parser.parse_args()
+
+    pong_server.DEBUG_MODE = False
+    results = run_suite(args.only, args.repeat, args.min_time)
+    report = {
+        "format": SUITE_FORMAT_VERSION,
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"Compared with {args.compare} (revision {baseline.get('revision')}):")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import numpy as np
+from pong_core import Field
+
+class EntityColumns:
+    """
+    Struct-of-arrays storage for large numbers of simple moving rectangles (crowd
+    balls, particles, bots): one NumPy column per component instead of one Python
+    object per entity.
+
+    Register the store with the managers through `register_columns`: TickManager
+    moves every entity with one vectorized `tick()`, PhysicsManager bounces them off
+    the field borders and the managers' regular objects (paddles) with `physics()`,
+    and RenderManager draws them with `render()`, a single loop over plain lists.
+    Per entity that costs a few vector elements instead of an object and a
+    method dispatch per manager per frame.
+    """
+    def __init__(self, capacity=1024, field=None, color=7, screen=None):
+        self.field = field if field is not None else Field()
+        self.color = color
+        # Draw target: the pyxel module (the window) by default, or an Image.
+        self.screen = screen
+        self.count = 0
+        # Set when positions changed since the last `render()`.
+        self.changed = False
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        self.dx = np.zeros(capacity, dtype=np.float64)
+        self.dy = np.zeros(capacity, dtype=np.float64)
+        self.width = np.zeros(capacity, dtype=np.int16)
+        self.height = np.zeros(capacity, dtype=np.int16)
+
+    def _columns(self):
+        return (self.x, self.y, self.dx, self.dy, self.width, self.height)
+
+    def _grow(self):
+        old = self._columns()
+        self._allocate(self.capacity * 2)
+        for old_column, new_column in zip(old, self._columns()):
+            new_column[:len(old_column)] = old_column
+
+    def add(self, x, y, width, height, dx=0.0, dy=0.0):
+        """
+        Appends an entity and returns its index.
+        """
+        if self.count == self.capacity:
+            self._grow()
+        index = self.count
+        self.x[index] = x
+        self.y[index] = y
+        self.dx[index] = dx
+        self.dy[index] = dy
+        self.width[index] = width
+        self.height[index] = height
+        self.count += 1
+        self.changed = True
+        return index
+
+    def remove(self, index):
+        """
+        Removes an entity by moving the last one into its slot.
+
+        :return: The former index of the moved entity, or None if the last one was removed.
+        """
+        last = self.count - 1
+        self.count = last
+        self.changed = True
+        if index == last:
+            return None
+        for column in self._columns():
+            column[index] = column[last]
+        return last
+
+    def __len__(self):
+        return self.count
+
+    def tick(self):
+        """
+        Moves every entity by its velocity.
+        """
+        count = self.count
+        if count:
+            self.x[:count] += self.dx[:count]
+            self.y[:count] += self.dy[:count]
+            self.changed = True
+
+    def physics(self, obstacles=()):
+        """
+        Bounces entities off the field borders and off the rectangles of `obstacles`
+        (objects with x, y, width and height), turning them around only when moving
+        into what they hit.
+        """
+        count = self.count
+        if not count:
+            return
+        x, y = self.x[:count], self.y[:count]
+        dx, dy = self.dx[:count], self.dy[:count]
+        width, height = self.width[:count], self.height[:count]
+        for obstacle in obstacles:
+            hit = ((x < obstacle.x + obstacle.width) & (x + width > obstacle.x)
+                   & (y < obstacle.y + obstacle.height) & (y + height > obstacle.y))
+            if hit.any():
+                center = obstacle.x + obstacle.width / 2
+                np.negative(dx, out=dx, where=hit & ((x + width / 2 < center) == (dx > 0)))
+        # Borders last, so they win over obstacles and entities never leave the field.
+        field = self.field
+        np.negative(dy, out=dy, where=((y <= 0) & (dy < 0)) | ((y >= field.height - height) & (dy > 0)))
+        np.negative(dx, out=dx, where=((x <= 0) & (dx < 0)) | ((x >= field.width - width) & (dx > 0)))
+
+    def render(self):
+        """
+        Draws every entity as a filled rectangle.
+        """
+        screen = self.screen
+        if screen is None:
+            import pyxel
+            screen = pyxel
+        count = self.count
+        rect = screen.rect
+        color = self.color
+        for x, y, width, height in zip(self.x[:count].tolist(), self.y[:count].tolist(),
+                                       self.width[:count].tolist(), self.height[:count].tolist()):
+            rect(x, y, width, height, color)
+        self.changed = False
@@ -0,0 +1,163 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+from collections import deque
+
+# Frame-time histogram buckets, upper bounds in milliseconds (16.7 ms is one frame at 60 fps).
+FRAME_BUCKETS_MS = (2, 4, 8, 16.7, 33.3, 50, 100)
+
+class FrameProfiler:
+    """
+    Times each section of a frame (managers, network step) over a rolling window
+    of frames and records objects whose tick or render alone took longer than
+    `slow_object_threshold` seconds.
+    Sections are timed with `measure()` between `begin_frame()` and `end_frame()`;
+    per-object timing is only paid while a manager's `object_timer` is `record_object`.
+    """
+    def __init__(self, window=120, slow_object_threshold=0.002, clock=time.perf_counter):
+        self.window = window
+        self.slow_object_threshold = slow_object_threshold
+        self.clock = clock
+        # Mapping of section names to deques of their last `window` durations.
+        self.sections = {}
+        self.frame_times = deque(maxlen=window)
+        # Time between the starts of consecutive frames, including any wait for vsync.
+        self.frame_intervals = deque(maxlen=window)
+        self.frame_count = 0
+        self.frame_start = None
+        self.current = {}
+        # Mapping of object labels to (times over the threshold, worst duration).
+        self.slow_objects = {}
+        self.cprofile = None
+        self.cprofile_frames = 0
+        self.cprofile_done = None
+
+    def begin_frame(self):
+        now = self.clock()
+        if self.frame_start is not None:
+            self.frame_intervals.append(now - self.frame_start)
+        self.frame_start = now
+        self.current = {}
+        if self.cprofile is not None:
+            self.cprofile.enable()
+
+    def measure(self, name, function, *args):
+        """
+        Calls `function(*args)` and adds its duration to the section `name` of this frame.
+        """
+        start = self.clock()
+        result = function(*args)
+        self.current[name] = self.current.get(name, 0.0) + self.clock() - start
+        return result
+
+    def end_frame(self):
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile_frames -= 1
+            if self.cprofile_frames <= 0:
+                self.cprofile_done = self.cprofile
+                self.cprofile = None
+        self.frame_times.append(self.clock() - self.frame_start)
+        for name, elapsed in self.current.items():
+            section = self.sections.get(name)
+            if section is None:
+                section = self.sections[name] = deque(maxlen=self.window)
+            section.append(elapsed)
+        self.frame_count += 1
+
+    def record_object(self, obj, elapsed):
+        """
+        Per-object timer for the managers: keeps objects slower than the threshold.
+        """
+        if elapsed > self.slow_object_threshold:
+            label = object_label(obj)
+            count, worst = self.slow_objects.get(label, (0, 0.0))
+            self.slow_objects[label] = (count + 1, max(worst, elapsed))
+
+    def start_cprofile(self, frames):
+        """
+        Captures a cProfile of the next `frames` frames.
+        """
+        self.cprofile = cProfile.Profile()
+        self.cprofile_frames = frames
+        self.cprofile_done = None
+
+    def cprofile_report(self, limit=20):
+        """
+        :return: The top `limit` functions by cumulative time of the last capture, as text.
+        """
+        profile = self.cprofile_done or self.cprofile
+        if profile is None:
+            return ""
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).sort_stats("cumulative").print_stats(limit)
+        return output.getvalue()
+
+    def frame_histogram(self):
+        """
+        :return: List of (upper bound in ms, frames) over the window; the last bound is None.
+        """
+        counts = [0] * (len(FRAME_BUCKETS_MS) + 1)
+        for frame_time in self.frame_times:
+            milliseconds = frame_time * 1000
+            index = 0
+            while index < len(FRAME_BUCKETS_MS) and milliseconds > FRAME_BUCKETS_MS[index]:
+                index += 1
+            counts[index] += 1
+        return list(zip(FRAME_BUCKETS_MS + (None,), counts))
+
+    def summary(self):
+        """
+        :return: JSON-serializable dict of the window: per-section and frame statistics
+                 in milliseconds, the frame-time histogram and the slow objects.
+        """
+        def stats(samples):
+            if not samples:
+                return None
+            ordered = sorted(samples)
+            return {
+                "mean_ms": sum(ordered) / len(ordered) * 1000,
+                "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        return {
+            "frames": self.frame_count,
+            "window": len(self.frame_times),
+            "frame": stats(self.frame_times),
+            "interval": stats(self.frame_intervals),
+            "sections": {name: stats(samples) for name, samples in self.sections.items()},
+            "histogram": [{"le_ms": bound, "frames": count} for bound, count in self.frame_histogram()],
+            "slow_objects": {label: {"count": count, "worst_ms": worst * 1000}
+                             for label, (count, worst) in self.slow_objects.items()},
+        }
+
+    def overlay_lines(self):
+        """
+        :return: Short text lines for the on-screen overlay.
+        """
+        if not self.frame_times:
+            return []
+        summary = self.summary()
+        frame = summary["frame"]
+        lines = [f"frame {frame['mean_ms']:.1f} max {frame['max_ms']:.1f}ms"]
+        for name, stats in summary["sections"].items():
+            lines.append(f"{name:<7}{stats['mean_ms']:5.2f} {stats['max_ms']:5.2f}")
+        if self.slow_objects:
+            label, (count, _) = max(self.slow_objects.items(), key=lambda item: item[1][1])
+            lines.append(f"slow {label} x{count}")
+        return lines
+
+    def dump(self, path):
+        with open(path, "w") as dump_file:
+            json.dump(self.summary(), dump_file, indent=2)
+
+def object_label(obj):
+    """
+    Readable label for an object: its class, plus its name when it has one.
+    """
+    name = getattr(obj, "name", None)
+    if name:
+        return f"{type(obj).__name__}({name})"
+    return type(obj).__name__
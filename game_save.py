@@ -1,45 +1,78 @@
+import os
 from pong_global import SAVE_FILENAME
+from leaderboard import Leaderboard
+from score_journal import ScoreJournal
 
 class GameSave:
-    def __init__(self):
-        self.saved_data = ""
-        self.is_new_game = False
-        self.players_data = {}
-        try:
-            save_handle = open(SAVE_FILENAME,"r")
-            self.saved_data = save_handle.readlines()
-            save_handle.close()
-        except Exception as exception:
-            self.is_new_game = True
-            if exception.errno == 2:
-                print("No save data found. Starting new game.")
-            else:
-                print("Error reading save data")
+    """
+    Persistent player points, backed by an indexed Leaderboard.
+    `players_data` behaves like the former name -> points dict; the save file is
+    only read when the data is first needed.
+    Scores go through `record_points`, which a write-behind ScoreJournal persists
+    off the game loop; `journal=False` saves synchronously in `save_data` only.
+    `load_data` starts the journal once the file is read; `close()` flushes it
+    (it also runs at exit).
+    """
+    def __init__(self, path=SAVE_FILENAME, journal=True):
+        self.path = path
+        self.players_data = Leaderboard(path)
+        self.journal = ScoreJournal(self.players_data) if journal else None
+        self.is_new_game = not (os.path.exists(path) or
+                                (self.journal is not None and os.path.exists(self.journal.path)))
+        if self.is_new_game:
+            print("No save data found. Starting new game.")
 
     def load_data(self):
         if self.is_new_game == False:
-            if len(self.saved_data) < 2:
+            try:
+                self.players_data.load()
+            except (OSError, UnicodeDecodeError):
+                print("Error reading save data")
+                self.reset()
+                return
+            if self.players_data.skipped_lines:
+                print(f"Skipped {self.players_data.skipped_lines} malformed lines in saved data.")
+            if not self.players_data:
                 print("Missing data in saved data. Launching new game.")
                 self.is_new_game = True
-                return
-            for line in self.saved_data:
-                if ":" not in line:
-                    print("Error in saved file data. Launching new game.")
-                    self.is_new_game = True
-                    return
-                name = line.split(":")[0]
-                points = line.split(":")[1]                
-                self.players_data[name] = int(points)
+        if self.journal is not None:
+            # Opens the journal off the game loop, before the first point is recorded.
+            self.journal.start()
+
+    def record_points(self, name, points):
+        """
+        Sets a player's points without waiting for the disk.
+        """
+        if self.journal is not None:
+            self.journal.record(name, points)
+        else:
+            self.players_data[name] = points
 
     def save_data(self):
+        """
+        Writes a full snapshot: in the background with a journal, otherwise right away.
+        """
         try:
-            with open(SAVE_FILENAME,"w") as save_file:
-                for player in self.players_data:
-                    save_file.write("{0}:{1}\n".format(player,self.players_data[player]))
+            if self.journal is not None:
+                self.journal.request_compaction()
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.players_data.save()
         except Exception as e:
             print(e)
 
+    def close(self):
+        """
+        Flushes and syncs every pending score (call on exit).
+        """
+        if self.journal is not None:
+            self.journal.close()
+
     def reset(self):
-        self.players_data = {}
+        if self.journal is not None:
+            self.journal.reset()
+        else:
+            self.players_data.clear()
         self.is_new_game = True
-            
\ No newline at end of file
@@ -0,0 +1,206 @@
+import os
+from bisect import bisect_left, insort
+from collections.abc import MutableMapping
+
+# First line of a leaderboard file; files without it use the legacy unsorted "name:points" format.
+LEADERBOARD_HEADER = "# pong leaderboard v1\n"
+# Optional second line: generation of the score journal the file was compacted from.
+GENERATION_PREFIX = "# generation "
+
+class Leaderboard(MutableMapping):
+    """
+    Player points with a name index (dict, O(1) lookup) and an ordered score
+    index (sorted list of (-points, name), O(log n) rank and O(log n + N) top-N).
+
+    The file is read lazily on first access. Saved files are sorted by score
+    behind LEADERBOARD_HEADER, so `top()` before the first full load only reads
+    the first lines of the file. Legacy "name:points" save files are read as
+    well and rewritten in the new format by the next `save()`.
+
+    An attached `journal` (see score_journal.ScoreJournal) is replayed on top of
+    the file when it is loaded.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        # Name index: mapping of player names to points.
+        self.points = {}
+        # Score index: (-points, name) in ascending order, i.e. best player first.
+        self.ranking = []
+        self.loaded = path is None
+        # Lines of the last file read that could not be parsed.
+        self.skipped_lines = 0
+        # Journal generation the file was compacted from.
+        self.generation = 0
+        self.journal = None
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def load(self):
+        """
+        Reads the whole file into both indexes, then replays the journal tail.
+        A missing file is an empty leaderboard.
+        """
+        points = {}
+        self.skipped_lines = 0
+        self.generation = 0
+        try:
+            with open(self.path, "r") as leaderboard_file:
+                for line in leaderboard_file:
+                    entry = parse_line(line)
+                    if entry is None:
+                        if line.startswith(GENERATION_PREFIX):
+                            self.generation = parse_generation(line)
+                        elif line.strip() and line != LEADERBOARD_HEADER:
+                            self.skipped_lines += 1
+                        continue
+                    points[entry[0]] = entry[1]
+        except FileNotFoundError:
+            pass
+        if self.journal is not None:
+            self.journal.replay(points, self.generation)
+        self.points = points
+        self.ranking = sorted((-player_points, name) for name, player_points in points.items())
+        self.loaded = True
+
+    def save(self, path=None):
+        """
+        Writes every player sorted by score, replacing the file atomically.
+        With a journal attached, use its `request_compaction()` instead.
+        """
+        self.ensure_loaded()
+        write_leaderboard(path or self.path, self.ranking, self.generation)
+
+    def __getitem__(self, name):
+        self.ensure_loaded()
+        return self.points[name]
+
+    def __setitem__(self, name, points):
+        self.ensure_loaded()
+        if "\n" in name:
+            raise ValueError("player names cannot contain line breaks")
+        points = int(points)
+        old_points = self.points.get(name)
+        if old_points == points:
+            return
+        if old_points is not None:
+            self._unrank(name, old_points)
+        insort(self.ranking, (-points, name))
+        self.points[name] = points
+
+    def __delitem__(self, name):
+        self.ensure_loaded()
+        self._unrank(name, self.points.pop(name))
+
+    def __iter__(self):
+        self.ensure_loaded()
+        return iter(self.points)
+
+    def __len__(self):
+        self.ensure_loaded()
+        return len(self.points)
+
+    def __contains__(self, name):
+        self.ensure_loaded()
+        return name in self.points
+
+    def clear(self):
+        self.points = {}
+        self.ranking = []
+        self.loaded = True
+
+    def _unrank(self, name, points):
+        del self.ranking[bisect_left(self.ranking, (-points, name))]
+
+    def rank(self, name):
+        """
+        :return: 1-based rank of the player (tied players share the best rank),
+                 or None for unknown players.
+        """
+        self.ensure_loaded()
+        points = self.points.get(name)
+        if points is None:
+            return None
+        return bisect_left(self.ranking, (-points, "")) + 1
+
+    def top(self, count):
+        """
+        :return: List of (name, points) of the `count` best players.
+        """
+        if not self.loaded:
+            page = self._read_top_page(count)
+            if page is not None:
+                return page
+            self.load()
+        return [(name, -negative_points) for negative_points, name in self.ranking[:count]]
+
+    def page(self, start, count):
+        """
+        :return: List of (rank, name, points) for `count` players from 0-based position `start`.
+        """
+        self.ensure_loaded()
+        return [(self.rank(name), name, -negative_points)
+                for negative_points, name in self.ranking[start:start + count]]
+
+    def _read_top_page(self, count):
+        """
+        Reads only the first `count` players of a sorted file, without loading the indexes.
+
+        :return: The players, or None when the file is missing, in the legacy format
+                 or has journal entries on top.
+        """
+        if self.journal is not None and self.journal.has_tail():
+            return None
+        try:
+            with open(self.path, "r") as leaderboard_file:
+                if leaderboard_file.readline() != LEADERBOARD_HEADER:
+                    return None
+                page = []
+                for line in leaderboard_file:
+                    if len(page) >= count:
+                        break
+                    entry = parse_line(line)
+                    if entry is not None:
+                        page.append(entry)
+                return page
+        except FileNotFoundError:
+            return None
+
+def write_leaderboard(path, ranking, generation=0):
+    """
+    Writes a score index sorted by score and replaces `path` atomically: the data
+    is synced to disk before the rename, so a crash leaves the old or the new file.
+
+    :param ranking: Sorted list of (-points, name).
+    """
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w") as leaderboard_file:
+        leaderboard_file.write(LEADERBOARD_HEADER)
+        if generation:
+            leaderboard_file.write(f"{GENERATION_PREFIX}{generation}\n")
+        leaderboard_file.writelines(f"{name}:{-negative_points}\n"
+                                    for negative_points, name in ranking)
+        leaderboard_file.flush()
+        os.fsync(leaderboard_file.fileno())
+    os.replace(temporary_path, path)
+
+def parse_generation(line):
+    try:
+        return int(line[len(GENERATION_PREFIX):])
+    except ValueError:
+        return 0
+
+def parse_line(line):
+    """
+    Parses a "name:points" line (the name may itself contain colons).
+
+    :return: Tuple of (name, points), or None for malformed lines.
+    """
+    name, separator, points = line.rstrip("\n").rpartition(":")
+    if not separator or not name:
+        return None
+    try:
+        return name, int(points)
+    except ValueError:
+        return None
@@ -0,0 +1,190 @@
+import time
+
+# Weight of a new sample in the smoothed round-trip time (TCP's SRTT gain).
+RTT_GAIN = 0.125
+# Pings still unanswered after this many seconds are counted as lost.
+PING_TIMEOUT = 1.0
+# Sequences older than the acknowledged one that an ACK reports on.
+ACK_WINDOW = 32
+# Sequences a ReceiveWindow remembers: the ACK window, plus room for an
+# acknowledged sequence that is behind the newest one received.
+_RECEIVE_MASK = (1 << (2 * ACK_WINDOW)) - 1
+
+class PingTracker:
+    """
+    Round-trip time of one link, measured with PING/PONG exchanges: `ping()`
+    stamps a sequence with the clock, `pong()` turns the echo into a sample.
+    """
+    __slots__ = ("clock", "timeout", "pending", "next_sequence", "rtt", "rtt_min", "lost", "on_sample")
+
+    def __init__(self, clock=time.monotonic, timeout=PING_TIMEOUT, on_sample=None):
+        self.clock = clock
+        self.timeout = timeout
+        # Mapping of ping sequences in flight to the time they were sent.
+        self.pending = {}
+        self.next_sequence = 0
+        # Smoothed and smallest round-trip time in seconds (None before the first sample).
+        self.rtt = None
+        self.rtt_min = None
+        self.lost = 0
+        # Optional `on_sample(seconds)` callback, e.g. a metrics histogram's `observe`.
+        self.on_sample = on_sample
+
+    def ping(self):
+        """
+        Starts a measurement; pings unanswered for longer than `timeout` are dropped.
+
+        :return: Tuple of (16-bit ping sequence to send, pings that timed out).
+        """
+        now = self.clock()
+        expired = [sequence for sequence, sent in self.pending.items() if now - sent > self.timeout]
+        for sequence in expired:
+            del self.pending[sequence]
+        self.lost += len(expired)
+        sequence = self.next_sequence
+        self.next_sequence = (sequence + 1) & 0xFFFF
+        self.pending[sequence] = now
+        return sequence, len(expired)
+
+    def pong(self, sequence):
+        """
+        :return: The round-trip time of the echoed ping, or None for unknown or expired sequences.
+        """
+        sent = self.pending.pop(sequence, None)
+        if sent is None:
+            return None
+        sample = self.clock() - sent
+        self.rtt = sample if self.rtt is None else self.rtt + RTT_GAIN * (sample - self.rtt)
+        if self.rtt_min is None or sample < self.rtt_min:
+            self.rtt_min = sample
+        if self.on_sample is not None:
+            self.on_sample(sample)
+        return sample
+
+class LossCounter:
+    """
+    Packets of one stream known to be delivered or lost, in total and since the
+    last `take_loss()`, which is the window a rate decision is based on.
+    """
+    __slots__ = ("received", "lost", "window_received", "window_lost")
+
+    def __init__(self):
+        self.received = 0
+        self.lost = 0
+        self.window_received = 0
+        self.window_lost = 0
+
+    def record(self, received, lost=0):
+        self.received += received
+        self.lost += lost
+        self.window_received += received
+        self.window_lost += lost
+
+    def take_loss(self):
+        """
+        :return: Loss ratio since the previous call, or None when nothing was counted.
+        """
+        lost = self.window_lost
+        total = self.window_received + lost
+        self.window_received = self.window_lost = 0
+        return lost / total if total else None
+
+    @property
+    def loss(self):
+        """
+        Loss ratio since the stream started (0.0 before anything was counted).
+        """
+        total = self.received + self.lost
+        return self.lost / total if total else 0.0
+
+class ReceiveWindow:
+    """
+    Receiver side of the ACK field: remembers which of the recent 8-bit
+    sequences arrived, so an ACK can report the ACK_WINDOW sequences before
+    the one it acknowledges as a bitmask (bit i set: sequence - 1 - i arrived).
+    """
+    __slots__ = ("newest", "mask")
+
+    def __init__(self):
+        self.newest = None
+        # Bit i set when sequence `newest - i` arrived.
+        self.mask = 0
+
+    def note(self, sequence):
+        if self.newest is None:
+            self.newest = sequence
+            self.mask = 1
+            return
+        distance = (sequence - self.newest) & 0xFF
+        if distance == 0:
+            return
+        if distance < 128:
+            self.mask = ((self.mask << distance) | 1) & _RECEIVE_MASK
+            self.newest = sequence
+        else:
+            # A late packet: set its bit, if still remembered.
+            self.mask |= (1 << (256 - distance)) & _RECEIVE_MASK
+
+    def ack_bits(self, sequence):
+        """
+        :return: Bitmask of the ACK_WINDOW sequences before `sequence` that arrived.
+        """
+        if self.newest is None:
+            return 0
+        behind = (self.newest - sequence) & 0xFF
+        if behind >= 128:
+            return 0
+        return (self.mask >> (behind + 1)) & ((1 << ACK_WINDOW) - 1)
+
+class AdaptiveRate:
+    """
+    Send interval of one link, in frames or ticks between two sends, kept
+    between `min_interval` (full rate) and `max_interval`. Each `update()` is
+    one measurement window: the interval doubles when the link looks congested
+    (loss above `max_loss` or round-trip time above `max_rtt`) and shrinks by
+    one after `recover_after` healthy windows in a row, so a link backs off
+    fast and probes back towards full rate slowly.
+    """
+    __slots__ = ("min_interval", "max_interval", "max_loss", "max_rtt", "recover_after",
+                 "interval", "countdown", "healthy_windows", "backoffs")
+
+    def __init__(self, min_interval=1, max_interval=4, max_loss=0.1, max_rtt=0.25, recover_after=2):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_loss = max_loss
+        self.max_rtt = max_rtt
+        self.recover_after = recover_after
+        self.interval = min_interval
+        self.countdown = 0
+        self.healthy_windows = 0
+        self.backoffs = 0
+
+    def update(self, rtt=None, loss=None):
+        """
+        Adapts the interval to a window's round-trip time and loss ratio (None: unknown).
+
+        :return: The new interval.
+        """
+        if (loss is not None and loss > self.max_loss) or (rtt is not None and rtt > self.max_rtt):
+            if self.interval < self.max_interval:
+                self.interval = min(self.interval * 2, self.max_interval)
+                self.backoffs += 1
+            self.healthy_windows = 0
+        else:
+            self.healthy_windows += 1
+            if self.healthy_windows >= self.recover_after:
+                self.interval = max(self.interval - 1, self.min_interval)
+                self.healthy_windows = 0
+        return self.interval
+
+    def due(self):
+        """
+        Counts one send opportunity.
+
+        :return: True on every `interval`-th call.
+        """
+        if self.countdown > 0:
+            self.countdown -= 1
+            return False
+        self.countdown = self.interval - 1
+        return True
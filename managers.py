@@ -1,4 +1,19 @@
-import pyxel
+import math
+import time
+from itertools import compress
+from operator import attrgetter, ne
+from pong_core import Field
+
+# Cost of restoring one dirty rectangle from the render cache, in object draws; the
+# change-driven renderer redraws the whole frame when restoring would cost more.
+RESTORE_COST = 8
+# Dirty rectangles above which the whole frame is redrawn.
+MAX_DIRTY_RECTS = 16
+# Frames redrawn whole without looking for changes after a frame with too many of
+# them, so busy scenes do not pay for change detection every frame.
+BUSY_FRAMES = 8
+# Bounding rectangle (x, y, width, height) of a rendered object.
+object_rect = attrgetter("x", "y", "width", "height")
 
 class BaseManager:
     """
@@ -6,6 +21,10 @@ class BaseManager:
     """
     def __init__(self):
         self.managed_objects = []
+        # Column stores (see entities.EntityColumns) handled as a whole after the objects.
+        self.column_stores = []
+        # Optional `timer(obj, seconds)` called after each object is handled (profiling).
+        self.object_timer = None
 
     def manage(self):
         """
@@ -19,12 +38,38 @@ class BaseManager:
         """
         self.managed_objects.append(obj)
 
+    def unregister_object(self, obj):
+        """
+        Removes an object registered with `register_object`, if it is.
+        """
+        if obj in self.managed_objects:
+            self.managed_objects.remove(obj)
+
+    def register_columns(self, store):
+        """
+        Registers a column store of many entities, handled with one call per frame.
+        """
+        self.column_stores.append(store)
+
+    def manage_timed(self, method_name):
+        """
+        Calls `method_name` on every object and reports each duration to `object_timer`.
+        """
+        clock = time.perf_counter
+        timer = self.object_timer
+        for obj in self.managed_objects:
+            start = clock()
+            getattr(obj, method_name)()
+            timer(obj, clock() - start)
+
 class PhysicsManager(BaseManager):
     """
     Manages physics calculations like collision detection and boundary checks.
+    Borders come from the injected `field` instead of the graphics engine.
     """
-    def __init__(self):
+    def __init__(self, field=None):
         super().__init__()
+        self.field = field if field is not None else Field()
 
     def manage(self):
         """
@@ -38,6 +83,14 @@ class PhysicsManager(BaseManager):
                 if self.check_collisions(self.managed_objects[i], self.managed_objects[j]):
                     self.managed_objects[i].on_collide(self.managed_objects[j])
                     self.managed_objects[j].on_collide(self.managed_objects[i])
+        self.manage_columns()
+
+    def manage_columns(self):
+        """
+        Bounces the entities of the column stores off the borders and the registered objects.
+        """
+        for store in self.column_stores:
+            store.physics(self.managed_objects)
 
     def check_collisions(self, obj1, obj2):
         """
@@ -52,12 +105,103 @@ class PhysicsManager(BaseManager):
         """
         Detects out-of-bounds collisions with screen borders.
         """
-        if obj.y >= pyxel.height - obj.height or obj.y <= 0:
+        if obj.y >= self.field.height - obj.height or obj.y <= 0:
             obj.on_out_of_bounds(True)  # Vertical boundaries
         
-        if obj.x >= pyxel.width - obj.width or obj.x <= 0:
+        if obj.x >= self.field.width - obj.width or obj.x <= 0:
             obj.on_out_of_bounds(False)  # Horizontal boundaries
 
+class GridPhysicsManager(PhysicsManager):
+    """
+    PhysicsManager with a uniform-grid (spatial hash) broadphase.
+    Only objects sharing a grid cell are tested with `check_collisions`, so cost
+    grows with the number of nearby objects instead of with every pair.
+    The grid is updated incrementally: an object is re-bucketed only when the
+    range of cells it covers changes.
+    """
+    def __init__(self, cell_size=20, field=None):
+        super().__init__(field)
+        self.cell_size = cell_size
+        # Mapping of (cell_x, cell_y) to the set of object indexes inside the cell.
+        self.grid = {}
+        # Cell range (min_x, min_y, max_x, max_y) currently stored for each object index.
+        self.object_cells = []
+
+    def cell_range(self, obj):
+        """
+        Returns the inclusive range of cells covered by the object's bounding box.
+        """
+        cell_size = self.cell_size
+        return (int(obj.x // cell_size), int(obj.y // cell_size),
+                int((obj.x + obj.width) // cell_size), int((obj.y + obj.height) // cell_size))
+
+    def unregister_object(self, obj):
+        """
+        Removes an object and drops the grid, which is keyed by list index: the
+        objects after it moved down one place. The next `manage()` rebuilds it.
+        """
+        if obj in self.managed_objects:
+            self.managed_objects.remove(obj)
+            self.grid = {}
+            self.object_cells = []
+
+    def update_grid(self):
+        """
+        Re-buckets objects whose cell range changed since the last frame.
+        """
+        grid = self.grid
+        for index, obj in enumerate(self.managed_objects):
+            new_range = self.cell_range(obj)
+            if index < len(self.object_cells):
+                old_range = self.object_cells[index]
+                if old_range == new_range:
+                    continue
+                min_x, min_y, max_x, max_y = old_range
+                for cell_x in range(min_x, max_x + 1):
+                    for cell_y in range(min_y, max_y + 1):
+                        cell = grid[(cell_x, cell_y)]
+                        cell.discard(index)
+                        if not cell:
+                            del grid[(cell_x, cell_y)]
+                self.object_cells[index] = new_range
+            else:
+                self.object_cells.append(new_range)
+            min_x, min_y, max_x, max_y = new_range
+            for cell_x in range(min_x, max_x + 1):
+                for cell_y in range(min_y, max_y + 1):
+                    grid.setdefault((cell_x, cell_y), set()).add(index)
+
+    def candidate_pairs(self):
+        """
+        Returns, for each object index, the sorted indexes after it that share a cell.
+        """
+        candidates = {}
+        for cell in self.grid.values():
+            if len(cell) < 2:
+                continue
+            members = sorted(cell)
+            for position, i in enumerate(members):
+                partners = candidates.setdefault(i, set())
+                partners.update(members[position + 1:])
+        return {i: sorted(partners) for i, partners in candidates.items()}
+
+    def manage(self):
+        """
+        Runs border checks for all registered objects and collision detection for
+        the pairs found by the grid, in the same order as PhysicsManager.manage.
+        """
+        self.update_grid()
+        candidates = self.candidate_pairs()
+        objects = self.managed_objects
+
+        for i in range(len(objects)):
+            self.check_borders(objects[i])
+            for j in candidates.get(i, ()):
+                if self.check_collisions(objects[i], objects[j]):
+                    objects[i].on_collide(objects[j])
+                    objects[j].on_collide(objects[i])
+        self.manage_columns()
+
 class TickManager(BaseManager):
     """
     Updates registered objects each game frame.
@@ -67,24 +211,155 @@ class TickManager(BaseManager):
 
     def manage(self):
         """
-        Calls the `tick()` method for every registered object.
+        Calls the `tick()` method for every registered object and column store.
         """
-        for obj in self.managed_objects:
-            obj.tick()
+        if self.object_timer is not None:
+            self.manage_timed("tick")
+        else:
+            for obj in self.managed_objects:
+                obj.tick()
+        for store in self.column_stores:
+            store.tick()
 
 class RenderManager(BaseManager):
     """
     Draws registered objects on the screen.
+
+    With a `render_cache` (see render_cache.RenderCache) the screen is not cleared
+    every frame: the cache holds the background and HUD labels, objects update
+    their labels through `update_hud(cache)` and draw themselves with
+    `render_sprite()`. Only the rectangles that changed since the last frame (moved
+    objects, changed labels) are restored from the cache and the objects touching
+    them redrawn; frames where nothing changed draw nothing at all.
     """
-    def __init__(self):
+    def __init__(self, render_cache=None):
         super().__init__()
+        self.render_cache = render_cache
+        # Objects with HUD labels (an `update_hud` method).
+        self.hud_objects = []
+        # Redraw the whole frame every time, e.g. under an overlay drawn on top.
+        self.full_redraw = False
+        # Rectangle (x, y, w, h) each object was last drawn at.
+        self.drawn_rects = None
+        # Remaining frames to redraw whole without change detection.
+        self.busy_frames = 0
+        # Frame counters of the change-driven renderer.
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.skipped_frames = 0
+
+    def register_object(self, obj):
+        super().register_object(obj)
+        if hasattr(obj, "update_hud"):
+            self.hud_objects.append(obj)
+
+    def unregister_object(self, obj):
+        super().unregister_object(obj)
+        if obj in self.hud_objects:
+            self.hud_objects.remove(obj)
+            if self.render_cache is not None:
+                self.render_cache.remove_label(obj)
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Forces a full redraw on the next frame.
+        """
+        self.drawn_rects = None
 
     def manage(self):
         """
-        Calls the `render()` method for every registered object.
+        Calls the `render()` method for every registered object and column store.
         """
-        for obj in self.managed_objects:
-            obj.render()
+        if self.render_cache is not None:
+            self.manage_cached(self.render_cache)
+            return
+        if self.object_timer is not None:
+            self.manage_timed("render")
+        else:
+            for obj in self.managed_objects:
+                obj.render()
+        for store in self.column_stores:
+            store.render()
+
+    def manage_cached(self, cache):
+        """
+        Change-driven redraw over the cached background.
+        """
+        for obj in self.hud_objects:
+            obj.update_hud(cache)
+        if self.busy_frames or any(store.changed for store in self.column_stores):
+            # Moving column stores are drawn with the whole frame
+            self.busy_frames = max(self.busy_frames - 1, 0)
+            cache.dirty_rects = []
+            self.drawn_rects = None
+            self.redraw_all(cache)
+            return
+        objects = self.managed_objects
+        rects = list(map(object_rect, objects))
+        drawn_rects = self.drawn_rects
+        dirty = cache.dirty_rects
+        cache.dirty_rects = []
+        self.drawn_rects = rects
+
+        if self.full_redraw or drawn_rects is None or len(drawn_rects) != len(rects):
+            self.redraw_all(cache)
+            return
+        if rects == drawn_rects:
+            if not dirty:
+                self.skipped_frames += 1
+                return
+            changed = ()
+        else:
+            changed = list(compress(range(len(rects)), map(ne, rects, drawn_rects)))
+        dirty_count = len(dirty) + 2 * len(changed)
+        # Column stores are not tracked per entity, so a restored rectangle could erase them.
+        if (dirty_count > MAX_DIRTY_RECTS or dirty_count * RESTORE_COST > len(objects)
+                or self.column_stores):
+            if changed:
+                self.busy_frames = BUSY_FRAMES
+            self.redraw_all(cache)
+            return
+        for index in changed:
+            dirty.append(pixel_rect(*drawn_rects[index]))
+            dirty.append(pixel_rect(*rects[index]))
+
+        if cache.rebuild_needed:
+            cache.rebuild()
+        for rect in dirty:
+            cache.restore(*rect)
+        # Redraw, in registration order, every object touching a restored rectangle.
+        left = min(x for x, _, _, _ in dirty)
+        top = min(y for _, y, _, _ in dirty)
+        right = max(x + w for x, _, w, _ in dirty)
+        bottom = max(y + h for _, y, _, h in dirty)
+        for obj, (x, y, w, h) in zip(objects, rects):
+            if x >= right or x + w <= left or y >= bottom or y + h <= top:
+                continue
+            for dirty_x, dirty_y, dirty_w, dirty_h in dirty:
+                if x < dirty_x + dirty_w and dirty_x < x + w and y < dirty_y + dirty_h and dirty_y < y + h:
+                    obj.render_sprite()
+                    break
+        self.partial_frames += 1
+
+    def redraw_all(self, cache):
+        cache.draw_background()
+        if self.object_timer is not None:
+            self.manage_timed("render_sprite")
+        else:
+            for obj in self.managed_objects:
+                obj.render_sprite()
+        for store in self.column_stores:
+            store.render()
+        self.full_frames += 1
+
+def pixel_rect(x, y, w, h):
+    """
+    Whole-pixel rectangle covering a rectangle with fractional coordinates.
+    """
+    left = math.floor(x)
+    top = math.floor(y)
+    return (left, top, math.ceil(x + w) - left, math.ceil(y + h) - top)
 
 class PointsManager(BaseManager):
     """
@@ -99,7 +374,7 @@ class PointsManager(BaseManager):
     def add_points_to_player(self, player):
         """
         Increments the player's score and updates the save data.
+        The save data is written behind by the score journal, off the game loop.
         """
-        print(f"Point added to {player.name}")  # Debug print
         player.points += 1
-        self.game_save.players_data[player.name] = player.points
+        self.game_save.record_points(player.name, player.points)
@@ -0,0 +1,229 @@
+"""
+Binary packet capture and deterministic replay of server sessions.
+
+A capture file starts with CAPTURE_MAGIC and the SETTINGS_STRUCT header (the
+server's tick rate and ball step, which the replay's MatchMaker is built with),
+followed by records of a fixed
+RECORD_STRUCT header (seconds since the capture started, record kind, IPv4
+address, port, payload length) and the payload. Inbound and outbound datagrams
+are recorded as they pass through the socket; the server also records each run
+of simulation ticks, so a replay steps the matches at exactly the same points
+between datagrams and produces the same outbound packets.
+
+Usage:
+  python packet_capture.py replay session.cap [--realtime] [--repeat 5]
+  python packet_capture.py info session.cap
+"""
+import argparse
+import mmap
+import socket
+import struct
+import time
+import zlib
+
+import pong_server
+from pong_global import PacketType
+
+CAPTURE_MAGIC = b"PONGCAP2"
+# Captures from before the settings header, replayed with the server defaults.
+LEGACY_MAGIC = b"PONGCAP1"
+# Settings header: tick rate in Hz and ball pixels per tick (0: unknown, e.g. a client capture).
+SETTINGS_STRUCT = struct.Struct(">HH")
+# Record header: timestamp, kind, IPv4 address, port, payload length.
+RECORD_STRUCT = struct.Struct(">dB4sHH")
+# TICK payload: ticks stepped, whether a snapshot was broadcast.
+TICK_STRUCT = struct.Struct(">BB")
+RECORD_IN = 0
+RECORD_OUT = 1
+RECORD_TICK = 2
+NO_ADDRESS = ("0.0.0.0", 0)
+# Outbound packets whose content depends on wall-clock time, left out of replay checks.
+NONDETERMINISTIC_TYPES = {int(PacketType.STATS)}
+_pack_record = RECORD_STRUCT.pack
+_unpack_record_from = RECORD_STRUCT.unpack_from
+_RECORD_LENGTH = RECORD_STRUCT.size
+
+class PacketRecorder:
+    """
+    Appends datagrams and tick runs to a capture file through a large write buffer,
+    so recording costs one header pack and a memory copy per packet.
+    """
+    def __init__(self, path, buffer_size=1 << 16, clock=time.monotonic, tick_rate=0, ball_step=0):
+        self.capture_file = open(path, "wb", buffering=buffer_size)
+        self.capture_file.write(CAPTURE_MAGIC)
+        self.capture_file.write(SETTINGS_STRUCT.pack(tick_rate, ball_step))
+        self.clock = clock
+        self.start = clock()
+        self.records = 0
+        # Packed IPv4 addresses by address string.
+        self.packed_hosts = {}
+
+    def record(self, kind, address, data):
+        host, port = address[0], address[1]
+        packed_host = self.packed_hosts.get(host)
+        if packed_host is None:
+            try:
+                packed_host = socket.inet_aton(host)
+            except OSError:
+                # Not a dotted IPv4 address (e.g. "localhost").
+                packed_host = socket.inet_aton(socket.gethostbyname(host))
+            self.packed_hosts[host] = packed_host
+        write = self.capture_file.write
+        write(_pack_record(self.clock() - self.start, kind, packed_host, port, len(data)))
+        write(data)
+        self.records += 1
+
+    def record_ticks(self, ticks, broadcast):
+        self.record(RECORD_TICK, NO_ADDRESS, TICK_STRUCT.pack(ticks, broadcast))
+
+    def flush(self):
+        self.capture_file.flush()
+
+    def close(self):
+        self.capture_file.close()
+
+class RecordingSocket:
+    """
+    Socket wrapper recording every datagram received and sent.
+    Everything else (fileno for select, close, getsockname...) goes to the wrapped socket.
+    """
+    def __init__(self, wrapped_socket, recorder):
+        self.wrapped_socket = wrapped_socket
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped_socket, name)
+
+    def recvfrom(self, bufsize):
+        data, address = self.wrapped_socket.recvfrom(bufsize)
+        self.recorder.record(RECORD_IN, address, data)
+        return data, address
+
+    def sendto(self, data, address):
+        self.recorder.record(RECORD_OUT, address, data)
+        return self.wrapped_socket.sendto(data, address)
+
+def read_capture(path):
+    """
+    Reads a whole capture through a memory map.
+
+    :return: Tuple of (settings, records): a dict of the recorded "tick_rate"
+             and "ball_step" (None when unknown), and a list of
+             (timestamp, kind, address, payload) records.
+    """
+    records = []
+    settings = {"tick_rate": None, "ball_step": None}
+    with open(path, "rb") as capture_file, \
+            mmap.mmap(capture_file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        magic = view[:len(CAPTURE_MAGIC)]
+        offset = len(CAPTURE_MAGIC)
+        if magic == CAPTURE_MAGIC:
+            tick_rate, ball_step = SETTINGS_STRUCT.unpack_from(view, offset)
+            settings = {"tick_rate": tick_rate or None, "ball_step": ball_step or None}
+            offset += SETTINGS_STRUCT.size
+        elif magic != LEGACY_MAGIC:
+            raise ValueError(f"{path} is not a packet capture")
+        end = len(view)
+        hosts = {}
+        while offset + _RECORD_LENGTH <= end:
+            timestamp, kind, packed_host, port, length = _unpack_record_from(view, offset)
+            offset += _RECORD_LENGTH
+            if offset + length > end:
+                # Truncated last record (the recorder was killed mid-write).
+                break
+            host = hosts.get(packed_host)
+            if host is None:
+                host = hosts[packed_host] = socket.inet_ntoa(packed_host)
+            records.append((timestamp, kind, (host, port), view[offset:offset + length]))
+            offset += length
+    return settings, records
+
+class ReplaySocket:
+    """
+    Socket stand-in collecting the datagrams the server logic sends during a replay.
+    """
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, address):
+        self.sent.append((bytes(data), address))
+
+def output_digest(packets):
+    """
+    CRC32 over the deterministic outbound packets, in order.
+    """
+    digest = 0
+    count = 0
+    for data, address in packets:
+        if data and data[0] in NONDETERMINISTIC_TYPES:
+            continue
+        digest = zlib.crc32(data, zlib.crc32(f"{address[0]}:{address[1]}".encode(), digest))
+        count += 1
+    return digest, count
+
+def replay(records, realtime=False, match_maker=None, tick_rate=None, ball_step=None):
+    """
+    Feeds the inbound datagrams and tick runs of a capture through the server logic.
+
+    :param realtime: Wait for each record's timestamp instead of replaying at full speed.
+    :param tick_rate: Tick rate and ball step of the recorded server (see `read_capture`),
+    :param ball_step: used for the MatchMaker created when none is given.
+    :return: Tuple of (ReplaySocket holding the regenerated outbound packets, seconds taken).
+    """
+    if match_maker is None:
+        match_maker = pong_server.MatchMaker(ball_step=ball_step or 1,
+                                             tick_rate=tick_rate or pong_server.TICK_RATE)
+    replay_socket = ReplaySocket()
+    handle_packet = pong_server.handle_packet
+    tick_matches = pong_server.tick_matches
+    start = time.perf_counter()
+    for timestamp, kind, address, data in records:
+        if realtime:
+            delay = timestamp - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        if kind == RECORD_IN:
+            try:
+                handle_packet(replay_socket, data, address, match_maker)
+            except (struct.error, IndexError):
+                pass
+        elif kind == RECORD_TICK:
+            ticks, broadcast = TICK_STRUCT.unpack(data)
+            tick_matches(replay_socket, match_maker, ticks, bool(broadcast))
+    return replay_socket, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["replay", "info"])
+    parser.add_argument("path")
+    parser.add_argument("--realtime", action="store_true", help="keep the recorded timing")
+    parser.add_argument("--repeat", type=int, default=1, help="replays to time (best is reported)")
+    args = parser.parse_args()
+
+    pong_server.DEBUG_MODE = False
+    settings, records = read_capture(args.path)
+    inbound = sum(kind == RECORD_IN for _, kind, _, _ in records)
+    ticks = sum(TICK_STRUCT.unpack(data)[0] for _, kind, _, data in records if kind == RECORD_TICK)
+    recorded = [(bytes(data), address) for _, kind, address, data in records if kind == RECORD_OUT]
+    duration = records[-1][0] if records else 0.0
+    print(f"{args.path}: {len(records)} records over {duration:.1f} s, {inbound} inbound, "
+          f"{len(recorded)} outbound, {ticks} ticks")
+    if settings["tick_rate"] is not None:
+        print(f"recorded at {settings['tick_rate']} Hz, ball step {settings['ball_step']} px/tick")
+    if args.command == "info":
+        return
+
+    recorded_digest = output_digest(recorded)
+    best = None
+    for _ in range(args.repeat):
+        replay_socket, elapsed = replay(records, args.realtime, tick_rate=settings["tick_rate"],
+                                        ball_step=settings["ball_step"])
+        best = elapsed if best is None else min(best, elapsed)
+        if output_digest(replay_socket.sent) != recorded_digest:
+            raise SystemExit("Replay diverged: outbound packets differ from the capture")
+    print(f"replay matches the capture ({recorded_digest[1]} outbound packets), "
+          f"best {best * 1000:.1f} ms, {inbound / best:,.0f} inbound packets/s, "
+          f"{ticks / best:,.0f} ticks/s")
+
+if __name__ == "__main__":
+    main()
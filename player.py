@@ -1,19 +1,29 @@
 import pyxel
 from enum import Enum
+from pong_core import Field, move_paddle
 
 class PlayerType(Enum):
     LEFT = 1
     RIGHT = 2
 
 class PlayerBase:
-    def __init__(self, x, y, up, down, name, remote):
+    __slots__ = ("field", "input_source", "x", "y_origin", "y", "up", "down", "height", "width",
+                 "name", "points", "position_packet_counter", "remote", "player_type")
+    # Screen position of the player's score, for players showing one.
+    hud_position = None
+
+    def __init__(self, x, y, up, down, name, remote, field=None, input_source=None):
+        # Field bounds the paddle moves in.
+        self.field = field if field is not None else Field()
+        # Anything with a pyxel-style `btnp(key)`; pyxel itself by default.
+        self.input_source = input_source if input_source is not None else pyxel
         self.x = x
         self.y_origin = y
         self.y = y
         self.up = up
         self.down = down
-        self.height = 40
-        self.width = 10
+        self.height = self.field.paddle_height
+        self.width = self.field.paddle_width
         self.name = name
         self.points = 0
         self.position_packet_counter = 0
@@ -21,22 +31,23 @@ class PlayerBase:
 
     def tick(self):
         #move player up and down, unless it results in going out of bounds
-        if pyxel.btnp(self.up):
-           if self.y > (0):   
-              self.y = (self.y - 10) % pyxel.height
-              
-              
-        if pyxel.btnp(self.down):
-           if self.y < (pyxel.height - self.height):
-               self.y = (self.y + 10) % pyxel.height
-        
+        self.y = move_paddle(self.y, self.input_source.btnp(self.up),
+                             self.input_source.btnp(self.down), self.field)
 
     def render(self):
+        self.render_sprite()
+
+    def render_sprite(self):
         pyxel.rect(self.x,self.y,self.width,self.height,7)
 
     def render_points(self,x,y):
         pyxel.text(x,y,f"{self.name}: {self.points}",5)
 
+    def update_hud(self, cache):
+        # Cached score label, only re-rasterized when the name or points change
+        if not self.remote and self.hud_position is not None:
+            cache.label(self, *self.hud_position, 5, "{}: {}", self.name, self.points)
+
     def register_to_managers(self, managers):
         for manager in managers:
             manager.register_object(self)
@@ -53,8 +64,11 @@ class PlayerBase:
         
     
 class LeftPlayer(PlayerBase):
-    def __init__(self, x,y,up_command,down_command, name, remote):
-        super().__init__(x,y,up_command,down_command, name, remote)
+    __slots__ = ()
+    hud_position = (10, 10)
+
+    def __init__(self, x,y,up_command,down_command, name, remote, field=None, input_source=None):
+        super().__init__(x,y,up_command,down_command, name, remote, field, input_source)
         self.player_type = PlayerType.LEFT
 
     def tick(self):
@@ -63,13 +77,16 @@ class LeftPlayer(PlayerBase):
     def render(self):
         super().render()
         if not self.remote:
-            self.render_points(10,10)
+            self.render_points(*self.hud_position)
     
 
 
 class RightPlayer(PlayerBase):
-    def __init__(self, x,y,up_command,down_command, name, remote):
-        super().__init__(x,y,up_command,down_command, name, remote)
+    __slots__ = ()
+    hud_position = (100, 10)
+
+    def __init__(self, x,y,up_command,down_command, name, remote, field=None, input_source=None):
+        super().__init__(x,y,up_command,down_command, name, remote, field, input_source)
         self.player_type = PlayerType.RIGHT
 
     def tick(self):        
@@ -78,4 +95,4 @@ class RightPlayer(PlayerBase):
     def render(self):
         super().render()
         if not self.remote:
-            self.render_points(100,10)
\ No newline at end of file
+            self.render_points(*self.hud_position)
\ No newline at end of file
@@ -1,45 +1,109 @@
+import argparse
 import pyxel
 import player
 import ball
 from game_save import GameSave
 from managers import PointsManager, PhysicsManager, TickManager, RenderManager
+from pong_core import Field, NullInput
+from frame_profiler import FrameProfiler
+from render_cache import RenderCache
 from enums import MyEnum
 import pong_client
 
+# Key toggling the frame-time overlay
+PROFILER_KEY = pyxel.KEY_F1
+
 class GameApp:
-    def __init__(self, game_width, game_height):
-        # Initialize game managers
+    def __init__(self, game_width, game_height, headless=False, capture_path=None,
+                 server_address=None, spectate=None, render_cache=False):
+        # Field dimensions shared by the game logic and the renderer
+        self.field = Field(game_width, game_height)
+
+        # Initialize game managers. With `render_cache` the renderer keeps the background and
+        # HUD in a cached layer and only redraws what changed; that only pays off in mostly
+        # still scenes (the ball moves every frame of a match), so it is off by default
         self.tick_manager = TickManager()
-        self.render_manager = RenderManager()
-        
+        self.render_manager = RenderManager(RenderCache(game_width, game_height)
+                                            if render_cache and not headless else None)
+
+        # Per-frame timing of the managers and the network step
+        self.profiler = FrameProfiler()
+        self.show_profiler = False
+        self.headless = headless
+
         # Create client for multiplayer functionality
-        self.client = pong_client.PongClient(self.tick_manager, self.render_manager)
+        self.client = pong_client.PongClient(self.tick_manager, self.render_manager, field=self.field,
+                                             input_source=NullInput() if headless else None,
+                                             capture_path=capture_path, server_address=server_address,
+                                             spectate=spectate)
 
+        if headless:
+            # Without a window only the game logic and networking run (see run_headless)
+            return
         # Initialize pyxel game engine with specified dimensions
-        pyxel.init(game_width, game_height)
+        pyxel.init(self.field.width, self.field.height)
         pyxel.run(self.tick, self.render)
 
     def tick(self):
         """Update game state each frame"""
-        self.tick_manager.manage()
-        self.client.run_client()
-        
+        profiler = self.profiler
+        profiler.begin_frame()
+        profiler.measure("tick", self.tick_manager.manage)
+        profiler.measure("network", self.client.run_client)
+        if self.headless:
+            profiler.end_frame()
+            return
+
+        # Toggle the profiler overlay (and per-object timing with it)
+        if pyxel.btnp(PROFILER_KEY):
+            self.show_profiler = not self.show_profiler
+            object_timer = self.profiler.record_object if self.show_profiler else None
+            self.tick_manager.object_timer = object_timer
+            self.render_manager.object_timer = object_timer
+            # The overlay is drawn over the frame, so the whole frame is redrawn while it shows
+            self.render_manager.full_redraw = self.show_profiler
+            self.render_manager.invalidate()
+
         # Check for quit key press
         if pyxel.btnp(pyxel.KEY_Q):           
+           self.client.leave()
            pyxel.quit()
         
     def render(self):
         """Draw game elements to the screen"""
-        pyxel.cls(0)  # Clear screen with black background
-        self.render_manager.manage()
+        if self.render_manager.render_cache is None:
+            pyxel.cls(0)  # Clear screen with black background
+        self.profiler.measure("render", self.render_manager.manage)
+        if self.show_profiler:
+            self.render_profiler()
+        self.profiler.end_frame()
+
+    def render_profiler(self):
+        """Draw frame-time statistics and a graph of recent frame times"""
+        for index, line in enumerate(self.profiler.overlay_lines()):
+            pyxel.text(2, 20 + index * 7, line, 11)
+        # One column per recent frame, one pixel per millisecond, red above 16.7 ms
+        bottom = self.field.height - 1
+        for column, frame_time in enumerate(list(self.profiler.frame_times)[-self.field.width:]):
+            height = min(int(frame_time * 1000), 30)
+            pyxel.line(column, bottom, column, bottom - height, 8 if frame_time > 1 / 60 else 3)
+
+    def run_headless(self, frames, cprofile_frames=0):
+        """Run `frames` ticks without a window, optionally under cProfile for the first frames"""
+        self.tick_manager.object_timer = self.profiler.record_object
+        if cprofile_frames:
+            self.profiler.start_cprofile(cprofile_frames)
+        for _ in range(frames):
+            self.tick()
+        return self.profiler.summary()
 
     def save(self):
         """Save player stats to persistent storage"""
         # Create entries for players if they don't exist
         if self.player1.name not in self.game_save.players_data:
-            self.game_save.players_data[self.player1.name] = 0
+            self.game_save.record_points(self.player1.name, 0)
         if self.player2.name not in self.game_save.players_data:
-            self.game_save.players_data[self.player2.name] = 0
+            self.game_save.record_points(self.player2.name, 0)
         self.game_save.save_data()
 
     def reset(self):
@@ -53,16 +117,44 @@ class GameApp:
         """Load previously saved game data"""
         self.game_save.load_data()
         if not self.game_save.is_new_game:
-            # Extract player names and scores from saved data
-            names = list(self.game_save.players_data.keys())
-            points = list(self.game_save.players_data.values())
-            self.player1.name = names[0]
-            self.player2.name = names[1]
-            self.player1.points = points[0]
-            self.player2.points = points[1]
+            # Look up the current players' saved scores by name
+            for game_player in (self.player1, self.player2):
+                game_player.points = self.game_save.players_data.get(game_player.name, 0)
         else:
-            self.game_save.players_data = {}
+            self.game_save.players_data.clear()
+
+def parse_address(text):
+    """Parse "host:port" (host defaults to localhost)"""
+    host, _, port = text.rpartition(":")
+    return host or "localhost", int(port)
 
 if __name__ == "__main__":
-    # Create game instance with 160x120 resolution
-    GameApp(160, 120)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Pong client.")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without a window and dump a frame-time profile")
+    parser.add_argument("--frames", type=int, default=600, help="frames to run headless")
+    parser.add_argument("--profile", default="frame_profile.json", help="headless profile output")
+    parser.add_argument("--cprofile", type=int, default=0, metavar="N",
+                        help="also capture cProfile for the first N headless frames")
+    parser.add_argument("--capture", help="record every datagram to this packet capture file")
+    parser.add_argument("--server", type=parse_address, help="server (or spectator relay) host:port")
+    parser.add_argument("--spectate", type=int, metavar="MATCH",
+                        help="watch this match instead of playing, usually through a relay")
+    parser.add_argument("--render-cache", action="store_true",
+                        help="redraw only what changed over a cached background (faster in still scenes)")
+    args = parser.parse_args()
+    if args.headless:
+        app = GameApp(160, 120, headless=True, capture_path=args.capture,
+                      server_address=args.server, spectate=args.spectate)
+        app.run_headless(args.frames, args.cprofile)
+        app.client.leave()
+        if app.client.recorder is not None:
+            app.client.recorder.close()
+        app.profiler.dump(args.profile)
+        print(f"Frame profile of {args.frames} frames written to {args.profile}")
+        if args.cprofile:
+            print(app.profiler.cprofile_report())
+    else:
+        # Create game instance with 160x120 resolution
+        GameApp(160, 120, capture_path=args.capture, server_address=args.server, spectate=args.spectate,
+                render_cache=args.render_cache)
\ No newline at end of file
@@ -1,30 +1,68 @@
-import struct
 import socket
 import select
-import zlib
+import time
+import link_quality
+import pong_codec
 from pong_global import PacketType, ObjectType
+from snapshot_buffer import SnapshotBuffer
+from pong_core import Field, NullInput
 import player
 import ball
 import pyxel
 
+# Remote objects are drawn this many seconds in the past (0 disables interpolation).
+INTERPOLATION_DELAY = 0.1
+# Received samples kept per remote object.
+SNAPSHOT_BUFFER_DEPTH = 32
+# Longest time the last motion is extrapolated when updates stop arriving.
+MAX_EXTRAPOLATION = 0.2
+# Upper bound on datagrams read per frame, so a flood cannot stall rendering.
+MAX_DATAGRAMS_PER_FRAME = 256
+# Frames between two POSITION packets on a healthy link, and at most on a congested one.
+POSITION_UPDATE_MIN = 2
+POSITION_UPDATE_MAX = 8
+# Seconds between PINGs to the server; each one closes a send rate window.
+PING_INTERVAL = 0.5
+# A window is congested above this POSITION loss ratio or smoothed round-trip time (seconds).
+MAX_LOSS = 0.1
+MAX_RTT = 0.25
+# Seconds between the SUBSCRIBE packets keeping a spectator's subscription alive.
+SUBSCRIBE_INTERVAL = 1.0
+
 class PongClient:
     """
     Manages client-side networking for the Pong game.
     Handles registration with the server, processing incoming packets,
     and sending local player position updates.
+    With `spectate` set to a match ID, the client only watches that match:
+    it subscribes to `server_address` (a spectator relay, see pong_relay, or
+    the game server) and shows both players.
     """
-    def __init__(self, tick_manager, render_manager):
+    def __init__(self, tick_manager, render_manager, interpolation_delay=INTERPOLATION_DELAY,
+                 buffer_depth=SNAPSHOT_BUFFER_DEPTH, field=None, input_source=None, capture_path=None,
+                 clock=time.monotonic, server_address=None, spectate=None):
         # Initialize UDP socket in non-blocking mode.
         self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.server_address = ('localhost', 12345)
+        self.server_address = server_address if server_address is not None else ('localhost', 12345)
         self.client_id = -1
         self.client_socket.setblocking(False)
+        # Optionally record every datagram sent and received (see packet_capture).
+        self.recorder = None
+        if capture_path:
+            import packet_capture
+            self.recorder = packet_capture.PacketRecorder(capture_path)
+            self.client_socket = packet_capture.RecordingSocket(self.client_socket, self.recorder)
         self.socket_list = [self.client_socket]
         
         # Mapping of client IDs to player objects.
         self.clients = {}
-        self.counter_threshold = 50  # For potential packet counter validation.
+        # Counters further behind than this are a restarted sender, not a late packet.
+        self.counter_threshold = 50
         
+        # Field dimensions and the input source of the local player (pyxel by default).
+        self.field = field if field is not None else Field()
+        self.input_source = input_source
+
         # References to game managers.
         self.tick_manager = tick_manager
         self.render_manager = render_manager
@@ -32,83 +70,342 @@ class PongClient:
         # Position update configuration.
         self.send_position = True
         # 0: do not send, 1: every frame, 2: every other frame, etc.
-        self.position_update = 2
+        self.position_update = POSITION_UPDATE_MIN
         self.position_counter = 0
+        # Adapt `position_update` to the measured link between the two bounds.
+        self.adaptive_send = True
+        self.send_rate = link_quality.AdaptiveRate(POSITION_UPDATE_MIN, POSITION_UPDATE_MAX, MAX_LOSS, MAX_RTT)
+
+        # Round trips to the server, and the POSITION loss it reported in its last PONG.
+        self.clock = clock
+        self.pings = link_quality.PingTracker(clock)
+        self.next_ping_time = clock()
+        self.uplink_loss = None
+
+        # Match watched in spectator mode (None: play).
+        self.spectate = spectate
+        self.next_subscribe_time = clock()
         
         # Ball instance (spawned on receiving ball update).
         self.ball = None
 
+        # Mapping of recent DELTA sequences to rebuilt match states (delta bases).
+        self.state_history = {}
+        self.state_history_length = 32
+        # Sequence of the newest applied state, acknowledged once per frame.
+        self.pending_ack = None
+        # States received recently, reported in the ACK field so the server can count losses.
+        self.received_states = link_quality.ReceiveWindow()
+
+        # Remote player and ball positions are buffered and rendered interpolated.
+        self.interpolate = interpolation_delay > 0
+        self.snapshot_buffer = SnapshotBuffer(buffer_depth, interpolation_delay, MAX_EXTRAPOLATION)
+
+        # Newest 8-bit counter seen per stream (a packet type or a POSITION sender).
+        self.last_sequences = {}
+        # Newest (x, y, counter) per remote object received this frame, applied after the drain.
+        self.received_positions = {}
+        # Rejected duplicates, packets overtaken by a newer one, and states superseded within a frame.
+        self.duplicate_packets = 0
+        self.reordered_packets = 0
+        self.coalesced_packets = 0
+
+        # Reusable buffer outgoing POSITION packets are packed into.
+        self.send_buffer = bytearray(pong_codec.POSITION_PACKET_LENGTH)
+        self.send_view = memoryview(self.send_buffer)
+
     def receive_data(self, read_sockets):
         """
         Processes incoming data on the client socket.
-        Delegates handling based on the packet type.
+        Every pending datagram is drained, stale ones are dropped and only the
+        newest position of each remote object is applied, once per frame.
         """
         for read_socket in read_sockets:
             if read_socket == self.client_socket:
-                try:
-                    data, _ = self.client_socket.recvfrom(1024)
-                    # Determine the packet type (first byte).
-                    packet_type = struct.unpack(">B", data[:1])[0]
-                    
-                    if packet_type == PacketType.REQUEST_ID:
-                        # Handle registration response from the server.
-                        _, received_client_id = struct.unpack(">BB", data)
-                        self.client_id = received_client_id
-                        # Create the local player based on client ID.
-                        if self.client_id == 0:
-                            self.clients[self.client_id] = player.LeftPlayer(
-                                10, 40, pyxel.KEY_W, pyxel.KEY_S, "Player One", True)
-                        else:
-                            self.clients[self.client_id] = player.RightPlayer(
-                                140, 40, pyxel.KEY_W, pyxel.KEY_S, "Player One", False)
-                        # Register the player with both tick and render managers.
-                        self.clients[self.client_id].register_to_managers(
-                            [self.tick_manager, self.render_manager])
-                    
-                    elif packet_type == PacketType.POSITION:
-                        # Unpack POSITION packet. Expected format: >BBBBBIII
-                        (packet_type, object_type, client_id, packet_counter,
-                         packet_length, x_pos, y_pos, crc) = struct.unpack(">BBBBBIII", data)
-                        
-                        # Verify packet length and integrity.
-                        if packet_length == len(data):
-                            data_packed = struct.pack(">BBBBBII", packet_type, object_type,
-                                                      client_id, packet_counter, packet_length,
-                                                      x_pos, y_pos)
-                            computed_crc = zlib.crc32(data_packed)
-                            if crc == computed_crc:
-                                if object_type == ObjectType.PLAYER:
-                                    # Update or spawn a player.
-                                    if client_id not in self.clients:
-                                        # Create a new player based on local client ID.
-                                        if self.client_id == 0:
-                                            self.clients[client_id] = player.LeftPlayer(
-                                                10, 40, "", "", "Player Two", False)
-                                        else:
-                                            self.clients[client_id] = player.RightPlayer(
-                                                140, 40, "", "", "Player Two", True)
-                                        self.clients[client_id].register_to_managers([self.render_manager])
-                                        self.clients[client_id].position_packet_counter = packet_counter
-                                    # Update player position.
-                                    self.clients[client_id].x = x_pos
-                                    self.clients[client_id].y = y_pos
-                                    self.clients[client_id].position_packet_counter = packet_counter
-                                
-                                elif object_type == ObjectType.BALL:
-                                    # Spawn or update the ball.
-                                    if self.ball is None:
-                                        self.ball = ball.BallBase(x_pos, y_pos, 4)
-                                        self.render_manager.register_object(self.ball)
-                                    else:
-                                        self.ball.x = x_pos
-                                        self.ball.y = y_pos
-                                        
-                    elif packet_type == PacketType.SPAWN:
-                        # Placeholder for SPAWN packet handling.
+                for _ in range(MAX_DATAGRAMS_PER_FRAME):
+                    try:
+                        data, _ = self.client_socket.recvfrom(1024)
+                    except OSError:
+                        # Nothing left to read (or an ICMP error surfaced on a UDP socket).
+                        break
+                    try:
+                        self.handle_packet(data)
+                    except Exception:
+                        # Ignore malformed packets.
                         pass
-                except Exception:
-                    # Ignore exceptions to allow non-blocking operations.
-                    pass
+        self.apply_received()
+
+    def handle_packet(self, data):
+        """
+        Delegates handling of one datagram based on the packet type (first byte).
+        """
+        packet_type = data[0]
+
+        if packet_type == PacketType.REQUEST_ID:
+            # Handle registration response from the server.
+            self.client_id = pong_codec.decode_id_response(data)
+            # Create the local player based on client ID.
+            left_x, right_x, spawn_y = self.spawn_positions()
+            if self.client_id == 0:
+                self.clients[self.client_id] = player.LeftPlayer(
+                    left_x, spawn_y, pyxel.KEY_W, pyxel.KEY_S, "Player One", True,
+                    self.field, self.input_source)
+            else:
+                self.clients[self.client_id] = player.RightPlayer(
+                    right_x, spawn_y, pyxel.KEY_W, pyxel.KEY_S, "Player One", False,
+                    self.field, self.input_source)
+            # Register the player with both tick and render managers.
+            self.clients[self.client_id].register_to_managers(
+                [self.tick_manager, self.render_manager])
+
+        elif packet_type == PacketType.POSITION:
+            # Packet length and integrity are verified by the codec.
+            fields = pong_codec.decode_position(data)
+            if fields is not None:
+                object_type, client_id, packet_counter, x_pos, y_pos = fields
+                if self.accept_sequence((object_type, client_id), packet_counter):
+                    self.stage_position(object_type, client_id, x_pos, y_pos, packet_counter)
+
+        elif packet_type == PacketType.SNAPSHOT:
+            self.apply_snapshot(data)
+
+        elif packet_type == PacketType.DELTA:
+            self.apply_delta(data)
+
+        elif packet_type == PacketType.PING:
+            self.client_socket.sendto(pong_codec.encode_pong(pong_codec.decode_ping(data)),
+                                      self.server_address)
+
+        elif packet_type == PacketType.PONG:
+            self.handle_pong(data)
+
+        elif packet_type == PacketType.RESET:
+            if self.spectate is None:
+                self.reset_session()
+
+        elif packet_type == PacketType.SPAWN:
+            # Placeholder for SPAWN packet handling.
+            pass
+
+    def reset_session(self):
+        """
+        Forgets the match after the server lost this client's session (a restarted
+        worker or an eviction): the players and ball are removed and the client
+        registers again with REQUEST_ID on the next frame.
+        """
+        for obj in list(self.clients.values()) + ([self.ball] if self.ball is not None else []):
+            self.tick_manager.unregister_object(obj)
+            self.render_manager.unregister_object(obj)
+        self.clients = {}
+        self.ball = None
+        self.client_id = -1
+        self.state_history = {}
+        self.pending_ack = None
+        self.received_states = link_quality.ReceiveWindow()
+        self.snapshot_buffer.tracks.clear()
+        self.last_sequences = {}
+        self.received_positions = {}
+
+    def accept_sequence(self, stream, sequence):
+        """
+        Checks an 8-bit packet counter against the newest one seen on `stream`.
+        Duplicates and packets overtaken by a newer one are counted and rejected.
+        A counter more than `counter_threshold` behind is taken as a restarted
+        sender (e.g. a new match) rather than a late packet.
+
+        :return: True when the packet is newer and should be applied.
+        """
+        last_sequence = self.last_sequences.get(stream)
+        if last_sequence is not None:
+            distance = pong_codec.sequence_distance(sequence, last_sequence)
+            if distance == 0:
+                self.duplicate_packets += 1
+                return False
+            if -self.counter_threshold <= distance < 0:
+                self.reordered_packets += 1
+                return False
+        self.last_sequences[stream] = sequence
+        return True
+
+    def apply_received(self):
+        """
+        Applies the newest position of every remote object received this frame.
+        """
+        if not self.received_positions:
+            return
+        for (object_type, client_id), (x_pos, y_pos, packet_counter) in self.received_positions.items():
+            if object_type == ObjectType.PLAYER:
+                self.update_player(client_id, x_pos, y_pos, packet_counter)
+            elif object_type == ObjectType.BALL:
+                self.update_ball(x_pos, y_pos)
+        self.received_positions.clear()
+
+    def stage_position(self, object_type, client_id, x_pos, y_pos, sequence):
+        """
+        Records the position of a remote object, replacing an older one from the same frame.
+        """
+        key = (object_type, client_id)
+        if key in self.received_positions:
+            self.coalesced_packets += 1
+        self.received_positions[key] = (x_pos, y_pos, sequence)
+
+    def spawn_positions(self):
+        """
+        :return: Tuple of (left paddle x, right paddle x, paddle y) for this field.
+        """
+        field = self.field
+        return (field.paddle_width, field.width - 2 * field.paddle_width,
+                (field.height - field.paddle_height) // 2)
+
+    def update_player(self, client_id, x_pos, y_pos, packet_counter):
+        """
+        Updates the position of a remote player, spawning it on first sight.
+        """
+        if client_id not in self.clients:
+            # Create a new player based on local client ID.
+            left_x, right_x, spawn_y = self.spawn_positions()
+            if self.spectate is not None:
+                # Spectators show both paddles and both scores.
+                if client_id == 0:
+                    self.clients[client_id] = player.LeftPlayer(
+                        left_x, spawn_y, "", "", "Player One", False, self.field, NullInput())
+                else:
+                    self.clients[client_id] = player.RightPlayer(
+                        right_x, spawn_y, "", "", "Player Two", False, self.field, NullInput())
+            elif self.client_id == 0:
+                self.clients[client_id] = player.LeftPlayer(
+                    left_x, spawn_y, "", "", "Player Two", False, self.field, NullInput())
+            else:
+                self.clients[client_id] = player.RightPlayer(
+                    right_x, spawn_y, "", "", "Player Two", True, self.field, NullInput())
+            self.clients[client_id].register_to_managers([self.render_manager])
+            self.clients[client_id].x = x_pos
+            self.clients[client_id].y = y_pos
+        # Update player position.
+        if self.interpolate:
+            self.snapshot_buffer.push((ObjectType.PLAYER, client_id), x_pos, y_pos)
+        else:
+            self.clients[client_id].x = x_pos
+            self.clients[client_id].y = y_pos
+        self.clients[client_id].position_packet_counter = packet_counter
+
+    def update_ball(self, x_pos, y_pos):
+        """
+        Spawns the ball on the first update, then moves it.
+        """
+        if self.ball is None:
+            self.ball = ball.BallBase(x_pos, y_pos, self.field.ball_size)
+            self.render_manager.register_object(self.ball)
+        if self.interpolate:
+            self.snapshot_buffer.push((ObjectType.BALL, 0), x_pos, y_pos)
+        else:
+            self.ball.x = x_pos
+            self.ball.y = y_pos
+
+    def apply_interpolation(self):
+        """
+        Moves remote players and the ball to their buffered positions for this frame.
+        """
+        for (object_type, client_id), (x_pos, y_pos) in self.snapshot_buffer.sample().items():
+            if object_type == ObjectType.BALL:
+                target = self.ball
+            else:
+                target = self.clients.get(client_id)
+            if target is not None:
+                target.x = x_pos
+                target.y = y_pos
+
+    def apply_snapshot(self, data):
+        """
+        Applies a SNAPSHOT packet (every entity of the match plus the score) in one pass.
+        The local player's own paddle is skipped: its position is authoritative here.
+        """
+        snapshot = pong_codec.decode_snapshot(data)
+        if snapshot is None:
+            return
+        snapshot_counter, entity_count, scores = snapshot
+        self.received_states.note(snapshot_counter)
+        if not self.accept_sequence(PacketType.SNAPSHOT, snapshot_counter):
+            return
+        self.pending_ack = snapshot_counter
+        for object_type, client_id, x_pos, y_pos in pong_codec.iter_snapshot_entities(data, entity_count):
+            if object_type == ObjectType.PLAYER:
+                if client_id != self.client_id:
+                    self.stage_position(object_type, client_id, x_pos, y_pos, snapshot_counter)
+            elif object_type == ObjectType.BALL:
+                self.stage_position(object_type, client_id, x_pos, y_pos, snapshot_counter)
+        for client_id, points in enumerate(scores):
+            if client_id in self.clients:
+                self.clients[client_id].points = points
+
+    def apply_delta(self, data):
+        """
+        Rebuilds the match state from a DELTA packet and its acknowledged base,
+        applies it and queues an ACK so the server can delta against it next.
+        """
+        decoded = pong_codec.decode_delta(data, self.state_history)
+        if decoded is None:
+            return
+        sequence, state = decoded
+        self.received_states.note(sequence)
+        if not self.accept_sequence(PacketType.DELTA, sequence):
+            return
+        self.state_history[sequence] = state
+        self.state_history.pop((sequence - self.state_history_length) % 256, None)
+        self.pending_ack = sequence
+        for client_id in range(pong_codec.DELTA_PADDLE_SLOTS):
+            position = state[client_id]
+            if position is not None and client_id != self.client_id:
+                self.stage_position(ObjectType.PLAYER, client_id, position[0], position[1], sequence)
+        ball_position = state[pong_codec.DELTA_BALL_SLOT]
+        if ball_position is not None:
+            self.stage_position(ObjectType.BALL, 0, ball_position[0], ball_position[1], sequence)
+        for client_id, points in enumerate(state[pong_codec.DELTA_SCORE_SLOT]):
+            if client_id in self.clients:
+                self.clients[client_id].points = points
+
+    def handle_pong(self, data):
+        """
+        Takes a round-trip sample and adapts the send rate to it and to the
+        POSITION loss the server reported.
+        """
+        sequence, loss = pong_codec.decode_pong(data)
+        if self.pings.pong(sequence) is None:
+            return
+        self.uplink_loss = loss
+        if self.adaptive_send and self.position_update > 0:
+            self.position_update = self.send_rate.update(self.pings.rtt, loss)
+
+    def send_ping(self):
+        """
+        Pings the server; a previous ping left unanswered counts as a congested window.
+        """
+        sequence, timed_out = self.pings.ping()
+        if timed_out and self.adaptive_send and self.position_update > 0:
+            self.position_update = self.send_rate.update(self.pings.rtt, 1.0)
+        self.client_socket.sendto(pong_codec.encode_ping(sequence), self.server_address)
+
+    def link_stats(self):
+        """
+        :return: Dict of the round-trip time (seconds), the POSITION loss last
+                 reported by the server and the current frames per POSITION packet.
+        """
+        return {
+            "rtt": self.pings.rtt,
+            "rtt_min": self.pings.rtt_min,
+            "uplink_loss": self.uplink_loss,
+            "lost_pings": self.pings.lost,
+            "position_update": self.position_update,
+        }
+
+    def leave(self):
+        """
+        Tells the server (or the relay, when spectating) that this client is gone,
+        so its seat or subscription is freed at once rather than when it times out.
+        """
+        if self.client_id != -1 or self.spectate is not None:
+            self.client_socket.sendto(pong_codec.encode_leave(), self.server_address)
+            self.client_id = -1
 
     def run_client(self):
         """
@@ -118,8 +415,28 @@ class PongClient:
         # Poll the socket for incoming data.
         read_sockets, _, _ = select.select(self.socket_list, [], [], 0)
         self.receive_data(read_sockets)
-        
+        if self.interpolate:
+            self.apply_interpolation()
+
+        if self.spectate is not None:
+            # Spectators only keep their subscription alive: no paddle, ACK or ping to send.
+            now = self.clock()
+            if now >= self.next_subscribe_time:
+                self.client_socket.sendto(pong_codec.encode_subscribe(self.spectate), self.server_address)
+                self.next_subscribe_time = now + SUBSCRIBE_INTERVAL
+            return
+
+        if self.pending_ack is not None:
+            received_bits = self.received_states.ack_bits(self.pending_ack)
+            self.client_socket.sendto(pong_codec.encode_ack(self.pending_ack, received_bits),
+                                      self.server_address)
+            self.pending_ack = None
+
         if self.client_id != -1:
+            now = self.clock()
+            if now >= self.next_ping_time:
+                self.send_ping()
+                self.next_ping_time = now + PING_INTERVAL
             # Send position updates if registered.
             pos_x = self.clients[self.client_id].x
             pos_y = self.clients[self.client_id].y
@@ -129,56 +446,23 @@ class PongClient:
                 self.position_counter = 0
         else:
             # If not registered, send a REQUEST_ID packet.
-            data = struct.pack(">BBII", PacketType.REQUEST_ID, ObjectType.PLAYER, 0, 0)
-            self.client_socket.sendto(data, self.server_address)
-
-    def create_packet(self, packet_type, data):
-        """
-        Constructs a packet with header, payload, and CRC32 checksum.
-        
-        Header format:
-          - Packet type (1 byte)
-          - Object type (1 byte; assumed to be PLAYER)
-          - Client ID (1 byte)
-          - Packet counter (1 byte)
-          - Packet length (1 byte)
-        
-        :param packet_type: Type of the packet (e.g., PacketType.POSITION)
-        :param data: Payload data to include in the packet.
-        :return: The complete packet as bytes.
-        """
-        crc_length = 4
-        header_length = 5
-        packet_length = header_length + len(data) + crc_length
-        
-        # Construct header and append payload.
-        data_packet = struct.pack(
-            ">BBBBB",
-            packet_type,
-            ObjectType.PLAYER,
-            self.client_id,
-            self.clients[self.client_id].position_packet_counter,
-            packet_length
-        ) + data
-        
-        # Update and wrap the packet counter.
-        self.clients[self.client_id].position_packet_counter = (
-            (self.clients[self.client_id].position_packet_counter + 1) % 256
-        )
-        
-        crc = zlib.crc32(data_packet)
-        return data_packet + struct.pack(">I", crc)
+            self.client_socket.sendto(pong_codec.encode_request_id(), self.server_address)
 
     def send_position_data(self, x_pos, y_pos):
         """
         Sends the current player position to the server.
+        The packet is packed in place into a reusable buffer.
         
         :param x_pos: The player's x-coordinate.
         :param y_pos: The player's y-coordinate.
         """
-        data = struct.pack(">II", x_pos, y_pos)
-        packet = self.create_packet(PacketType.POSITION, data)
-        self.client_socket.sendto(packet, self.server_address)
+        local_player = self.clients[self.client_id]
+        length = pong_codec.pack_position_into(
+            self.send_view, 0, pong_codec.OBJECT_PLAYER, self.client_id,
+            local_player.position_packet_counter, x_pos, y_pos)
+        # Update and wrap the packet counter.
+        local_player.position_packet_counter = (local_player.position_packet_counter + 1) % 256
+        self.client_socket.sendto(self.send_view[:length], self.server_address)
 
     def send_request_ID(self):
         """
@@ -0,0 +1,447 @@
+import struct
+import zlib
+from pong_global import PacketType, ObjectType, FIELD_WIDTH, FIELD_HEIGHT
+
+# Precompiled packet layouts shared by client and server.
+# REQUEST_ID sent by a client: packet type, object type, x, y.
+REQUEST_ID_STRUCT = struct.Struct(">BBII")
+# REQUEST_ID answered by the server: packet type, assigned client ID.
+ID_RESPONSE_STRUCT = struct.Struct(">BB")
+# POSITION: packet type, object type, client ID, packet counter, packet length, x, y.
+POSITION_STRUCT = struct.Struct(">BBBBBII")
+# SNAPSHOT header: packet type, snapshot counter, packet length, entity count.
+SNAPSHOT_HEADER_STRUCT = struct.Struct(">BBBB")
+# SNAPSHOT entity: object type, client ID (0 for the ball), x, y.
+SNAPSHOT_ENTITY_STRUCT = struct.Struct(">BBII")
+# SNAPSHOT score: left player points, right player points.
+SNAPSHOT_SCORE_STRUCT = struct.Struct(">HH")
+CRC_STRUCT = struct.Struct(">I")
+# ACK sent by a client: packet type, sequence of the newest state it applied,
+# then which of the 32 sequences before it arrived (bit i: sequence - 1 - i).
+ACK_STRUCT = struct.Struct(">BBI")
+# ACK of older clients, without the received bits.
+LEGACY_ACK_STRUCT = struct.Struct(">BB")
+# PING: packet type, 16-bit ping sequence.
+PING_STRUCT = struct.Struct(">BH")
+# PONG: packet type, echoed ping sequence, loss of the pinger's stream seen by
+# the replier in 1/254 steps (LOSS_UNKNOWN when it does not count it).
+PONG_STRUCT = struct.Struct(">BHB")
+# SUBSCRIBE sent by a spectator or relay: packet type, match ID to watch.
+SUBSCRIBE_STRUCT = struct.Struct(">BH")
+# DELTA header: packet type, version (high nibble) and flags, sequence.
+DELTA_HEADER_STRUCT = struct.Struct(">BBB")
+# Quantized coordinates: one byte per axis while the field fits, two otherwise.
+COORDINATE_STRUCT = struct.Struct(">BB" if max(FIELD_WIDTH, FIELD_HEIGHT) <= 256 else ">HH")
+# DELTA trailer: low 16 bits of the CRC32.
+DELTA_CRC_STRUCT = struct.Struct(">H")
+
+POSITION_PACKET_LENGTH = POSITION_STRUCT.size + CRC_STRUCT.size
+MAX_PACKET_LENGTH = 255
+
+# Plain int copies of the enum values: struct converts IntEnum members through
+# __index__ on every call, which costs more than the packing itself.
+REQUEST_ID = int(PacketType.REQUEST_ID)
+POSITION = int(PacketType.POSITION)
+SNAPSHOT = int(PacketType.SNAPSHOT)
+DELTA = int(PacketType.DELTA)
+ACK = int(PacketType.ACK)
+STATS = int(PacketType.STATS)
+PING = int(PacketType.PING)
+PONG = int(PacketType.PONG)
+SUBSCRIBE = int(PacketType.SUBSCRIBE)
+LEAVE = int(PacketType.LEAVE)
+RESET = int(PacketType.RESET)
+OBJECT_PLAYER = int(ObjectType.PLAYER)
+OBJECT_BALL = int(ObjectType.BALL)
+
+# Bound methods and sizes cached at import so hot paths skip attribute lookups.
+_crc32 = zlib.crc32
+_pack_position_into = POSITION_STRUCT.pack_into
+_unpack_position_from = POSITION_STRUCT.unpack_from
+_pack_crc_into = CRC_STRUCT.pack_into
+_unpack_crc_from = CRC_STRUCT.unpack_from
+_pack_snapshot_header_into = SNAPSHOT_HEADER_STRUCT.pack_into
+_unpack_snapshot_header_from = SNAPSHOT_HEADER_STRUCT.unpack_from
+_pack_snapshot_entity_into = SNAPSHOT_ENTITY_STRUCT.pack_into
+_iter_unpack_snapshot_entities = SNAPSHOT_ENTITY_STRUCT.iter_unpack
+_pack_snapshot_score_into = SNAPSHOT_SCORE_STRUCT.pack_into
+_unpack_snapshot_score_from = SNAPSHOT_SCORE_STRUCT.unpack_from
+_POSITION_BODY_LENGTH = POSITION_STRUCT.size
+_SNAPSHOT_HEADER_LENGTH = SNAPSHOT_HEADER_STRUCT.size
+_SNAPSHOT_ENTITY_LENGTH = SNAPSHOT_ENTITY_STRUCT.size
+_SNAPSHOT_SCORE_LENGTH = SNAPSHOT_SCORE_STRUCT.size
+_CRC_LENGTH = CRC_STRUCT.size
+_SNAPSHOT_FIXED_LENGTH = _SNAPSHOT_HEADER_LENGTH + _SNAPSHOT_SCORE_LENGTH + _CRC_LENGTH
+
+def snapshot_length(entity_count):
+    return _SNAPSHOT_FIXED_LENGTH + _SNAPSHOT_ENTITY_LENGTH * entity_count
+
+def checksum(data, length):
+    """
+    CRC32 of the first `length` bytes. Slicing a memoryview (as the writers and
+    any caller passing a view do) is zero-copy; for a short bytes object, a slice
+    is cheaper than wrapping it in a new view first.
+    """
+    return _crc32(data[:length])
+
+def has_valid_crc(data, length):
+    """
+    Checks the trailing CRC32 of a packet of `length` bytes.
+    """
+    body_length = length - _CRC_LENGTH
+    return _unpack_crc_from(data, body_length)[0] == _crc32(data[:body_length])
+
+def encode_request_id(x_pos=0, y_pos=0, object_type=OBJECT_PLAYER):
+    return REQUEST_ID_STRUCT.pack(REQUEST_ID, object_type, x_pos, y_pos)
+
+def decode_request_id(data):
+    """
+    :return: Tuple of (object_type, x, y).
+    """
+    _, object_type, x_pos, y_pos = REQUEST_ID_STRUCT.unpack_from(data)
+    return object_type, x_pos, y_pos
+
+def encode_id_response(client_id):
+    return ID_RESPONSE_STRUCT.pack(REQUEST_ID, client_id)
+
+def decode_id_response(data):
+    return ID_RESPONSE_STRUCT.unpack_from(data)[1]
+
+def pack_position_into(view, offset, object_type, client_id, packet_counter, x_pos, y_pos):
+    """
+    Writes a complete POSITION packet (CRC included) into the memoryview `view` at `offset`.
+
+    :return: Number of bytes written.
+    """
+    _pack_position_into(view, offset, POSITION, object_type, client_id,
+                        packet_counter, POSITION_PACKET_LENGTH, x_pos, y_pos)
+    body_end = offset + _POSITION_BODY_LENGTH
+    _pack_crc_into(view, body_end, _crc32(view[offset:body_end]))
+    return POSITION_PACKET_LENGTH
+
+def encode_position(object_type, client_id, packet_counter, x_pos, y_pos):
+    buffer = bytearray(POSITION_PACKET_LENGTH)
+    pack_position_into(memoryview(buffer), 0, object_type, client_id, packet_counter, x_pos, y_pos)
+    return bytes(buffer)
+
+def decode_position(data):
+    """
+    Parses a POSITION packet in place.
+
+    :return: Tuple of (object_type, client_id, packet_counter, x, y), or None when the
+             length field or the CRC does not match.
+    """
+    if len(data) != POSITION_PACKET_LENGTH:
+        return None
+    (_, object_type, client_id, packet_counter,
+     packet_length, x_pos, y_pos) = _unpack_position_from(data)
+    if packet_length != POSITION_PACKET_LENGTH:
+        return None
+    if _unpack_crc_from(data, _POSITION_BODY_LENGTH)[0] != _crc32(data[:_POSITION_BODY_LENGTH]):
+        return None
+    return object_type, client_id, packet_counter, x_pos, y_pos
+
+def position_error(data):
+    """
+    Tells why `decode_position` rejected a packet.
+
+    :return: "length" when the datagram or its length field is wrong, "crc" when
+             the checksum does not match, or None for a valid packet.
+    """
+    if len(data) != POSITION_PACKET_LENGTH or data[4] != POSITION_PACKET_LENGTH:
+        return "length"
+    if not has_valid_crc(data, POSITION_PACKET_LENGTH):
+        return "crc"
+    return None
+
+class SnapshotWriter:
+    """
+    Encodes SNAPSHOT packets into one reusable buffer.
+    The returned memoryview stays valid until the next `encode` call, so a
+    snapshot is built once and sent to every client of a match.
+    """
+    def __init__(self):
+        self.buffer = bytearray(MAX_PACKET_LENGTH)
+        self.view = memoryview(self.buffer)
+
+    def encode(self, snapshot_counter, entities, scores):
+        """
+        :param entities: Sequence of (object_type, client_id, x, y).
+        :param scores: (left points, right points).
+        :return: memoryview over the encoded packet.
+        """
+        view = self.view
+        entity_count = len(entities)
+        packet_length = snapshot_length(entity_count)
+        _pack_snapshot_header_into(view, 0, SNAPSHOT, snapshot_counter, packet_length, entity_count)
+        offset = _SNAPSHOT_HEADER_LENGTH
+        for object_type, client_id, x_pos, y_pos in entities:
+            _pack_snapshot_entity_into(view, offset, object_type, client_id, x_pos, y_pos)
+            offset += _SNAPSHOT_ENTITY_LENGTH
+        _pack_snapshot_score_into(view, offset, scores[0], scores[1])
+        offset += _SNAPSHOT_SCORE_LENGTH
+        _pack_crc_into(view, offset, _crc32(view[:offset]))
+        return view[:packet_length]
+
+def decode_snapshot(data):
+    """
+    Validates a SNAPSHOT packet and unpacks its fixed fields.
+
+    :return: Tuple of (snapshot_counter, entity_count, scores), or None when the
+             length or the CRC does not match.
+    """
+    if len(data) < _SNAPSHOT_HEADER_LENGTH:
+        return None
+    _, snapshot_counter, packet_length, entity_count = _unpack_snapshot_header_from(data)
+    if packet_length != len(data) or packet_length != snapshot_length(entity_count):
+        return None
+    if not has_valid_crc(data, packet_length):
+        return None
+    scores = _unpack_snapshot_score_from(data, packet_length - _CRC_LENGTH - _SNAPSHOT_SCORE_LENGTH)
+    return snapshot_counter, entity_count, scores
+
+def iter_snapshot_entities(data, entity_count):
+    """
+    Yields (object_type, client_id, x, y) for each entity of a validated SNAPSHOT,
+    unpacking straight from the received buffer (no copy when `data` is a memoryview).
+    """
+    end = _SNAPSHOT_HEADER_LENGTH + _SNAPSHOT_ENTITY_LENGTH * entity_count
+    return _iter_unpack_snapshot_entities(data[_SNAPSHOT_HEADER_LENGTH:end])
+
+# Compact delta format (PacketType.DELTA), version 1.
+#
+# A match state is a tuple of DELTA_SLOT_COUNT slots: the (x, y) of paddle 0,
+# paddle 1 and the ball (None while a paddle is absent), then the (left, right)
+# score. After the header, a keyframe carries a presence bitmask and every
+# present slot. A delta also carries how many sequences back its base state is,
+# then a change bitmask and only the slots that differ from that base, which is
+# the newest state the client acknowledged. Coordinates are quantized to the
+# field grid and scores are varints.
+DELTA_VERSION = 1
+DELTA_KEYFRAME_FLAG = 0x01
+DELTA_SLOT_COUNT = 4
+DELTA_PADDLE_SLOTS = 2
+DELTA_BALL_SLOT = 2
+DELTA_SCORE_SLOT = 3
+_COORDINATE_MAX = (FIELD_WIDTH, FIELD_HEIGHT)
+_DELTA_VERSION_BYTE = DELTA_VERSION << 4
+_DELTA_KEYFRAME_BYTE = _DELTA_VERSION_BYTE | DELTA_KEYFRAME_FLAG
+_BYTES = [bytes((value,)) for value in range(256)]
+_pack_delta_header = DELTA_HEADER_STRUCT.pack
+_pack_coordinates = COORDINATE_STRUCT.pack
+_pack_delta_crc = DELTA_CRC_STRUCT.pack
+# Two scores below 128 are single-byte varints.
+_pack_small_scores = struct.Struct(">BB").pack
+
+LOSS_UNKNOWN = 255
+_LOSS_STEPS = 254
+
+def encode_ack(sequence, received_bits=0):
+    return ACK_STRUCT.pack(ACK, sequence, received_bits)
+
+def decode_ack(data):
+    """
+    :return: Tuple of (sequence, received bits), the bits being None for a legacy ACK.
+    """
+    if len(data) == LEGACY_ACK_STRUCT.size:
+        return LEGACY_ACK_STRUCT.unpack(data)[1], None
+    _, sequence, received_bits = ACK_STRUCT.unpack_from(data)
+    return sequence, received_bits
+
+def encode_ping(sequence):
+    return PING_STRUCT.pack(PING, sequence)
+
+def decode_ping(data):
+    return PING_STRUCT.unpack_from(data)[1]
+
+def encode_pong(sequence, loss=None):
+    """
+    :param loss: Loss ratio of the pinger's stream, or None when not counted.
+    """
+    loss_byte = LOSS_UNKNOWN if loss is None else round(min(max(loss, 0.0), 1.0) * _LOSS_STEPS)
+    return PONG_STRUCT.pack(PONG, sequence, loss_byte)
+
+def decode_pong(data):
+    """
+    :return: Tuple of (ping sequence, loss ratio or None).
+    """
+    _, sequence, loss_byte = PONG_STRUCT.unpack_from(data)
+    return sequence, None if loss_byte == LOSS_UNKNOWN else loss_byte / _LOSS_STEPS
+
+def encode_stats_request():
+    return _BYTES[STATS]
+
+# Largest UDP payload over IPv4, and so the largest metrics text a STATS reply carries.
+MAX_DATAGRAM_SIZE = 65507
+MAX_STATS_TEXT = MAX_DATAGRAM_SIZE - 1
+
+def encode_stats_response(text):
+    """
+    A STATS reply is the packet type followed by the metrics as UTF-8 JSON.
+    """
+    return _BYTES[STATS] + text.encode()
+
+def decode_stats_response(data):
+    return bytes(data[1:]).decode()
+
+def encode_subscribe(match_id):
+    return SUBSCRIBE_STRUCT.pack(SUBSCRIBE, match_id)
+
+def decode_subscribe(data):
+    return SUBSCRIBE_STRUCT.unpack_from(data)[1]
+
+def encode_leave():
+    """
+    A LEAVE (a player quitting, or a viewer leaving a relay) is the packet type alone.
+    """
+    return _BYTES[LEAVE]
+
+def encode_reset():
+    """
+    A RESET (the server has no session for the sender, which must register again)
+    is the packet type alone.
+    """
+    return _BYTES[RESET]
+
+def sequence_distance(sequence, reference):
+    """
+    Returns how far the 8-bit `sequence` is ahead of `reference` (negative when
+    behind), assuming the two are less than half the sequence space apart.
+    """
+    distance = (sequence - reference) & 0xFF
+    return distance - 256 if distance >= 128 else distance
+
+def sequence_newer(sequence, reference):
+    """
+    Returns True when the 8-bit `sequence` comes after `reference`, across wrap-around.
+    """
+    return 0 < (sequence - reference) & 0xFF < 128
+
+def write_varint(packet, value):
+    """
+    Appends `value` to the bytearray as an unsigned LEB128 varint.
+    """
+    while value >= 0x80:
+        packet.append((value & 0x7F) | 0x80)
+        value >>= 7
+    packet.append(value)
+
+def read_varint(data, offset):
+    """
+    :return: Tuple of (value, offset after the varint).
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+def quantize(x_pos, y_pos):
+    """
+    Clamps a position to the field so it fits the quantized coordinate width.
+    """
+    return (min(max(int(x_pos), 0), _COORDINATE_MAX[0]),
+            min(max(int(y_pos), 0), _COORDINATE_MAX[1]))
+
+def _pack_position(position):
+    x_pos, y_pos = position
+    # In-field integers (the common case) skip the clamping call.
+    if not (type(x_pos) is int and type(y_pos) is int
+            and 0 <= x_pos <= _COORDINATE_MAX[0] and 0 <= y_pos <= _COORDINATE_MAX[1]):
+        x_pos, y_pos = quantize(x_pos, y_pos)
+    return _pack_coordinates(x_pos, y_pos)
+
+def encode_delta(sequence, state, base_sequence=None, base_state=None):
+    """
+    Encodes `state` as a keyframe, or as a delta against `base_state` when given.
+
+    :return: The packet as bytes.
+    """
+    paddle_0, paddle_1, ball_position, scores = state
+    if base_state is None:
+        parts = [_pack_delta_header(DELTA, _DELTA_KEYFRAME_BYTE, sequence)]
+        mask = 8
+        if paddle_0 is not None:
+            mask |= 1
+        if paddle_1 is not None:
+            mask |= 2
+        if ball_position is not None:
+            mask |= 4
+    else:
+        parts = [_pack_delta_header(DELTA, _DELTA_VERSION_BYTE, sequence),
+                 _BYTES[(sequence - base_sequence) % 256]]
+        mask = 0
+        if paddle_0 is not None and paddle_0 != base_state[0]:
+            mask |= 1
+        if paddle_1 is not None and paddle_1 != base_state[1]:
+            mask |= 2
+        if ball_position is not None and ball_position != base_state[2]:
+            mask |= 4
+        if scores != base_state[3]:
+            mask |= 8
+    parts.append(_BYTES[mask])
+    if mask & 1:
+        parts.append(_pack_position(paddle_0))
+    if mask & 2:
+        parts.append(_pack_position(paddle_1))
+    if mask & 4:
+        parts.append(_pack_position(ball_position))
+    if mask & 8:
+        left, right = scores
+        if left < 0x80 and right < 0x80:
+            parts.append(_pack_small_scores(left, right))
+        else:
+            varints = bytearray()
+            write_varint(varints, left)
+            write_varint(varints, right)
+            parts.append(varints)
+    body = b"".join(parts)
+    return body + _pack_delta_crc(_crc32(body) & 0xFFFF)
+
+def decode_delta(data, history):
+    """
+    Decodes a DELTA packet back into a full match state.
+
+    :param history: Mapping of sequences to states already reconstructed by the caller.
+    :return: Tuple of (sequence, state), or None when the packet is corrupted,
+             of an unknown version, or its base state is not in `history`.
+    """
+    length = len(data)
+    if length < DELTA_HEADER_STRUCT.size + 1 + DELTA_CRC_STRUCT.size:
+        return None
+    body_length = length - DELTA_CRC_STRUCT.size
+    if DELTA_CRC_STRUCT.unpack_from(data, body_length)[0] != _crc32(data[:body_length]) & 0xFFFF:
+        return None
+    _, version_flags, sequence = DELTA_HEADER_STRUCT.unpack_from(data)
+    if version_flags >> 4 != DELTA_VERSION:
+        return None
+    offset = DELTA_HEADER_STRUCT.size
+    if version_flags & DELTA_KEYFRAME_FLAG:
+        state = [None] * DELTA_SLOT_COUNT
+    else:
+        base_state = history.get((sequence - data[offset]) % 256)
+        if base_state is None:
+            return None
+        state = list(base_state)
+        offset += 1
+    mask = data[offset]
+    offset += 1
+    try:
+        for slot in range(DELTA_SLOT_COUNT):
+            if mask & (1 << slot):
+                if slot == DELTA_SCORE_SLOT:
+                    left, offset = read_varint(data, offset)
+                    right, offset = read_varint(data, offset)
+                    state[slot] = (left, right)
+                else:
+                    state[slot] = COORDINATE_STRUCT.unpack_from(data, offset)
+                    offset += COORDINATE_STRUCT.size
+    except (IndexError, struct.error):
+        return None
+    if offset != body_length:
+        return None
+    return sequence, tuple(state)
@@ -0,0 +1,231 @@
+from pong_global import FIELD_WIDTH, FIELD_HEIGHT, PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE
+
+# Pixels a paddle moves per key press.
+PADDLE_STEP = 10
+
+class Field:
+    """
+    Dimensions of the playing field and of the objects on it.
+    Shared by the client game and the server so neither hard-codes sizes.
+    """
+    __slots__ = ("width", "height", "paddle_width", "paddle_height", "ball_size")
+
+    def __init__(self, width=FIELD_WIDTH, height=FIELD_HEIGHT, paddle_width=PADDLE_WIDTH,
+                 paddle_height=PADDLE_HEIGHT, ball_size=BALL_SIZE):
+        self.width = width
+        self.height = height
+        self.paddle_width = paddle_width
+        self.paddle_height = paddle_height
+        self.ball_size = ball_size
+
+    @property
+    def left_goal(self):
+        """
+        A ball left of this x has passed the left paddle.
+        """
+        return self.paddle_width
+
+    @property
+    def right_goal(self):
+        """
+        A ball right of this x has passed the right paddle.
+        """
+        return self.width - self.paddle_width
+
+    def center(self):
+        return self.width // 2, self.height // 2
+
+class NullInput:
+    """
+    Input source with no keys pressed, for remote players and headless runs.
+    """
+    def btnp(self, key):
+        return False
+
+class ScriptedInput:
+    """
+    Input source replaying a list of per-frame sets of pressed keys.
+    Call `advance()` once per frame; after the script ends no key is pressed.
+    """
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.frame = 0
+
+    def btnp(self, key):
+        return self.frame < len(self.frames) and key in self.frames[self.frame]
+
+    def advance(self):
+        self.frame += 1
+
+def move_paddle(y, up_pressed, down_pressed, field):
+    """
+    Moves a paddle one step up and/or down, unless it results in going out of bounds.
+
+    :return: The new y-coordinate.
+    """
+    if up_pressed:
+        if y > 0:
+            y = (y - PADDLE_STEP) % field.height
+    if down_pressed:
+        if y < field.height - field.paddle_height:
+            y = (y + PADDLE_STEP) % field.height
+    return y
+
+class Ball:
+    """
+    Represents the ball in the Pong game.
+    Handles movement, collision detection with players' paddles,
+    bouncing off walls, and resetting after a goal.
+
+    `step()` applies the discrete rules: move, then test where the ball ended up,
+    which lets a ball moving several pixels per step jump over a paddle.
+    `sweep()` handles every impact along the way instead.
+    """
+    __slots__ = ("x", "y", "size", "send_position", "dx", "dy", "speed", "game_height",
+                 "game_width", "paddle_width", "paddle_height", "left_goal", "right_goal", "carry")
+
+    def __init__(self, x, y, size, field=None, speed=1):
+        if field is None:
+            field = Field()
+        self.x = x
+        self.y = y
+        self.size = size
+        self.send_position = False  # Flag to indicate when to broadcast ball position.
+        self.dx = 1  # Horizontal direction.
+        self.dy = 1  # Vertical direction.
+        # Pixels moved along each axis per step.
+        self.speed = speed
+        self.game_height = field.height
+        self.game_width = field.width
+        self.paddle_width = field.paddle_width
+        self.paddle_height = field.paddle_height
+        self.left_goal = field.left_goal
+        self.right_goal = field.right_goal
+        # Pixels of the last `sweep()` left over when a goal ended it early.
+        self.carry = 0
+
+    def check_collision(self, paddles):
+        """
+        Checks for collisions with any player's paddle.
+        If a collision is detected, reverses the ball's horizontal direction.
+
+        :param paddles: Mapping of client IDs to (x, y) paddle positions.
+        """
+        for client_id, (player_x, player_y) in paddles.items():
+            if (player_x - self.size <= self.x <= player_x + self.paddle_width
+                    and player_y <= self.y <= player_y + self.paddle_height):
+                self.on_collide()
+                return True
+        return False
+
+    def check_bounce(self):
+        """
+        Reverses the ball's vertical direction if it touches the top or bottom boundaries.
+        """
+        if self.y <= 0 or self.y >= self.game_height - 1:
+            self.on_bounce()
+
+    def check_goal(self):
+        """
+        Checks if the ball has reached a goal area.
+        Resets the ball to the center and sets the horizontal direction accordingly.
+
+        :return: Client ID of the scoring player (1 for the right player when the
+                 ball passes the left paddle, 0 for the left one), or None.
+        """
+        if self.x < self.left_goal:
+            self.x = self.game_width // 2
+            self.y = self.game_height // 2
+            self.dx = 1
+            return 1
+        elif self.x > self.right_goal:
+            self.x = self.game_width // 2
+            self.y = self.game_height // 2
+            self.dx = -1
+            return 0
+        return None
+
+    def update(self):
+        """
+        Updates the ball's position based on its current velocity.
+        """
+        self.x += self.dx * self.speed
+        self.y += self.dy * self.speed
+
+    def step(self, paddles):
+        """
+        Advances the ball by one discrete step.
+
+        :return: Client ID of the scoring player (see `check_goal`), or None.
+        """
+        self.update()
+        self.check_collision(paddles)
+        self.check_bounce()
+        return self.check_goal()
+
+    def sweep(self, paddles):
+        """
+        Advances the ball by `speed` pixels with exactly the result of that many
+        one-pixel `step()`s, so a fast ball cannot tunnel through a paddle and a
+        lower tick rate gives the same outcomes as a higher one. Instead of
+        testing every pixel, the ball jumps straight to the next pixel where one
+        of the checks of `step()` applies (entering a paddle's collision region,
+        touching a wall, passing a goal line) and handles it there, so any number
+        of bounces within one step costs one jump each. Like `step()`, a goal ends
+        the step, so at most one goal is scored per call; the pixels left over
+        are added to the next call's, which keeps the ball where the one-pixel
+        steps would have it.
+
+        :param paddles: Mapping of client IDs to (x, y) paddle positions.
+        :return: Client ID of the scoring player (see `check_goal`), or None.
+        """
+        remaining = self.speed + self.carry
+        if remaining == 1:
+            return self.step(paddles)
+        self.carry = 0
+        while remaining > 0:
+            x, y, dx, dy = self.x, self.y, self.dx, self.dy
+            # One-pixel steps until the first check applies: wall, goal line or paddle.
+            steps = y if dy < 0 else self.game_height - 1 - y
+            steps = min(steps, x - self.left_goal + 1 if dx < 0 else self.right_goal - x + 1)
+            for player_x, player_y in paddles.values():
+                first_x, last_x = steps_into(x, dx, player_x - self.size, player_x + self.paddle_width)
+                first_y, last_y = steps_into(y, dy, player_y, player_y + self.paddle_height)
+                first = max(first_x, first_y, 1)
+                if first <= min(last_x, last_y):
+                    steps = min(steps, first)
+            steps = min(max(steps, 1), remaining)
+            self.x = x + dx * steps
+            self.y = y + dy * steps
+            remaining -= steps
+            # Nothing applies before the last pixel, so the checks of one `step()` suffice.
+            self.check_collision(paddles)
+            self.check_bounce()
+            scorer = self.check_goal()
+            if scorer is not None:
+                self.carry = remaining
+                return scorer
+        return None
+
+    def on_collide(self):
+        """
+        Called when the ball collides with a paddle.
+        Reverses the horizontal velocity.
+        """
+        self.dx *= -1
+
+    def on_bounce(self):
+        """
+        Called when the ball bounces off the top or bottom walls.
+        Reverses the vertical velocity.
+        """
+        self.dy *= -1
+
+def steps_into(position, direction, low, high):
+    """
+    One-pixel steps after which a coordinate moving by `direction` (+1 or -1) per
+    step is first and last within [low, high] (first > last when it never is).
+    """
+    if direction > 0:
+        return low - position, high - position
+    return position - high, position - low
@@ -2,6 +2,12 @@ import os
 from enum import Enum, IntEnum
 
 SAVE_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)),"SaveData","save_file.txt")
+# Playing field size shared by client and server.
+FIELD_WIDTH = 160
+FIELD_HEIGHT = 120
+PADDLE_WIDTH = 10
+PADDLE_HEIGHT = 40
+BALL_SIZE = 4
 #player_one:0
 #player_two:0
 
@@ -15,6 +21,15 @@ class PacketType(IntEnum):
     SPAWN = 2
     POSITION = 3
     POINT = 5
+    SNAPSHOT = 6
+    DELTA = 7
+    ACK = 8
+    STATS = 9
+    PING = 10
+    PONG = 11
+    SUBSCRIBE = 12
+    LEAVE = 13
+    RESET = 14
 
 class ObjectType(IntEnum):
     NONE = 1
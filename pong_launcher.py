@@ -0,0 +1,319 @@
+import argparse
+import multiprocessing
+import os
+import select
+import signal
+import socket
+import struct
+import time
+import pong_codec
+import pong_server
+from pong_global import PacketType
+
+# Dispatcher to worker framing: client IPv4 address and port, then the original datagram.
+ADDRESS_HEADER = struct.Struct(">4sH")
+LEAVE_BYTE = bytes((PacketType.LEAVE,))
+REQUEST_ID_BYTE = bytes((PacketType.REQUEST_ID,))
+SUBSCRIBE_BYTE = bytes((PacketType.SUBSCRIBE,))
+
+def worker_port(port, worker_index):
+    """
+    Private port of a worker in dispatcher mode.
+    """
+    return port + 1 + worker_index
+
+class DispatchedSocket:
+    """
+    Worker-side socket adapter used behind the dispatcher.
+    Strips the client address header added by the dispatcher so the server
+    logic sees real client addresses, and replies to clients directly.
+    """
+    def __init__(self, worker_socket):
+        self.worker_socket = worker_socket
+
+    def fileno(self):
+        return self.worker_socket.fileno()
+
+    def getsockname(self):
+        return self.worker_socket.getsockname()
+
+    def recvfrom(self, bufsize):
+        data, _ = self.worker_socket.recvfrom(bufsize + ADDRESS_HEADER.size)
+        client_ip, client_port = ADDRESS_HEADER.unpack_from(data)
+        return data[ADDRESS_HEADER.size:], (socket.inet_ntoa(client_ip), client_port)
+
+    def sendto(self, data, address):
+        return self.worker_socket.sendto(data, address)
+
+    def close(self):
+        self.worker_socket.close()
+
+def run_worker(worker_index, num_workers, host, port, tick_rate, mode, debug, metrics_dump=None,
+               ball_speed=None):
+    """
+    Entry point of a worker process: one full server loop on its own core.
+    SIGTERM finishes the current iteration and exits cleanly.
+    Each worker dumps its own metrics to `metrics_dump` suffixed with its index.
+    Worker w numbers its matches w, w + num_workers, w + 2 * num_workers...
+    """
+    pong_server.DEBUG_MODE = debug
+    pong_server.BALL_SPEED = ball_speed
+    pong_server.MATCH_ID_OFFSET = worker_index
+    pong_server.MATCH_ID_STRIDE = num_workers
+    # Only the dispatcher can send a SUBSCRIBE to the worker owning the match.
+    pong_server.ACCEPT_SUBSCRIPTIONS = mode == "dispatcher"
+    if metrics_dump:
+        pong_server.METRICS_DUMP_PATH = f"{metrics_dump}.{worker_index}"
+    signal.signal(signal.SIGTERM, lambda signum, frame: pong_server.stop_server())
+    # Ctrl+C is handled by the launcher, which then stops the workers.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if mode == "reuseport":
+        server_socket = pong_server.create_server_socket(host, port, reuse_port=True)
+    else:
+        server_socket = DispatchedSocket(
+            pong_server.create_server_socket(host, worker_port(port, worker_index)))
+    if debug:
+        print(f"Worker {worker_index} (pid {os.getpid()}) starting")
+    pong_server.start_server(tick_rate, server_socket)
+
+class Dispatcher:
+    """
+    Lightweight match-affine front end for dispatcher mode.
+    Each client address is pinned to one worker on first contact. Consecutive
+    registering clients (a REQUEST_ID) are sent to the same worker until a match
+    is full, so both players of a match always land on the worker that owns it;
+    a SUBSCRIBE goes to the worker owning the match it names (match ID modulo
+    the number of workers, see run_worker), and other senders (STATS, stray
+    packets) do not take part in the pairing and go to the worker being filled.
+    A route is dropped when
+    its client sends LEAVE or has been silent for pong_server.CLIENT_TIMEOUT
+    seconds, as the worker's session table drops the client itself.
+    """
+    def __init__(self, host, port, worker_addresses, players_per_match=pong_server.clients_to_start_game):
+        self.dispatch_socket = pong_server.create_server_socket(host, port)
+        self.worker_addresses = worker_addresses
+        self.players_per_match = players_per_match
+        # Mapping of client addresses to the worker address that owns their match.
+        self.routes = {}
+        # Addresses counted towards pairing (they registered with REQUEST_ID).
+        self.players = set()
+        # Mapping of client addresses to the time their last datagram arrived.
+        self.last_seen = {}
+        self.joined_clients = 0
+        self.next_expiry = time.monotonic() + pong_server.CLIENT_TIMEOUT
+
+    def route(self, client_address, now, data):
+        """
+        Returns the worker address for a datagram, assigning the client one on first
+        contact. A client's first REQUEST_ID seats it in the pairing order.
+        """
+        if data[:1] == SUBSCRIBE_BYTE:
+            return self.worker_addresses[pong_codec.decode_subscribe(data) % len(self.worker_addresses)]
+        registering = data[:1] == REQUEST_ID_BYTE
+        worker_address = self.routes.get(client_address)
+        if worker_address is None or (registering and client_address not in self.players):
+            match_index = self.joined_clients // self.players_per_match
+            worker_address = self.worker_addresses[match_index % len(self.worker_addresses)]
+            self.routes[client_address] = worker_address
+            if registering:
+                self.players.add(client_address)
+                self.joined_clients += 1
+        self.last_seen[client_address] = now
+        return worker_address
+
+    def forget(self, client_address):
+        self.routes.pop(client_address, None)
+        self.players.discard(client_address)
+        self.last_seen.pop(client_address, None)
+
+    def expire_routes(self, now):
+        """
+        Drops the routes of clients silent for longer than pong_server.CLIENT_TIMEOUT.
+        """
+        deadline = now - pong_server.CLIENT_TIMEOUT
+        for client_address in [address for address, seen in self.last_seen.items() if seen < deadline]:
+            self.forget(client_address)
+
+    def poll(self, timeout):
+        """
+        Waits up to `timeout` seconds and forwards every pending datagram.
+        """
+        read_sockets, _, _ = select.select([self.dispatch_socket], [], [], timeout)
+        now = time.monotonic()
+        if now >= self.next_expiry:
+            self.expire_routes(now)
+            self.next_expiry = now + pong_server.CLIENT_TIMEOUT
+        if not read_sockets:
+            return
+        while True:
+            try:
+                data, client_address = self.dispatch_socket.recvfrom(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionResetError:
+                continue
+            header = ADDRESS_HEADER.pack(socket.inet_aton(client_address[0]), client_address[1])
+            try:
+                worker_address = self.route(client_address, now, data)
+                self.dispatch_socket.sendto(header + data, worker_address)
+            except (BlockingIOError, ConnectionRefusedError):
+                # Worker restarting or overloaded: drop, as UDP would.
+                pass
+            except struct.error:
+                # Truncated SUBSCRIBE.
+                pass
+            if data[:1] == LEAVE_BYTE:
+                self.forget(client_address)
+
+    def close(self):
+        self.dispatch_socket.close()
+
+class Launcher:
+    """
+    Starts and supervises N server worker processes.
+
+    - reuseport: every worker binds the public port with SO_REUSEPORT and the
+      kernel hashes each client address to one worker, which pairs it with other
+      clients on that worker. Affinity holds while the worker set is stable; a
+      restart can rehash some addresses.
+      Spectator relays are not supported: workers ignore SUBSCRIBE.
+    - dispatcher: workers listen on private ports and a Dispatcher in the launcher
+      process pins clients to workers, so a client keeps its worker across restarts.
+      It routes SUBSCRIBE by match ID, and the worker streams the match from its
+      private port (pong_relay accepts states from any port of its upstream host).
+
+    Crashed workers are respawned; SIGHUP performs a rolling restart. A replaced
+    worker's matches are lost with it: the new worker answers their players'
+    packets with RESET and they register again (see pong_server.handle_packet).
+    """
+    def __init__(self, num_workers, host=pong_server.HOST, port=pong_server.PORT,
+                 tick_rate=pong_server.TICK_RATE, mode="reuseport", debug=False, metrics_dump=None,
+                 ball_speed=None):
+        self.num_workers = num_workers
+        self.host = host
+        self.port = port
+        self.tick_rate = tick_rate
+        self.mode = mode
+        self.debug = debug
+        self.metrics_dump = metrics_dump
+        self.ball_speed = ball_speed
+        self.workers = [None] * num_workers
+        self.dispatcher = None
+        self.is_running = False
+        self.restart_requested = False
+
+    def start_worker(self, worker_index):
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(worker_index, self.num_workers, self.host, self.port, self.tick_rate, self.mode,
+                  self.debug, self.metrics_dump, self.ball_speed),
+            daemon=True)
+        process.start()
+        self.workers[worker_index] = process
+
+    def stop_worker(self, worker_index, timeout=2.0):
+        """
+        Sends SIGTERM so the worker leaves its loop cleanly; kills it after `timeout`.
+        """
+        process = self.workers[worker_index]
+        if process is None:
+            return
+        process.terminate()
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        self.workers[worker_index] = None
+
+    def restart_worker(self, worker_index):
+        """
+        Gracefully replaces one worker. In reuseport mode the replacement binds
+        first so the port never goes without a listener.
+        """
+        if self.mode == "reuseport":
+            old_process = self.workers[worker_index]
+            self.start_worker(worker_index)
+            replacement = self.workers[worker_index]
+            self.workers[worker_index] = old_process
+            self.stop_worker(worker_index)
+            self.workers[worker_index] = replacement
+        else:
+            self.stop_worker(worker_index)
+            self.start_worker(worker_index)
+
+    def rolling_restart(self):
+        for worker_index in range(self.num_workers):
+            self.restart_worker(worker_index)
+
+    def supervise(self):
+        """
+        Respawns any worker that exited unexpectedly.
+        """
+        for worker_index, process in enumerate(self.workers):
+            if process is not None and not process.is_alive():
+                if self.debug:
+                    print(f"Worker {worker_index} exited with {process.exitcode}, respawning")
+                self.start_worker(worker_index)
+
+    def start(self):
+        for worker_index in range(self.num_workers):
+            self.start_worker(worker_index)
+        if self.mode == "dispatcher":
+            worker_addresses = [(self.host, worker_port(self.port, worker_index))
+                                for worker_index in range(self.num_workers)]
+            self.dispatcher = Dispatcher(self.host, self.port, worker_addresses)
+        self.is_running = True
+
+    def stop(self):
+        self.is_running = False
+        for worker_index in range(self.num_workers):
+            self.stop_worker(worker_index)
+        if self.dispatcher is not None:
+            self.dispatcher.close()
+            self.dispatcher = None
+
+    def request_stop(self, signum=None, frame=None):
+        self.is_running = False
+
+    def request_restart(self, signum=None, frame=None):
+        self.restart_requested = True
+
+    def run(self):
+        """
+        Starts the workers and supervises them until SIGINT/SIGTERM.
+        """
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.request_restart)
+        self.start()
+        try:
+            while self.is_running:
+                if self.dispatcher is not None:
+                    self.dispatcher.poll(0.5)
+                else:
+                    time.sleep(0.5)
+                if self.restart_requested:
+                    self.restart_requested = False
+                    self.rolling_restart()
+                self.supervise()
+        finally:
+            self.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Pong server on several worker processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--mode", choices=["reuseport", "dispatcher"], default="reuseport")
+    parser.add_argument("--host", default=pong_server.HOST)
+    parser.add_argument("--port", type=int, default=pong_server.PORT)
+    parser.add_argument("--tick-rate", type=int, default=pong_server.TICK_RATE)
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--metrics-dump", help="periodic JSON metrics path (one file per worker)")
+    parser.add_argument("--ball-speed", type=int,
+                        help="ball pixels per second, a multiple of the tick rate (default: one pixel per tick)")
+    args = parser.parse_args()
+    # Fail here rather than in every worker.
+    pong_server.ball_step(args.tick_rate, args.ball_speed)
+    print(f"Launching {args.workers} workers ({args.mode})...")
+    Launcher(args.workers, args.host, args.port, args.tick_rate, args.mode, args.debug,
+             args.metrics_dump, args.ball_speed).run()
@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import socket
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+import pong_codec
+
+# Upper bounds in seconds of the duration buckets: 50 us, doubling up to ~1.6 s.
+DURATION_BUCKETS = tuple(0.00005 * 2 ** i for i in range(16))
+
+class Histogram:
+    """
+    Fixed-bucket histogram: one bisect and a few additions per observation,
+    summarised with approximate percentiles (the upper bound of their bucket).
+    """
+    __slots__ = ("bounds", "buckets", "count", "total", "minimum", "maximum")
+
+    def __init__(self, bounds=DURATION_BUCKETS):
+        self.bounds = bounds
+        # One bucket per bound, plus one for values above the last bound.
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def observe(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, fraction):
+        """
+        :return: Upper bound of the bucket holding the `fraction` quantile (capped
+                 at the largest value seen), or None when nothing was observed.
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if bucket and seen >= rank:
+                if index < len(self.bounds):
+                    return min(self.bounds[index], self.maximum)
+                return self.maximum
+        return self.maximum
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.minimum,
+            "max": self.maximum,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+class Metrics:
+    """
+    Counters, histograms and gauges of one server process.
+    Counters are a plain dict so the packet path pays a single increment per
+    event; gauges are functions that are only evaluated when metrics are read.
+    """
+    def __init__(self, clock=time.monotonic):
+        self.counters = defaultdict(int)
+        self.histograms = {}
+        self.gauges = {}
+        self.clock = clock
+        self.started = clock()
+
+    def histogram(self, name, bounds=DURATION_BUCKETS):
+        """
+        Returns the histogram called `name`, creating it on first use.
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(bounds)
+        return histogram
+
+    def gauge(self, name, function):
+        """
+        Registers `function()` as the current value of the gauge `name`.
+        """
+        self.gauges[name] = function
+
+    def snapshot(self):
+        """
+        :return: JSON-serializable dict of every metric.
+        """
+        return {
+            "uptime": self.clock() - self.started,
+            "counters": dict(sorted(self.counters.items())),
+            "gauges": {name: function() for name, function in sorted(self.gauges.items())},
+            "histograms": {name: histogram.summary() for name, histogram in sorted(self.histograms.items())},
+        }
+
+    def to_json(self, max_bytes=None):
+        """
+        :param max_bytes: Optional size limit of the text (e.g. one STATS datagram).
+                          Over it, the largest gauges are replaced by "omitted"
+                          until the text fits, and "truncated" is set.
+        """
+        snapshot = self.snapshot()
+        text = json.dumps(snapshot, sort_keys=True)
+        if max_bytes is None or len(text) <= max_bytes:
+            return text
+        snapshot["truncated"] = True
+        gauges = snapshot["gauges"]
+        for name in sorted(gauges, key=lambda name: len(json.dumps(gauges[name])), reverse=True):
+            gauges[name] = "omitted"
+            text = json.dumps(snapshot, sort_keys=True)
+            if len(text) <= max_bytes:
+                return text
+        # Counters and histograms are bounded by the code; this is a last resort.
+        return json.dumps({"uptime": snapshot["uptime"], "truncated": True}, sort_keys=True)
+
+    def dump(self, path):
+        """
+        Writes the metrics as JSON to `path`, replacing the previous dump atomically.
+        """
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as dump_file:
+            dump_file.write(self.to_json())
+        os.replace(temporary_path, path)
+
+class RateLimitedLog:
+    """
+    Prints at most one message per key every `interval` seconds and tells how many
+    were suppressed in between, so logging cost stays flat under load.
+    Messages are formatted %-style only when they are actually printed.
+    """
+    def __init__(self, interval=1.0, clock=time.monotonic, output=print):
+        self.interval = interval
+        self.clock = clock
+        self.output = output
+        # Mapping of keys to the time their last message was printed.
+        self.last_printed = {}
+        self.suppressed = defaultdict(int)
+
+    def log(self, key, message, *args):
+        """
+        :return: True when the message was printed.
+        """
+        now = self.clock()
+        last_printed = self.last_printed.get(key)
+        if last_printed is not None and now - last_printed < self.interval:
+            self.suppressed[key] += 1
+            return False
+        self.last_printed[key] = now
+        if args:
+            message = message % args
+        suppressed = self.suppressed.pop(key, 0)
+        if suppressed:
+            message = f"{message} ({suppressed} similar suppressed)"
+        self.output(message)
+        return True
+
+def query_stats(host, port, timeout=1.0):
+    """
+    Asks a running server for its metrics with a STATS packet.
+
+    :return: The metrics dict, or None when the server did not answer in time.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as query_socket:
+        query_socket.settimeout(timeout)
+        query_socket.sendto(pong_codec.encode_stats_request(), (host, port))
+        try:
+            data, _ = query_socket.recvfrom(65535)
+        except socket.timeout:
+            return None
+    return json.loads(pong_codec.decode_stats_response(data))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the metrics of a running Pong server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12345)
+    args = parser.parse_args()
+    stats = query_stats(args.host, args.port)
+    if stats is None:
+        raise SystemExit(f"No answer from {args.host}:{args.port}")
+    print(json.dumps(stats, indent=2, sort_keys=True))
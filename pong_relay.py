@@ -0,0 +1,201 @@
+"""
+Spectator relay: subscribes once to a match stream and fans it out to many viewers.
+
+The game server feeds at most pong_server.MAX_SUBSCRIBERS spectator streams per
+match, so its egress does not grow with the audience. A relay takes one of those
+streams and forwards every state it receives, as the very same bytes, to each
+viewer subscribed to it. Viewers subscribe to a relay with the SUBSCRIBE packet
+they would send the server, and so does a relay to its upstream, so relays chain
+into a fan-out tree: a relay's upstream is the game server or another relay.
+Behind pong_launcher, relay the dispatcher's address in --mode dispatcher: the
+match's worker answers from its own port on the same host, so states are
+accepted from any port of the upstream host. Reuseport workers refuse SUBSCRIBE.
+
+Usage: python pong_relay.py --upstream 127.0.0.1:12345 --match 0 [--port 12400] [--max-viewers 1000]
+"""
+import argparse
+import asyncio
+import socket
+import struct
+import time
+
+import pong_codec
+import pong_metrics
+import pong_server
+from pong_global import PacketType
+
+PORT = 12400
+# Viewers one relay serves; more viewers need more relays (a wider or deeper tree).
+MAX_VIEWERS = 1000
+# The upstream subscription is renewed this often (seconds), well within
+# pong_server.SUBSCRIPTION_TIMEOUT.
+SUBSCRIBE_INTERVAL = 1.0
+# Viewers that have not renewed their SUBSCRIBE for this many seconds are dropped.
+VIEWER_TIMEOUT = pong_server.SUBSCRIPTION_TIMEOUT
+# Match states forwarded as they are; they are self-contained keyframes or SNAPSHOTs.
+STATE_TYPES = frozenset((int(PacketType.DELTA), int(PacketType.SNAPSHOT)))
+
+def resolve(address):
+    """
+    Returns (IPv4 address, port) so it compares equal to the source of received datagrams.
+    """
+    host, port = address
+    return socket.gethostbyname(host), port
+
+class RelayProtocol(asyncio.DatagramProtocol):
+    """
+    Datagram logic of a relay node: forwards upstream states to its viewers and
+    manages their subscriptions (renewed with SUBSCRIBE, ended with LEAVE or by
+    timing out). Answers PINGs (RTT to the relay) and local
+    STATS queries with its own metrics.
+    """
+    def __init__(self, upstream, match_id, max_viewers=MAX_VIEWERS, clock=time.monotonic):
+        self.upstream = upstream
+        self.match_id = match_id
+        self.max_viewers = max_viewers
+        self.clock = clock
+        self.transport = None
+        # Mapping of viewer addresses to the time their subscription expires.
+        self.viewers = {}
+        self.metrics = pong_metrics.Metrics(clock)
+        self.counters = self.metrics.counters
+        self.metrics.gauge("viewers", lambda: len(self.viewers))
+        self.subscribe_packet = pong_codec.encode_subscribe(match_id)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if not data:
+            return
+        packet_type = data[0]
+        counters = self.counters
+        if packet_type in STATE_TYPES:
+            # The subscribed stream; behind a dispatcher it comes from a worker's port.
+            if addr[0] == self.upstream[0]:
+                self.forward(data)
+            else:
+                counters["foreign_states"] += 1
+            return
+        if addr == self.upstream:
+            return
+        try:
+            if packet_type == PacketType.SUBSCRIBE:
+                self.add_viewer(pong_codec.decode_subscribe(data), addr)
+            elif packet_type == PacketType.LEAVE:
+                if self.viewers.pop(addr, None) is not None:
+                    counters["left_viewers"] += 1
+            elif packet_type == PacketType.PING:
+                self.transport.sendto(pong_codec.encode_pong(pong_codec.decode_ping(data)), addr)
+            elif packet_type == PacketType.STATS and addr[0] in pong_server.LOCAL_HOSTS:
+                self.transport.sendto(pong_codec.encode_stats_response(self.metrics.to_json(pong_codec.MAX_STATS_TEXT)), addr)
+            else:
+                counters["unexpected_packets"] += 1
+        except struct.error:
+            counters["malformed_packets"] += 1
+
+    def error_received(self, exc):
+        # ICMP errors from departed viewers must not stop the relay.
+        self.counters["transport_errors"] += 1
+
+    def forward(self, data):
+        """
+        Sends one received state, unchanged, to every viewer.
+        """
+        sendto = self.transport.sendto
+        viewers = self.viewers
+        for viewer in viewers:
+            sendto(data, viewer)
+        counters = self.counters
+        counters["states_in"] += 1
+        counters["packets_out"] += len(viewers)
+        counters["bytes_out"] += len(data) * len(viewers)
+
+    def add_viewer(self, match_id, addr):
+        """
+        Adds or renews a viewer subscribed to this relay's match.
+        """
+        if match_id != self.match_id:
+            self.counters["wrong_match_subscriptions"] += 1
+            return
+        if addr not in self.viewers and len(self.viewers) >= self.max_viewers:
+            self.counters["rejected_viewers"] += 1
+            return
+        self.viewers[addr] = self.clock() + VIEWER_TIMEOUT
+
+    def housekeeping(self):
+        """
+        Renews the upstream subscription and drops viewers that stopped renewing theirs.
+        """
+        self.transport.sendto(self.subscribe_packet, self.upstream)
+        now = self.clock()
+        expired = [viewer for viewer, expiry in self.viewers.items() if expiry <= now]
+        for viewer in expired:
+            del self.viewers[viewer]
+        self.counters["expired_viewers"] += len(expired)
+
+class SpectatorRelay:
+    """
+    A relay node on the asyncio loop: the RelayProtocol plus the task renewing
+    its subscription every SUBSCRIBE_INTERVAL.
+    """
+    def __init__(self, upstream, match_id, max_viewers=MAX_VIEWERS):
+        self.protocol = RelayProtocol(upstream, match_id, max_viewers)
+        self.transport = None
+        self.task = None
+
+    async def start(self, transport=None, host="0.0.0.0", port=PORT):
+        """
+        Attaches the relay to `transport` (e.g. a LoopbackNetwork endpoint), or binds
+        a UDP endpoint when none is given, and subscribes upstream.
+        """
+        if transport is None:
+            loop = asyncio.get_running_loop()
+            transport, _ = await loop.create_datagram_endpoint(lambda: self.protocol, local_addr=(host, port))
+        else:
+            self.protocol.connection_made(transport)
+        self.transport = transport
+        self.task = asyncio.ensure_future(self._renew())
+
+    async def _renew(self):
+        while True:
+            self.protocol.housekeeping()
+            await asyncio.sleep(SUBSCRIBE_INTERVAL)
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        if self.transport is not None:
+            self.transport.close()
+
+def parse_address(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+async def run_relay(upstream, match_id, host, port, max_viewers):
+    relay = SpectatorRelay(resolve(upstream), match_id, max_viewers)
+    await relay.start(host=host, port=port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await relay.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--upstream", type=parse_address, default=("127.0.0.1", pong_server.PORT),
+                        help="game server or parent relay, host:port")
+    parser.add_argument("--match", type=int, default=0, help="match ID to relay")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-viewers", type=int, default=MAX_VIEWERS)
+    args = parser.parse_args()
+    print(f"Relaying match {args.match} from {args.upstream[0]}:{args.upstream[1]} on port {args.port}")
+    try:
+        asyncio.run(run_relay(args.upstream, args.match, args.host, args.port, args.max_viewers))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
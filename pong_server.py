@@ -1,101 +1,379 @@
+import heapq
+import select
 import socket
 import struct
-import zlib
-import pyxel
+import time
+import link_quality
+import pong_codec
+import pong_metrics
+from pong_core import Ball, Field
 from pong_global import ObjectType, PacketType
+from tick_scheduler import TickScheduler
 
 DEBUG_MODE = True
 HOST = 'localhost'
 PORT = 12345
+# Authoritative simulation rate in Hz (e.g. 30, 60 or 120).
+TICK_RATE = 60
+# Maximum number of simulation steps run back-to-back after a stall.
+MAX_CATCH_UP_TICKS = 5
+# Match snapshots sent per second; clients interpolate between them.
+SNAPSHOT_RATE = 30
+# Step the ball along its continuous path (pong_core.Ball.sweep) instead of testing
+# only where it lands, so fast balls and low tick rates do not tunnel through paddles.
+SWEPT_COLLISIONS = True
+# Ball speed in pixels per second along each axis (None: one pixel per tick, so the
+# ball speed follows the tick rate). Must be a multiple of the tick rate.
+BALL_SPEED = None
+# Match IDs of this process are MATCH_ID_OFFSET, + MATCH_ID_STRIDE, + 2 * MATCH_ID_STRIDE...
+# pong_launcher gives worker w of N the offset w and stride N, so IDs are unique
+# across workers and the dispatcher finds a match's worker from its ID.
+MATCH_ID_OFFSET = 0
+MATCH_ID_STRIDE = 1
+# Serve SUBSCRIBE. Off on pong_launcher's reuseport workers: the kernel, not the
+# match ID, picks the worker a SUBSCRIBE reaches, so a relay would watch by luck.
+ACCEPT_SUBSCRIPTIONS = True
 
-# Mapping of client addresses to assigned client IDs.
-clients = {}
-# Mapping of client IDs to their (x, y) positions.
-clients_position = {}
-next_client_id = 0
-# Number of connected clients required to start sending ball updates.
+# Number of clients paired into one match; the ball starts once it is full.
 clients_to_start_game = 2
+# Cleared by stop_server() to end the start_server loop.
+is_server_running = False
+# Reusable buffer every match SNAPSHOT is encoded into.
+snapshot_writer = pong_codec.SnapshotWriter()
+# Send compact DELTA packets instead of full SNAPSHOTs.
+DELTA_SNAPSHOTS = True
+# A DELTA keyframe is sent to every client once per this many snapshots.
+KEYFRAME_INTERVAL = 60
+# Number of past match states kept as delta bases (must stay below 128).
+STATE_HISTORY_LENGTH = 32
+# Debug messages of one kind are printed at most once per this many seconds.
+LOG_INTERVAL = 1.0
+# Metrics are written as JSON to this file every METRICS_DUMP_INTERVAL seconds (None: never).
+METRICS_DUMP_PATH = None
+METRICS_DUMP_INTERVAL = 10.0
+# Every datagram and tick run is recorded to this capture file for replay (None: off).
+CAPTURE_PATH = None
+# Every client is pinged this often (seconds); each ping closes the window its
+# round-trip time and loss are judged on.
+PING_INTERVAL = 0.5
+# Adapt each client's snapshot rate to its link: congested or high-latency
+# clients get every 2nd, 3rd... up to every MAX_SNAPSHOT_INTERVAL-th snapshot.
+ADAPTIVE_RATES = True
+MAX_SNAPSHOT_INTERVAL = 4
+# A window is congested above this loss ratio or smoothed round-trip time (seconds).
+MAX_LOSS = 0.1
+MAX_RTT = 0.25
+# Client links listed by name in the "client_links" gauge (those with the
+# highest round-trip times); the rest are only counted, so STATS stays small.
+LINK_REPORT_LIMIT = 8
+# Unacknowledged snapshot sequences remembered per client.
+MAX_IN_FLIGHT = 64
+# Spectator streams (relays, see pong_relay, or viewers subscribing directly) one
+# match feeds. A match's egress stays one datagram per player plus one per
+# subscriber per snapshot, however large the audience behind the relays grows.
+MAX_SUBSCRIBERS = 4
+# Subscriptions not renewed with a SUBSCRIBE for this many seconds are dropped.
+SUBSCRIPTION_TIMEOUT = 5.0
+# Clients silent for this many seconds are evicted (a connected client sends
+# POSITIONs, ACKs and PONGs several times per second).
+CLIENT_TIMEOUT = 10.0
+# Connected clients the session table holds; further joins are refused.
+MAX_SESSIONS = 4096
 
-class Ball:
+# Counters, histograms and gauges of this server process, also served to STATS queries.
+metrics = pong_metrics.Metrics()
+counters = metrics.counters
+tick_duration = metrics.histogram("tick_duration")
+client_rtt = metrics.histogram("client_rtt")
+log = pong_metrics.RateLimitedLog(LOG_INTERVAL)
+# Counter names per packet type, built once so the packet path does no formatting.
+PACKETS_IN = {int(packet_type): f"packets_in.{packet_type.name.lower()}" for packet_type in PacketType}
+PACKETS_OUT = {int(packet_type): f"packets_out.{packet_type.name.lower()}" for packet_type in PacketType}
+SNAPSHOT_OUT = PACKETS_OUT[PacketType.SNAPSHOT]
+DELTA_OUT = PACKETS_OUT[PacketType.DELTA]
+PING_OUT = PACKETS_OUT[PacketType.PING]
+REJECTED_POSITIONS = {"length": "length_mismatches", "crc": "crc_failures"}
+LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}
+# Packets only a registered player sends; from an unknown address they are
+# answered with RESET (its session was lost in a worker restart or evicted).
+SESSION_PACKET_TYPES = frozenset(int(packet_type) for packet_type in
+                                 (PacketType.POSITION, PacketType.ACK, PacketType.PING, PacketType.PONG))
+
+class ClientLink:
+    """
+    Link quality and snapshot rate of one client. The round-trip time comes from
+    the server's PINGs, the loss of the snapshots sent to the client from the
+    received bits of its ACKs, and the loss of its POSITION packets from gaps in
+    their counters.
+    """
+    __slots__ = ("pings", "downlink", "uplink", "rate", "in_flight", "position_counter", "last_seen")
+
+    def __init__(self, clock=time.monotonic):
+        self.pings = link_quality.PingTracker(clock, on_sample=client_rtt.observe)
+        self.downlink = link_quality.LossCounter()
+        self.uplink = link_quality.LossCounter()
+        self.rate = link_quality.AdaptiveRate(1, MAX_SNAPSHOT_INTERVAL, MAX_LOSS, MAX_RTT)
+        # Snapshot sequences sent to the client and not yet covered by one of its ACKs,
+        # oldest first. The broadcasts append to it; `trim()` bounds it.
+        self.in_flight = []
+        self.position_counter = None
+        # Tick count when the client's last datagram arrived.
+        self.last_seen = 0
+
+    def acknowledge(self, sequence, received_bits):
+        """
+        Counts the in-flight sequences up to the acknowledged one as delivered or lost.
+        """
+        received = lost = 0
+        pending = []
+        for sent in self.in_flight:
+            behind = (sequence - sent) & 0xFF
+            if behind >= 128:
+                # Sent after the acknowledged state.
+                pending.append(sent)
+            elif behind == 0 or (behind <= link_quality.ACK_WINDOW and received_bits >> (behind - 1) & 1):
+                received += 1
+            else:
+                lost += 1
+        self.in_flight = pending
+        self.downlink.record(received, lost)
+
+    def trim(self):
+        """
+        Forgets the oldest in-flight sequences of a client that stopped acknowledging,
+        before the 8-bit sequence wraps around onto them.
+        """
+        if len(self.in_flight) > MAX_IN_FLIGHT:
+            del self.in_flight[:-MAX_IN_FLIGHT]
+
+    def position_received(self, packet_counter):
+        """
+        Counts a POSITION packet and the ones its counter shows were skipped.
+        """
+        last_counter = self.position_counter
+        if last_counter is None:
+            self.uplink.record(1)
+        else:
+            gap = (packet_counter - last_counter) & 0xFF
+            if gap == 0 or gap >= 128:
+                # Duplicate or late packet.
+                return
+            self.uplink.record(1, gap - 1)
+        self.position_counter = packet_counter
+
+    def stats(self):
+        return {
+            "rtt": self.pings.rtt,
+            "rtt_min": self.pings.rtt_min,
+            "loss": self.downlink.loss,
+            "uplink_loss": self.uplink.loss,
+            "lost_pings": self.pings.lost,
+            "snapshot_interval": self.rate.interval,
+        }
+
+class Match:
     """
-    Represents the ball in the Pong game.
-    Handles movement, collision detection with players' paddles,
-    bouncing off walls, and resetting after a goal.
+    A single Pong game: its own ball, paddle table, score and client addresses.
+    Client IDs are local to the match (0 is the left player, 1 the right one)
+    and the seat of a client that leaves is given to the next one to join.
     """
-    def __init__(self, x, y, size):
-        self.x = x
-        self.y = y
-        self.size = size
-        self.send_position = False  # Flag to indicate when to broadcast ball position.
-        self.dx = 1  # Horizontal velocity.
-        self.dy = 1  # Vertical velocity.
-        self.game_height = 120
-        self.game_width = 160
+    __slots__ = ("match_id", "ball", "addresses", "paddles", "scores", "snapshot_counter",
+                 "state_history", "acks", "links", "subscribers", "free_ids", "capacity",
+                 "field", "clock")
 
-    def check_collision(self):
+    def __init__(self, match_id, capacity=2, field=None, ball_step=1, clock=time.monotonic):
+        self.match_id = match_id
+        self.field = field if field is not None else Field()
+        center_x, center_y = self.field.center()
+        self.ball = Ball(center_x, center_y, self.field.ball_size, self.field, ball_step)
+        # Mapping of client addresses to match-local client IDs.
+        self.addresses = {}
+        # Mapping of client IDs to their (x, y) positions.
+        self.paddles = {}
+        # Points of the left (0) and right (1) player.
+        self.scores = [0, 0]
+        # Sequence counter of the SNAPSHOT packets sent for this match.
+        self.snapshot_counter = 0
+        # Mapping of recent snapshot sequences to match states, the bases of DELTA packets.
+        self.state_history = {}
+        # Mapping of client IDs to the newest snapshot sequence each one acknowledged.
+        self.acks = {}
+        # Mapping of client IDs to their ClientLink.
+        self.links = {}
+        # Mapping of spectator stream addresses to the time their subscription expires.
+        self.subscribers = {}
+        # Heap of the client IDs (seats) not taken, lowest first.
+        self.free_ids = list(range(capacity))
+        self.capacity = capacity
+        # Time source of the client links' round-trip measurements.
+        self.clock = clock
+
+    def add_client(self, client_address):
+        """
+        Assigns the lowest free match-local client ID to a new address.
+        """
+        client_id = heapq.heappop(self.free_ids)
+        self.addresses[client_address] = client_id
+        self.links[client_id] = ClientLink(self.clock)
+        return client_id
+
+    def remove_client(self, client_address):
+        """
+        Frees the seat of a departing client. The game ends with it: the ball
+        waits at the center and the score restarts once the match is full again.
+
+        :return: The freed client ID.
+        """
+        client_id = self.addresses.pop(client_address)
+        self.paddles.pop(client_id, None)
+        self.acks.pop(client_id, None)
+        del self.links[client_id]
+        heapq.heappush(self.free_ids, client_id)
+        center_x, center_y = self.field.center()
+        self.ball = Ball(center_x, center_y, self.field.ball_size, self.field, self.ball.speed)
+        self.scores = [0, 0]
+        return client_id
+
+    def is_full(self):
+        return len(self.addresses) >= self.capacity
+
+class MatchMaker:
+    """
+    Pairs incoming clients into matches and keeps the session table routing
+    addresses to their match. New clients take a free seat in the match that has
+    waited longest for a player; a fresh match is opened when none has one. Clients leave with a
+    LEAVE packet or are evicted after CLIENT_TIMEOUT seconds of silence; empty
+    matches are closed and their IDs reused, so memory and broadcast cost
+    follow the active players, not every client ever seen. A closed match's ID
+    is held back until nobody has subscribed to it for SUBSCRIPTION_TIMEOUT
+    seconds, so a spectator still renewing it is never moved to another game.
+    """
+    def __init__(self, players_per_match=clients_to_start_game, field=None, ball_step=1,
+                 tick_rate=TICK_RATE, match_id_offset=0, match_id_stride=1):
+        self.players_per_match = players_per_match
+        # Field dimensions shared by every match.
+        self.field = field if field is not None else Field()
+        # Pixels the ball of each match moves per tick.
+        self.ball_step = ball_step
+        # Mapping of match IDs to active matches.
+        self.matches = {}
+        # Mapping of client addresses to the match that owns them.
+        self.client_matches = {}
+        # Mapping of the IDs of matches with a free seat to the match, oldest first.
+        self.open_matches = {}
+        # Heap of the IDs of closed matches, reused before new ones.
+        self.free_match_ids = []
+        # Mapping of the IDs of recently closed matches to the tick they may be reused at.
+        self.held_match_ids = {}
+        # IDs of new matches: `match_id_offset`, then every `match_id_stride`-th one.
+        self.next_match_id = match_id_offset
+        self.match_id_stride = match_id_stride
+        # Simulation ticks run so far. Link round trips are timed in ticks, not
+        # wall-clock time, so a captured session replays the same rate decisions.
+        self.tick_rate = tick_rate
+        self.tick_count = 0
+        self.ping_interval = max(1, round(PING_INTERVAL * tick_rate))
+        self.client_timeout = max(1, round(CLIENT_TIMEOUT * tick_rate))
+        self.match_id_hold = max(1, round(SUBSCRIPTION_TIMEOUT * tick_rate))
+
+    def now(self):
         """
-        Checks for collisions with any player's paddle.
-        If a collision is detected, reverses the ball's horizontal direction.
+        Simulation time in seconds.
         """
-        for client_id, (player_x, player_y) in clients_position.items():
-            # Assuming paddle dimensions: width = 10, height = 40.
-            if player_x - self.size <= self.x <= player_x + 10 and player_y <= self.y <= player_y + 40:
-                self.on_collide()
-                return True
-        return False
+        return self.tick_count / self.tick_rate
 
-    def check_bounce(self):
+    def lookup(self, client_address):
         """
-        Reverses the ball's vertical direction if it touches the top or bottom boundaries.
+        Returns the match owning the address, or None for unknown clients.
+        """
+        return self.client_matches.get(client_address)
+
+    def join(self, client_address):
+        """
+        Seats a new client in an open match.
+
+        :return: Tuple of (match, client_id), or None when the session table is full.
         """
-        if self.y <= 0 or self.y >= self.game_height - 1:
-            self.on_bounce()
-        #Todo: add the score and save
+        if len(self.client_matches) >= MAX_SESSIONS:
+            return None
+        if self.open_matches:
+            match = next(iter(self.open_matches.values()))
+        else:
+            if self.held_match_ids:
+                self.release_match_ids()
+            if self.free_match_ids:
+                match_id = heapq.heappop(self.free_match_ids)
+            else:
+                match_id = self.next_match_id
+                self.next_match_id += self.match_id_stride
+            match = Match(match_id, self.players_per_match, self.field, self.ball_step, self.now)
+            self.matches[match_id] = match
+            self.open_matches[match_id] = match
+        client_id = match.add_client(client_address)
+        match.links[client_id].last_seen = self.tick_count
+        self.client_matches[client_address] = match
+        if match.is_full():
+            del self.open_matches[match.match_id]
+        return match, client_id
 
-    def check_goal(self):
+    def leave(self, client_address):
         """
-        Checks if the ball has reached a goal area.
-        Resets the ball to the center and sets the horizontal direction accordingly.
+        Removes a client from the session table and its match, closing the match
+        when it is left empty.
+
+        :return: The match the client left, or None for unknown addresses.
         """
-        if self.x < 10: #player position
-            self.x = self.game_width // 2
-            self.y = self.game_height // 2
-            self.dx = 1
-        elif self.x > 150: #player position - width
-            self.x = self.game_width // 2
-            self.y = self.game_height // 2
-            self.dx = -1
+        match = self.client_matches.pop(client_address, None)
+        if match is None:
+            return None
+        match.remove_client(client_address)
+        if match.addresses:
+            self.open_matches[match.match_id] = match
+        else:
+            del self.matches[match.match_id]
+            self.open_matches.pop(match.match_id, None)
+            self.held_match_ids[match.match_id] = self.tick_count + self.match_id_hold
+        return match
 
-    def update(self):
+    def renew_hold(self, match_id):
         """
-        Updates the ball's position based on its current velocity.
+        Keeps a closed match's ID from being reused while it is still subscribed to.
         """
-        self.x += self.dx
-        self.y += self.dy
+        if match_id in self.held_match_ids:
+            self.held_match_ids[match_id] = self.tick_count + self.match_id_hold
 
-    def on_collide(self):
+    def release_match_ids(self):
         """
-        Called when the ball collides with a paddle.
-        Reverses the horizontal velocity.
+        Makes the held IDs whose hold has passed available to new matches.
         """
-        self.dx *= -1
+        released = [match_id for match_id, release_tick in self.held_match_ids.items()
+                    if release_tick <= self.tick_count]
+        for match_id in released:
+            del self.held_match_ids[match_id]
+            heapq.heappush(self.free_match_ids, match_id)
 
-    def on_bounce(self):
+    def evict_idle(self):
         """
-        Called when the ball bounces off the top or bottom walls.
-        Reverses the vertical velocity.
+        Removes every client not heard from for `client_timeout` ticks.
+
+        :return: Number of evicted clients.
         """
-        self.dy *= -1
+        deadline = self.tick_count - self.client_timeout
+        idle = [client_address for match in self.matches.values()
+                for client_address, client_id in match.addresses.items()
+                if match.links[client_id].last_seen < deadline]
+        for client_address in idle:
+            self.leave(client_address)
+        return len(idle)
 
 def create_packet(packet_type, players_to_spawn_in_pos=[]):
     """
     Constructs a packet for the given packet type and associated data.
     
-    Currently, only the SPAWN packet is implemented.
-    
     :param packet_type: The type of packet to create (e.g., PacketType.SPAWN).
     :param players_to_spawn_in_pos: A list containing spawn data for each player,
-                                    grouped as [playerID, x, y, ...].
+                                    grouped as [playerID, x, y, ...]; for REQUEST_ID
+                                    [client_id], for POSITION [client_id, counter, x, y].
     :return: The packed binary data for the packet.
     """
     if packet_type == PacketType.SPAWN:
@@ -106,112 +384,517 @@ def create_packet(packet_type, players_to_spawn_in_pos=[]):
             data = struct.pack(struct_format, PacketType.SPAWN, num_players, *players_to_spawn_in_pos)
             return data
     elif packet_type == PacketType.REQUEST_ID:
-        # TODO: Implement packet creation for REQUEST_ID
-        pass
+        # Registration response; the first spawn entry is the assigned client ID.
+        return pong_codec.encode_id_response(players_to_spawn_in_pos[0])
     elif packet_type == PacketType.POSITION:
-        # TODO: Implement packet creation for POSITION updates
-        pass
+        # Ball update laid out as [client_id, packet_counter, x, y].
+        return pong_codec.encode_position(ObjectType.BALL, *players_to_spawn_in_pos)
     return b""
 
 def unpack_packet(data):
     """
-    Unpacks a packet received from a client.
-    This function serves as a placeholder for a more generalized packet unpacking logic.
-    
+    Unpacks a packet received from a client using the shared codec.
+
     :param data: The binary packet data.
-    :return: Unpacked values as a tuple.
+    :return: Tuple starting with the packet type followed by its fields, or None
+             for unknown, truncated or corrupted packets.
+    """
+    if not data:
+        return None
+    packet_type = data[0]
+    try:
+        if packet_type == PacketType.REQUEST_ID:
+            return (packet_type,) + pong_codec.decode_request_id(data)
+        elif packet_type == PacketType.POSITION:
+            fields = pong_codec.decode_position(data)
+            if fields is not None:
+                return (packet_type,) + fields
+    except struct.error:
+        pass
+    return None
+
+def handle_packet(server_socket, data, client_address, match_maker):
+    """
+    Processes a single datagram: client registration, ID re-requests,
+    POSITION updates of the client's paddle and LEAVE. Nothing is relayed here:
+    the match state reaches clients in one SNAPSHOT per tick. ACKs, PINGs and
+    PONGs feed the client's link measurements; any datagram from a client
+    refreshes its session. Players the server has no session for are told to
+    register again with RESET.
+    Local STATS queries are answered with the server metrics.
+    """
+    counters[PACKETS_IN.get(data[0], "packets_in.unknown")] += 1
+    counters["bytes_in"] += len(data)
+
+    match = match_maker.lookup(client_address)
+    # Handle new client registration.
+    if match is None:
+        if data[0] == PacketType.STATS:
+            send_stats(server_socket, client_address)
+            return
+        if data[0] == PacketType.SUBSCRIBE:
+            subscribe(data, client_address, match_maker)
+            return
+        if data[0] == PacketType.LEAVE:
+            # Already gone (a repeated LEAVE, or evicted before it arrived).
+            return
+        if data[0] in SESSION_PACKET_TYPES:
+            server_socket.sendto(pong_codec.encode_reset(), client_address)
+            counters[PACKETS_OUT[PacketType.RESET]] += 1
+            return
+        if data[0] != PacketType.REQUEST_ID:
+            counters["unknown_client_packets"] += 1
+            return
+        _, client_x_pos, client_y_pos = pong_codec.decode_request_id(data)
+        joined = match_maker.join(client_address)
+        if joined is None:
+            counters["rejected_joins"] += 1
+            if DEBUG_MODE:
+                log.log("full", "Session table full, refusing client %s", client_address)
+            return
+        match, client_id = joined
+        counters["clients_joined"] += 1
+        if DEBUG_MODE:
+            log.log("join", "Assigned ID %s in match %s to new client %s",
+                    client_id, match.match_id, client_address)
+
+        # Send the assigned client ID back to the client.
+        server_socket.sendto(pong_codec.encode_id_response(client_id), client_address)
+        counters[PACKETS_OUT[PacketType.REQUEST_ID]] += 1
+        match.paddles[client_id] = (client_x_pos, client_y_pos)
+        # Start ball updates once the match is full.
+        if match.is_full():
+            match.ball.send_position = True
+
+    else:
+        # Retrieve the packet type from the first byte.
+        packet_type = data[0]
+        client_id = match.addresses[client_address]
+        link = match.links[client_id]
+        link.last_seen = match_maker.tick_count
+
+        if packet_type == PacketType.REQUEST_ID:
+            # Client is re-requesting its ID.
+            if DEBUG_MODE:
+                log.log("resend", "Resending client ID %s to client %s", client_id, client_address)
+            server_socket.sendto(pong_codec.encode_id_response(client_id), client_address)
+            counters[PACKETS_OUT[PacketType.REQUEST_ID]] += 1
+            # Update client's position from the registration packet.
+            _, client_x_pos, client_y_pos = pong_codec.decode_request_id(data)
+            match.paddles[client_id] = (client_x_pos, client_y_pos)
+
+        elif packet_type == PacketType.POSITION:
+            # Length and CRC32 are verified by the codec.
+            fields = pong_codec.decode_position(data)
+            if fields is None:
+                counters[REJECTED_POSITIONS[pong_codec.position_error(data)]] += 1
+                return
+            _, recv_client_id, packet_counter, x_pos, y_pos = fields
+            # Only the owning client may move its paddle.
+            if recv_client_id != client_id:
+                counters["foreign_positions"] += 1
+                return
+            link.position_received(packet_counter)
+            # Update the client's position.
+            match.paddles[client_id] = (x_pos, y_pos)
+            if DEBUG_MODE:
+                log.log("position", "Received POSITION packet from client %s with position (%s, %s)",
+                        client_id, x_pos, y_pos)
+
+        elif packet_type == PacketType.ACK:
+            # Newest state the client applied; later deltas are encoded against it.
+            sequence, received_bits = pong_codec.decode_ack(data)
+            match.acks[client_id] = sequence
+            if received_bits is not None:
+                link.acknowledge(sequence, received_bits)
+
+        elif packet_type == PacketType.PING:
+            # Echo it with the loss of the client's POSITION packets since its last ping.
+            loss = link.uplink.take_loss()
+            server_socket.sendto(pong_codec.encode_pong(pong_codec.decode_ping(data), loss), client_address)
+            counters[PACKETS_OUT[PacketType.PONG]] += 1
+
+        elif packet_type == PacketType.PONG:
+            link.pings.pong(pong_codec.decode_pong(data)[0])
+
+        elif packet_type == PacketType.LEAVE:
+            match_maker.leave(client_address)
+            counters["clients_left"] += 1
+            if DEBUG_MODE:
+                log.log("leave", "Client %s left match %s", client_address, match.match_id)
+
+        elif packet_type == PacketType.STATS:
+            send_stats(server_socket, client_address)
+
+def subscribe(data, subscriber_address, match_maker):
+    """
+    Adds or renews a spectator stream of a match. Nothing is answered: the match
+    states start flowing with the next snapshot.
+    """
+    if not ACCEPT_SUBSCRIPTIONS:
+        counters["unsupported_subscriptions"] += 1
+        return
+    match_id = pong_codec.decode_subscribe(data)
+    match = match_maker.matches.get(match_id)
+    if match is None:
+        counters["unknown_match_subscriptions"] += 1
+        match_maker.renew_hold(match_id)
+        return
+    subscribers = match.subscribers
+    if subscriber_address not in subscribers and len(subscribers) >= MAX_SUBSCRIBERS:
+        counters["rejected_subscriptions"] += 1
+        return
+    subscribers[subscriber_address] = match_maker.now() + SUBSCRIPTION_TIMEOUT
+
+def expire_subscriptions(match_maker):
+    """
+    Drops the spectator streams whose subscription was not renewed in time.
+    """
+    now = match_maker.now()
+    for match in match_maker.matches.values():
+        if match.subscribers:
+            expired = [address for address, expiry in match.subscribers.items() if expiry <= now]
+            for address in expired:
+                del match.subscribers[address]
+            counters["expired_subscriptions"] += len(expired)
+
+def send_to_subscribers(server_socket, match, packet):
+    """
+    Sends an already encoded, self-contained match state to every spectator stream.
+    """
+    subscribers = match.subscribers
+    for subscriber in subscribers:
+        try:
+            server_socket.sendto(packet, subscriber)
+        except OSError:
+            counters["send_errors"] += 1
+    counters["spectator_packets"] += len(subscribers)
+    counters["bytes_out"] += len(packet) * len(subscribers)
+
+def send_stats(server_socket, client_address):
+    """
+    Answers a STATS query with the metrics as JSON, cut down to fit one datagram.
+    Only local tools are answered.
+    """
+    if client_address[0] not in LOCAL_HOSTS:
+        counters["rejected_stats_queries"] += 1
+        return
+    text = metrics.to_json(pong_codec.MAX_STATS_TEXT)
+    server_socket.sendto(pong_codec.encode_stats_response(text), client_address)
+    counters[PACKETS_OUT[PacketType.STATS]] += 1
+
+def step_simulation(match):
+    """
+    Advances the authoritative simulation of one match by exactly one tick.
+    """
+    ball = match.ball
+    scorer = ball.sweep(match.paddles) if SWEPT_COLLISIONS else ball.step(match.paddles)
+    if scorer is not None:
+        match.scores[scorer] += 1
+
+def create_snapshot_packet(match):
+    """
+    Builds one SNAPSHOT packet holding every paddle, the ball and the score of
+    the match (layout in pong_codec). The packet lives in the shared
+    snapshot buffer until the next call.
+
+    :return: memoryview over the encoded packet.
+    """
+    entities = [(pong_codec.OBJECT_PLAYER, client_id, x_pos, y_pos)
+                for client_id, (x_pos, y_pos) in match.paddles.items()]
+    entities.append((pong_codec.OBJECT_BALL, 0, match.ball.x, match.ball.y))
+    packet = snapshot_writer.encode(match.snapshot_counter, entities, match.scores)
+    match.snapshot_counter = (match.snapshot_counter + 1) % 256
+    return packet
+
+def broadcast_snapshot(server_socket, match):
+    """
+    Sends the match SNAPSHOT to every client of the match that is due one at
+    its snapshot rate: encoded once, one datagram per client.
+    """
+    sequence = match.snapshot_counter
+    packet = create_snapshot_packet(match)
+    links = match.links
+    sent = 0
+    for client, client_id in match.addresses.items():
+        link = links[client_id]
+        if not link.rate.due():
+            continue
+        try:
+            server_socket.sendto(packet, client)
+        except OSError:
+            counters["send_errors"] += 1
+            continue
+        link.in_flight.append(sequence)
+        sent += 1
+    counters[SNAPSHOT_OUT] += sent
+    counters["bytes_out"] += len(packet) * sent
+    counters["snapshots_throttled"] += len(match.addresses) - sent
+    if match.subscribers:
+        send_to_subscribers(server_socket, match, packet)
+
+def match_state(match):
+    """
+    Returns the match state tuple encoded by DELTA packets:
+    paddle 0, paddle 1, ball and score.
+    """
+    return (match.paddles.get(0), match.paddles.get(1),
+            (match.ball.x, match.ball.y), tuple(match.scores))
+
+def broadcast_delta(server_socket, match):
+    """
+    Sends each client of the match that is due a snapshot at its rate a DELTA
+    against the newest state it acknowledged, or a keyframe when it has none in
+    the history or a keyframe is due. Packets are encoded once per distinct base.
+    """
+    sequence = match.snapshot_counter
+    state = match_state(match)
+    history = match.state_history
+    # An ack of this sequence number refers to the state being overwritten.
+    for client_id, acked_sequence in list(match.acks.items()):
+        if acked_sequence == sequence:
+            del match.acks[client_id]
+    history[sequence] = state
+    history.pop((sequence - STATE_HISTORY_LENGTH) % 256, None)
+    keyframe = sequence % KEYFRAME_INTERVAL == 0
+
+    packets = {}
+    links = match.links
+    sent = 0
+    sent_bytes = 0
+    for client, client_id in match.addresses.items():
+        link = links[client_id]
+        if not link.rate.due():
+            continue
+        base_sequence = None if keyframe else match.acks.get(client_id)
+        if base_sequence == sequence or base_sequence not in history:
+            base_sequence = None
+        packet = packets.get(base_sequence)
+        if packet is None:
+            base_state = history[base_sequence] if base_sequence is not None else None
+            packet = pong_codec.encode_delta(sequence, state, base_sequence, base_state)
+            packets[base_sequence] = packet
+        try:
+            server_socket.sendto(packet, client)
+        except OSError:
+            # Full send buffer, or an ICMP error surfacing on the socket.
+            counters["send_errors"] += 1
+            continue
+        link.in_flight.append(sequence)
+        sent += 1
+        sent_bytes += len(packet)
+    counters[DELTA_OUT] += sent
+    counters["bytes_out"] += sent_bytes
+    counters["snapshots_throttled"] += len(match.addresses) - sent
+    if keyframe:
+        counters["delta_keyframes"] += 1
+    if match.subscribers:
+        # Spectators cannot acknowledge through a relay: they all get the keyframe.
+        packet = packets.get(None)
+        if packet is None:
+            packet = pong_codec.encode_delta(sequence, state)
+        send_to_subscribers(server_socket, match, packet)
+    match.snapshot_counter = (sequence + 1) % 256
+
+def ping_clients(server_socket, match_maker):
+    """
+    Closes the measurement window of every client: adapts its snapshot rate to
+    the round-trip time and loss seen since the previous ping (a ping left
+    unanswered counts as full loss), then pings it again.
+    """
+    sent = 0
+    for match in match_maker.matches.values():
+        for client, client_id in match.addresses.items():
+            link = match.links[client_id]
+            link.trim()
+            loss = link.downlink.take_loss()
+            sequence, timed_out = link.pings.ping()
+            if ADAPTIVE_RATES:
+                link.rate.update(link.pings.rtt, 1.0 if timed_out else loss)
+            try:
+                server_socket.sendto(pong_codec.encode_ping(sequence), client)
+            except OSError:
+                counters["send_errors"] += 1
+                continue
+            sent += 1
+    counters[PING_OUT] += sent
+    counters["bytes_out"] += sent * pong_codec.PING_STRUCT.size
+
+def tick_matches(server_socket, match_maker, ticks, broadcast=True):
+    """
+    Runs `ticks` simulation steps for every started match, then broadcasts
+    one snapshot per match when `broadcast` is set. Clients are pinged, and
+    stale spectator subscriptions and idle clients dropped, every
+    `match_maker.ping_interval` ticks.
+    """
+    start = time.perf_counter()
+    for match in match_maker.matches.values():
+        if match.ball.send_position:
+            for _ in range(ticks):
+                step_simulation(match)
+            if not broadcast:
+                continue
+            # Catch-up steps are collapsed into a single snapshot of the latest state.
+            if DELTA_SNAPSHOTS:
+                broadcast_delta(server_socket, match)
+            else:
+                broadcast_snapshot(server_socket, match)
+    tick_count = match_maker.tick_count + ticks
+    match_maker.tick_count = tick_count
+    interval = match_maker.ping_interval
+    if tick_count // interval != (tick_count - ticks) // interval:
+        ping_clients(server_socket, match_maker)
+        expire_subscriptions(match_maker)
+        counters["clients_evicted"] += match_maker.evict_idle()
+    tick_duration.observe(time.perf_counter() - start)
+    counters["ticks"] += ticks
+
+def drain_socket(server_socket, match_maker):
+    """
+    Handles every datagram currently queued on the non-blocking socket.
+    Malformed packets and replies that fail to send are counted and skipped.
     """
-    # TODO: Implement general packet unpacking logic.
-    pass
+    while True:
+        try:
+            data, client_address = server_socket.recvfrom(1024)
+        except (BlockingIOError, InterruptedError):
+            return
+        except ConnectionResetError:
+            # ICMP port unreachable from a departed client (Windows); keep reading.
+            continue
+        try:
+            handle_packet(server_socket, data, client_address, match_maker)
+        except (struct.error, IndexError):
+            counters["malformed_packets"] += 1
+            if DEBUG_MODE:
+                log.log("malformed", "Malformed packet of %s bytes from %s", len(data), client_address)
+        except OSError as error:
+            # A reply that could not be sent must not end the server loop.
+            counters["send_errors"] += 1
+            if DEBUG_MODE:
+                log.log("send_error", "Reply to %s failed: %s", client_address, error)
 
-def start_server():
+def create_server_socket(host=HOST, port=PORT, reuse_port=False):
     """
-    Starts the UDP server, accepts client registrations, processes incoming packets,
-    updates game state, and broadcasts updates to all clients.
+    Creates the non-blocking UDP server socket.
+
+    :param reuse_port: Set SO_REUSEPORT so several worker processes can bind the
+                       same port and let the kernel spread clients across them.
     """
-    global clients, next_client_id, clients_to_start_game
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    server_socket.bind((HOST, PORT))
+    if reuse_port:
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server_socket.bind((host, port))
+    server_socket.setblocking(False)
+    return server_socket
+
+def stop_server():
+    """
+    Asks a running `start_server` loop to exit after its current iteration.
+    Safe to call from a signal handler.
+    """
+    global is_server_running
+    is_server_running = False
+
+def register_gauges(match_maker, scheduler=None):
+    """
+    Exposes the active matches and clients (and skipped ticks) as metrics gauges,
+    and a summary of the client links (see `link_summary`).
+    """
+    metrics.gauge("matches", lambda: len(match_maker.matches))
+    metrics.gauge("clients", lambda: len(match_maker.client_matches))
+    metrics.gauge("open_matches", lambda: len(match_maker.open_matches))
+    metrics.gauge("subscribers", lambda: sum(len(match.subscribers) for match in match_maker.matches.values()))
+    metrics.gauge("client_links", lambda: link_summary(match_maker))
+    if scheduler is not None:
+        metrics.gauge("skipped_ticks", lambda: scheduler.skipped_ticks)
+
+def link_summary(match_maker, limit=LINK_REPORT_LIMIT):
+    """
+    Summary of the client links whose size does not grow with the number of clients.
+
+    :return: Dict with the number of links, how many of them get a reduced snapshot
+             rate, and the `limit` links with the highest round-trip times (in
+             seconds, with their loss ratios and snapshot interval) under
+             "match_id.client_id" keys.
+    """
+    links = [(link.pings.rtt or 0.0, match.match_id, client_id, link)
+             for match in match_maker.matches.values() for client_id, link in match.links.items()]
+    worst = heapq.nlargest(limit, links, key=lambda entry: entry[0])
+    return {
+        "count": len(links),
+        "throttled": sum(link.rate.interval > 1 for _, _, _, link in links),
+        "worst": {f"{match_id}.{client_id}": link.stats() for _, match_id, client_id, link in worst},
+    }
+
+def ball_step(tick_rate, ball_speed=None):
+    """
+    Pixels the ball moves per tick to reach `ball_speed` pixels per second.
+    """
+    if ball_speed is None:
+        return 1
+    if ball_speed % tick_rate:
+        raise ValueError(f"ball speed {ball_speed} px/s is not a multiple of the {tick_rate} Hz tick rate")
+    return ball_speed // tick_rate
+
+def snapshot_interval(tick_rate, snapshot_rate=SNAPSHOT_RATE):
+    """
+    Number of ticks between two snapshots.
+    """
+    return max(1, round(tick_rate / snapshot_rate))
+
+def start_server(tick_rate=TICK_RATE, server_socket=None):
+    """
+    Starts the UDP server, pairs registering clients into matches, processes incoming
+    packets, updates every match and broadcasts updates to the clients of each match.
+
+    The ball is stepped on a fixed timestep of `tick_rate` Hz and snapshots go out
+    at SNAPSHOT_RATE. Between ticks the loop waits on the socket, then drains every
+    pending datagram without blocking. Metrics are dumped to METRICS_DUMP_PATH
+    every METRICS_DUMP_INTERVAL seconds when it is set, and the session is
+    recorded to CAPTURE_PATH for `packet_capture.py replay` when that is set.
+
+    :param server_socket: Pre-bound socket (e.g. from a worker launcher); a socket
+                          on HOST:PORT is created when omitted.
+    """
+    global is_server_running
+    if server_socket is None:
+        server_socket = create_server_socket()
+    step = ball_step(tick_rate, BALL_SPEED)
+    recorder = None
+    if CAPTURE_PATH:
+        # Imported here so the capture module is only loaded when recording.
+        import packet_capture
+        recorder = packet_capture.PacketRecorder(CAPTURE_PATH, tick_rate=tick_rate, ball_step=step)
+        server_socket = packet_capture.RecordingSocket(server_socket, recorder)
     if DEBUG_MODE:
-        print(f"Server listening on {HOST}:{PORT}")
-    
+        print(f"Server listening on {server_socket.getsockname()} at {tick_rate} Hz")
+
     is_server_running = True
-    ball = Ball(80, 60, 4)
+    match_maker = MatchMaker(ball_step=step, tick_rate=tick_rate, match_id_offset=MATCH_ID_OFFSET,
+                             match_id_stride=MATCH_ID_STRIDE)
+    scheduler = TickScheduler(tick_rate, MAX_CATCH_UP_TICKS)
+    interval = snapshot_interval(tick_rate)
+    register_gauges(match_maker, scheduler)
+    dump_interval = max(1, round(METRICS_DUMP_INTERVAL * tick_rate))
 
     while is_server_running:
-        data, client_address = server_socket.recvfrom(1024)
-        if DEBUG_MODE:
-            print(f"Received {len(data)} bytes from {client_address}")
-
-        # Handle new client registration.
-        if client_address not in clients:
-            client_id = next_client_id
-            next_client_id += 1
-            clients[client_address] = client_id
-            if DEBUG_MODE:
-                print(f"Assigned ID {client_id} to new client {client_address}")
-
-            # Expecting registration packet format: >BBII (PacketType, unused, x_pos, y_pos)
-            packet_id, _, client_x_pos, client_y_pos = struct.unpack(">BBII", data)
-            if packet_id == PacketType.REQUEST_ID:
-                # Send the assigned client ID back to the client.
-                response = struct.pack(">BB", PacketType.REQUEST_ID, client_id)
-                server_socket.sendto(response, client_address)
-                clients_position[client_id] = (client_x_pos, client_y_pos)
-                # Start ball updates once enough clients have registered.
-                if len(clients_position) >= clients_to_start_game:
-                    ball.send_position = True
+        # Wait for input only until the next tick is due.
+        read_sockets, _, _ = select.select([server_socket], [], [], scheduler.time_until_next_tick())
+        if read_sockets:
+            drain_socket(server_socket, match_maker)
 
-        else:
-            # Retrieve the packet type from the first byte.
-            packet_type = struct.unpack(">B", data[:1])[0]
-            client_id = clients[client_address]
-
-            if packet_type == PacketType.REQUEST_ID:
-                # Client is re-requesting its ID.
-                if DEBUG_MODE:
-                    print(f"Resending client ID {client_id} to client {client_address}")
-                response = struct.pack(">BB", PacketType.REQUEST_ID, client_id)
-                server_socket.sendto(response, client_address)
-                # Update client's position from the registration packet.
-                _, _, client_x_pos, client_y_pos = struct.unpack(">BBII", data)
-                clients_position[client_id] = (client_x_pos, client_y_pos)
-                
-            elif packet_type == PacketType.POSITION:
-                # Unpack the POSITION packet. Expected format: >BBBBBIII
-                (packet_type, object_type, recv_client_id, packet_counter,
-                 packet_length, x_pos, y_pos, crc) = struct.unpack(">BBBBBIII", data)
-                if packet_length == len(data):
-                    # Verify data integrity using CRC32.
-                    data_packed = struct.pack(">BBBBBII", packet_type, object_type,
-                                              recv_client_id, packet_counter, packet_length,
-                                              x_pos, y_pos)
-                    computed_crc = zlib.crc32(data_packed)
-                    if crc == computed_crc:
-                        # Update the client's position.
-                        clients_position[recv_client_id] = (x_pos, y_pos)
-                        if DEBUG_MODE:
-                            print(f"Received POSITION packet from client {recv_client_id} with position ({x_pos}, {y_pos})")
-                        # Broadcast the position update to all other clients.
-                        for client in clients:
-                            if client != client_address:
-                                server_socket.sendto(data, client)
-                
-                # Update and broadcast the ball's position if the game has started.
-                if ball.send_position:
-                    ball.update()
-                    ball.check_collision()
-                    ball.check_bounce()
-                    ball.check_goal()
-                    # Create a ball position update packet with the same structure as POSITION packets.
-                    ball_packet = struct.pack(">BBBBBII", PacketType.POSITION, ObjectType.BALL,
-                                              client_id, packet_counter, packet_length,
-                                              ball.x, ball.y)
-                    crc_ball = zlib.crc32(ball_packet)
-                    ball_packet += struct.pack(">I", crc_ball)
-                    for client in clients:
-                        if client != client_address:
-                            server_socket.sendto(ball_packet, client)
+        ticks = scheduler.due_ticks()
+        if ticks:
+            broadcast = scheduler.interval_elapsed(ticks, interval)
+            if recorder is not None:
+                recorder.record_ticks(ticks, broadcast)
+            tick_matches(server_socket, match_maker, ticks, broadcast)
+            if METRICS_DUMP_PATH and scheduler.interval_elapsed(ticks, dump_interval):
+                metrics.dump(METRICS_DUMP_PATH)
+    if recorder is not None:
+        recorder.close()
+    server_socket.close()
 
 if __name__ == "__main__":
     print("Server main starting...")
@@ -0,0 +1,173 @@
+import asyncio
+import struct
+import pong_server
+from pong_server import MatchMaker, handle_packet, tick_matches, counters, log
+from tick_scheduler import TickScheduler
+
+class PongServerProtocol(asyncio.DatagramProtocol):
+    """
+    asyncio datagram protocol running the same registration and POSITION relay
+    logic as the blocking server, against whichever transport it is attached to.
+    """
+    def __init__(self, match_maker):
+        self.match_maker = match_maker
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            handle_packet(self.transport, data, addr, self.match_maker)
+        except (struct.error, IndexError):
+            counters["malformed_packets"] += 1
+            if pong_server.DEBUG_MODE:
+                log.log("malformed", "Malformed packet of %s bytes from %s", len(data), addr)
+
+    def error_received(self, exc):
+        # ICMP errors from departed clients must not stop the server.
+        counters["transport_errors"] += 1
+        if pong_server.DEBUG_MODE:
+            log.log("transport", "Transport error: %s", exc)
+
+class AsyncPongServer:
+    """
+    asyncio Pong server: datagrams are handled as they arrive, the simulation
+    runs on a fixed-timestep tick task and extra housekeeping can be scheduled
+    as background tasks on the same loop.
+    """
+    def __init__(self, tick_rate=pong_server.TICK_RATE, match_maker=None):
+        self.tick_rate = tick_rate
+        self.match_maker = match_maker if match_maker is not None else MatchMaker(
+            ball_step=pong_server.ball_step(tick_rate, pong_server.BALL_SPEED), tick_rate=tick_rate)
+        self.protocol = PongServerProtocol(self.match_maker)
+        self.transport = None
+        self.tasks = []
+        self.is_running = False
+
+    async def start(self, transport=None, host=pong_server.HOST, port=pong_server.PORT):
+        """
+        Attaches the server to `transport`, or binds a UDP endpoint when none is given,
+        and starts the tick task.
+        """
+        loop = asyncio.get_running_loop()
+        if transport is None:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: self.protocol, local_addr=(host, port))
+        else:
+            self.protocol.connection_made(transport)
+        self.transport = transport
+        self.is_running = True
+        self.scheduler = TickScheduler(self.tick_rate, pong_server.MAX_CATCH_UP_TICKS, clock=loop.time)
+        self.snapshot_interval = pong_server.snapshot_interval(self.tick_rate)
+        self.tasks.append(asyncio.ensure_future(self._tick_loop()))
+        pong_server.register_gauges(self.match_maker, self.scheduler)
+        if pong_server.METRICS_DUMP_PATH:
+            self.run_periodic(lambda: pong_server.metrics.dump(pong_server.METRICS_DUMP_PATH),
+                              pong_server.METRICS_DUMP_INTERVAL)
+        if pong_server.DEBUG_MODE:
+            print(f"Async server listening at {self.tick_rate} Hz")
+
+    async def _tick_loop(self):
+        while self.is_running:
+            await asyncio.sleep(self.scheduler.time_until_next_tick())
+            ticks = self.scheduler.due_ticks()
+            if ticks:
+                tick_matches(self.transport, self.match_maker, ticks,
+                             self.scheduler.interval_elapsed(ticks, self.snapshot_interval))
+
+    def run_periodic(self, callback, interval):
+        """
+        Schedules `callback()` every `interval` seconds for the lifetime of the server.
+        The callback may be a plain function or a coroutine function.
+        """
+        async def periodic():
+            while self.is_running:
+                await asyncio.sleep(interval)
+                result = callback()
+                if asyncio.iscoroutine(result):
+                    await result
+        task = asyncio.ensure_future(periodic())
+        self.tasks.append(task)
+        return task
+
+    async def stop(self):
+        """
+        Cancels the tick and background tasks and closes the transport.
+        """
+        self.is_running = False
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        if self.transport is not None:
+            self.transport.close()
+
+class LoopbackNetwork:
+    """
+    In-memory datagram network. Endpoints bound to it exchange packets through
+    the event loop without touching the OS, for tests and benchmarks.
+    """
+    def __init__(self):
+        # Mapping of addresses to bound protocols.
+        self.endpoints = {}
+        self.delivered = 0
+        self.dropped = 0
+
+    def bind(self, address, protocol):
+        """
+        Creates a transport for `protocol` at `address` and notifies the protocol.
+        """
+        transport = LoopbackTransport(self, address)
+        self.endpoints[address] = protocol
+        protocol.connection_made(transport)
+        return transport
+
+    def deliver(self, data, source, destination):
+        protocol = self.endpoints.get(destination)
+        if protocol is None:
+            self.dropped += 1
+            return
+        self.delivered += 1
+        asyncio.get_running_loop().call_soon(protocol.datagram_received, bytes(data), source)
+
+class LoopbackTransport(asyncio.DatagramTransport):
+    """
+    Transport half of a LoopbackNetwork endpoint.
+    """
+    def __init__(self, network, address):
+        super().__init__()
+        self.network = network
+        self.address = address
+        self.closed = False
+
+    def sendto(self, data, addr=None):
+        if not self.closed:
+            self.network.deliver(data, self.address, addr)
+
+    def get_extra_info(self, name, default=None):
+        if name == "sockname":
+            return self.address
+        return default
+
+    def is_closing(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+        self.network.endpoints.pop(self.address, None)
+
+    def abort(self):
+        self.close()
+
+async def main():
+    server = AsyncPongServer()
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    print("Async server main starting...")
+    asyncio.run(main())
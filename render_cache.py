@@ -0,0 +1,97 @@
+import pyxel
+
+# Size of a character of pyxel's built-in font.
+CHAR_WIDTH = 4
+CHAR_HEIGHT = 6
+# Labels up to which clearing the screen and drawing the formatted labels directly
+# is cheaper than copying the whole layer (pyxel 2.9: one full-screen blt ~ 4 texts).
+DIRECT_LABELS = 3
+
+class RenderCache:
+    """
+    Background layer for the renderer: the background colour, static field art and
+    HUD labels (scores, names) are rasterized into an offscreen pyxel Image and
+    copied to the screen with `blt`, instead of being cleared and drawn again
+    every frame. Labels are only formatted and re-rasterized when their values
+    change, and the screen area they cover is reported through `dirty_rects` so a
+    change-driven RenderManager can restore just that part of the screen.
+    Being part of the background, labels are drawn beneath the sprites.
+    """
+    def __init__(self, width, height, background=0, screen=pyxel, layer=None):
+        self.width = width
+        self.height = height
+        self.background = background
+        # Draw target: the pyxel module (the window) or an Image.
+        self.screen = screen
+        self.layer = layer if layer is not None else pyxel.Image(width, height)
+        # Callables `draw(layer)` for art that never changes.
+        self.statics = []
+        # Mapping of label keys to ((x, y, color, fmt, values), text).
+        self.labels = {}
+        # Screen rectangles (x, y, w, h) changed since the last frame.
+        self.dirty_rects = []
+        self.rebuild_needed = True
+        self.rasterizations = 0
+
+    def add_static(self, draw):
+        self.statics.append(draw)
+        self.rebuild_needed = True
+        self.dirty_rects.append((0, 0, self.width, self.height))
+
+    def label(self, key, x, y, color, fmt, *values):
+        """
+        Shows `fmt.format(*values)` at (x, y). Does nothing unless the label changed.
+        """
+        state = (x, y, color, fmt, values)
+        entry = self.labels.get(key)
+        if entry is not None:
+            if entry[0] == state:
+                return
+            self.dirty_rects.append(text_rect(entry[0][0], entry[0][1], entry[1]))
+        text = fmt.format(*values)
+        self.labels[key] = (state, text)
+        self.dirty_rects.append(text_rect(x, y, text))
+        self.rebuild_needed = True
+
+    def remove_label(self, key):
+        entry = self.labels.pop(key, None)
+        if entry is not None:
+            self.dirty_rects.append(text_rect(entry[0][0], entry[0][1], entry[1]))
+            self.rebuild_needed = True
+
+    def rebuild(self):
+        """
+        Re-rasterizes the whole layer.
+        """
+        layer = self.layer
+        layer.cls(self.background)
+        for draw in self.statics:
+            draw(layer)
+        for (x, y, color, _, _), text in self.labels.values():
+            layer.text(x, y, text, color)
+        self.rebuild_needed = False
+        self.rasterizations += 1
+
+    def draw_background(self):
+        """
+        Draws the whole layer on the screen (replaces `cls`).
+        """
+        if not self.statics and len(self.labels) <= DIRECT_LABELS:
+            # Few labels: clear and draw their already formatted text directly.
+            screen = self.screen
+            screen.cls(self.background)
+            for (x, y, color, _, _), text in self.labels.values():
+                screen.text(x, y, text, color)
+            return
+        if self.rebuild_needed:
+            self.rebuild()
+        self.screen.blt(0, 0, self.layer, 0, 0, self.width, self.height)
+
+    def restore(self, x, y, w, h):
+        """
+        Copies the layer back over a screen rectangle, erasing what was drawn there.
+        """
+        self.screen.blt(x, y, self.layer, x, y, w, h)
+
+def text_rect(x, y, text):
+    return (x, y, len(text) * CHAR_WIDTH, CHAR_HEIGHT)
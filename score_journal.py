@@ -0,0 +1,291 @@
+import atexit
+import os
+import threading
+import time
+
+from leaderboard import parse_line, write_leaderboard
+
+# First line of a journal file, followed by the generation of the snapshot it applies to.
+JOURNAL_HEADER_PREFIX = "# pong journal v1 generation "
+JOURNAL_SUFFIX = ".journal"
+
+class ScoreJournal:
+    """
+    Write-behind persistence for a Leaderboard.
+
+    `record()` updates the leaderboard in memory and queues the new score; it never
+    touches the disk. A background thread wakes every `flush_interval` seconds and
+    appends the queued scores as "name:points" lines, one line per player however
+    many points were scored in between. Appends reach the OS right away but are
+    fsynced at most once per `fsync_interval`, which bounds what a power loss can
+    take (a crash of the game alone loses at most one flush interval).
+
+    After `compact_records` journal lines, or when asked with `request_compaction()`,
+    the thread writes a full snapshot of the leaderboard through an atomic rename
+    and starts a new, empty journal. Snapshot and journal carry a generation number
+    so a crash between the two steps never replays a journal older than the snapshot.
+    On load, the leaderboard replays the journal lines on top of the snapshot.
+
+    `start()` only starts the thread: loading the leaderboard and opening the
+    journal happen on it, so the game never waits for the disk. Scores recorded
+    before the load completes are applied on top of it. `close()` runs at
+    interpreter exit too, so the last batch is not lost when the owner forgets.
+    """
+    def __init__(self, leaderboard, path=None, flush_interval=0.2, fsync_interval=1.0,
+                 compact_records=10000, clock=time.monotonic):
+        self.leaderboard = leaderboard
+        self.path = path or f"{leaderboard.path}{JOURNAL_SUFFIX}"
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.compact_records = compact_records
+        self.clock = clock
+        leaderboard.journal = self
+        # Guards the leaderboard and `pending` between the game and the writer thread.
+        self.lock = threading.Lock()
+        # Mapping of player names to their latest unwritten points.
+        self.pending = {}
+        self.wake = threading.Event()
+        self.compaction_requested = False
+        self.closing = False
+        # Set by `reset()` before the leaderboard is loaded; applied once it is.
+        self.cleared_while_loading = False
+        self.thread = None
+        self.journal_file = None
+        # Journal lines in the current generation.
+        self.records = 0
+        self.last_fsync = clock()
+        self.unsynced = False
+        # Counters for profiling and tests.
+        self.batches = 0
+        self.coalesced = 0
+        self.fsyncs = 0
+        self.compactions = 0
+        # Error of the last failed write, retried on the next flush.
+        self.last_error = None
+
+    def record(self, name, points):
+        """
+        Sets the player's points and queues them for the journal. Called from the game loop.
+        """
+        if "\n" in name:
+            raise ValueError("player names cannot contain line breaks")
+        points = int(points)
+        with self.lock:
+            # Until the writer thread has loaded the leaderboard the score is only queued.
+            if self.leaderboard.loaded:
+                self.leaderboard[name] = points
+            if name in self.pending:
+                self.coalesced += 1
+            self.pending[name] = points
+        self.start()
+
+    def reset(self):
+        """
+        Clears every score; the next compaction persists the empty leaderboard.
+        """
+        with self.lock:
+            if self.leaderboard.loaded:
+                self.leaderboard.clear()
+            else:
+                self.cleared_while_loading = True
+            self.pending = {}
+            self.compaction_requested = True
+        self.start()
+        self.wake.set()
+
+    def request_compaction(self):
+        """
+        Asks the writer thread for a snapshot without waiting for it.
+        """
+        self.compaction_requested = True
+        self.start()
+        self.wake.set()
+
+    def start(self):
+        """
+        Starts the writer thread, which loads the leaderboard (replaying the journal)
+        and opens the journal before its first flush. Returns without waiting for either.
+        """
+        if self.thread is not None:
+            return
+        self.closing = False
+        self.thread = threading.Thread(target=self.run, name="score-journal", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """
+        Stops the writer thread, then writes and syncs everything still queued.
+        """
+        if self.thread is None:
+            return
+        atexit.unregister(self.close)
+        self.closing = True
+        self.wake.set()
+        self.thread.join()
+        self.thread = None
+        if self.journal_file is None:
+            # The journal could not be opened (see `last_error`).
+            return
+        self.flush(force_sync=True)
+        self.journal_file.close()
+        self.journal_file = None
+
+    def open(self):
+        """
+        Loads the leaderboard and opens the journal, on the writer thread.
+        """
+        with self.lock:
+            cleared = self.cleared_while_loading
+        if not cleared:
+            self.leaderboard.ensure_loaded()
+        with self.lock:
+            if self.cleared_while_loading:
+                self.leaderboard.clear()
+                self.cleared_while_loading = False
+            # Scores recorded while loading were only queued.
+            for name, points in self.pending.items():
+                self.leaderboard[name] = points
+        self.open_journal()
+
+    def run(self):
+        try:
+            self.open()
+        except (OSError, UnicodeDecodeError) as e:
+            # Nothing can be journaled; `close()` drops the queued scores.
+            self.last_error = e
+            return
+        while not self.closing:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            if self.closing:
+                break
+            try:
+                self.flush()
+                self.last_error = None
+            except OSError as e:
+                # Keep the game running; the scores stay queued in memory for the next try.
+                self.last_error = e
+
+    def flush(self, force_sync=False):
+        """
+        Appends the queued scores, fsyncs when due and compacts when due.
+        """
+        with self.lock:
+            batch, self.pending = self.pending, {}
+        if batch:
+            try:
+                self.journal_file.writelines(f"{name}:{points}\n" for name, points in batch.items())
+                self.journal_file.flush()
+            except OSError:
+                # Requeue the batch under any newer scores.
+                with self.lock:
+                    batch.update(self.pending)
+                    self.pending = batch
+                raise
+            self.records += len(batch)
+            self.batches += 1
+            self.unsynced = True
+        if self.unsynced and (force_sync or self.clock() - self.last_fsync >= self.fsync_interval):
+            self.sync()
+        if self.compaction_requested or self.records >= self.compact_records:
+            self.compact()
+
+    def sync(self):
+        os.fsync(self.journal_file.fileno())
+        self.last_fsync = self.clock()
+        self.unsynced = False
+        self.fsyncs += 1
+
+    def compact(self):
+        """
+        Writes a snapshot of the leaderboard and starts the next journal generation.
+        """
+        self.compaction_requested = False
+        with self.lock:
+            # Scores still queued are in the snapshot too; writing them again to the
+            # new journal is harmless since lines hold absolute points.
+            ranking = list(self.leaderboard.ranking)
+            generation = self.leaderboard.generation + 1
+        write_leaderboard(self.leaderboard.path, ranking, generation)
+        self.leaderboard.generation = generation
+        self.journal_file.close()
+        self.journal_file = None
+        self.open_journal(truncate=True)
+        self.compactions += 1
+
+    def open_journal(self, truncate=False):
+        """
+        Opens the journal for appending. A missing, torn or stale journal (from an
+        older generation than the snapshot) is replaced by an empty one.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        generation = self.leaderboard.generation
+        valid_length = None if truncate else self.valid_length(generation)
+        if valid_length is None:
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w") as journal_file:
+                journal_file.write(f"{JOURNAL_HEADER_PREFIX}{generation}\n")
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+            os.replace(temporary_path, self.path)
+            self.records = 0
+        else:
+            # Drop a torn last line so the next append starts on a line of its own.
+            os.truncate(self.path, valid_length)
+        self.journal_file = open(self.path, "a")
+        self.last_fsync = self.clock()
+        self.unsynced = False
+
+    def read_entries(self, generation):
+        """
+        Reads the journal of the given generation.
+
+        :return: Tuple of (list of (name, points), byte length of the complete lines),
+                 or None when the journal is missing or from another generation.
+        """
+        try:
+            with open(self.path, "rb") as journal_file:
+                data = journal_file.read()
+        except FileNotFoundError:
+            return None
+        header_end = data.find(b"\n") + 1
+        if data[:header_end].decode("utf-8", "replace") != f"{JOURNAL_HEADER_PREFIX}{generation}\n":
+            return None
+        # A line without its newline was cut short by a crash.
+        valid_length = data.rfind(b"\n") + 1
+        entries = []
+        for line in data[header_end:valid_length].decode("utf-8", "replace").splitlines():
+            entry = parse_line(line)
+            if entry is not None:
+                entries.append(entry)
+        return entries, valid_length
+
+    def valid_length(self, generation):
+        journal = self.read_entries(generation)
+        if journal is None:
+            return None
+        entries, valid_length = journal
+        self.records = len(entries)
+        return valid_length
+
+    def replay(self, points, generation):
+        """
+        Applies the journal of the snapshot's generation to the name -> points mapping.
+        """
+        journal = self.read_entries(generation)
+        if journal is not None:
+            points.update(journal[0])
+
+    def has_tail(self):
+        """
+        :return: True if the journal file holds entries past its header.
+        """
+        try:
+            with open(self.path, "rb") as journal_file:
+                journal_file.readline()
+                return bool(journal_file.read(1))
+        except FileNotFoundError:
+            return False
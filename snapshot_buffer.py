@@ -0,0 +1,80 @@
+import time
+from collections import deque
+
+class SnapshotBuffer:
+    """
+    Timestamped per-entity position buffer for smooth rendering of remote objects.
+    Entities are drawn `render_delay` seconds in the past, interpolated between
+    the two received samples around that time, so the server may send far less
+    often than the client renders. When samples stop arriving, the last motion
+    is extrapolated for at most `max_extrapolation` seconds, then held.
+    """
+    def __init__(self, depth=32, render_delay=0.1, max_extrapolation=0.2,
+                 snap_distance=40, clock=time.monotonic):
+        # Samples kept per entity.
+        self.depth = depth
+        self.render_delay = render_delay
+        self.max_extrapolation = max_extrapolation
+        # Jumps longer than this (e.g. a ball reset after a goal) are not interpolated.
+        self.snap_distance = snap_distance
+        self.clock = clock
+        # Mapping of entity keys to deques of (timestamp, x, y).
+        self.tracks = {}
+
+    def push(self, key, x_pos, y_pos, timestamp=None):
+        """
+        Records the position of an entity as received at `timestamp` (now by default).
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        track = self.tracks.get(key)
+        if track is None:
+            track = self.tracks[key] = deque(maxlen=self.depth)
+        track.append((timestamp, x_pos, y_pos))
+
+    def remove(self, key):
+        self.tracks.pop(key, None)
+
+    def sample_track(self, track, render_time):
+        """
+        Returns the (x, y) of one track at `render_time`.
+        """
+        newest_time, newest_x, newest_y = track[-1]
+        if render_time >= newest_time:
+            if len(track) < 2:
+                return newest_x, newest_y
+            previous_time, previous_x, previous_y = track[-2]
+            span = newest_time - previous_time
+            if span <= 0 or self.is_jump(previous_x, previous_y, newest_x, newest_y):
+                return newest_x, newest_y
+            ahead = min(render_time - newest_time, self.max_extrapolation)
+            return (newest_x + (newest_x - previous_x) * ahead / span,
+                    newest_y + (newest_y - previous_y) * ahead / span)
+
+        # Walk back to the pair of samples surrounding the render time.
+        for index in range(len(track) - 1, 0, -1):
+            before_time, before_x, before_y = track[index - 1]
+            if before_time <= render_time:
+                after_time, after_x, after_y = track[index]
+                if after_time <= before_time:
+                    return after_x, after_y
+                if self.is_jump(before_x, before_y, after_x, after_y):
+                    # Teleport at the later sample instead of sweeping across the field.
+                    return before_x, before_y
+                fraction = (render_time - before_time) / (after_time - before_time)
+                return (before_x + (after_x - before_x) * fraction,
+                        before_y + (after_y - before_y) * fraction)
+        # Older than anything buffered: show the oldest sample.
+        return track[0][1], track[0][2]
+
+    def is_jump(self, from_x, from_y, to_x, to_y):
+        return abs(to_x - from_x) > self.snap_distance or abs(to_y - from_y) > self.snap_distance
+
+    def sample(self, now=None):
+        """
+        Returns a mapping of entity keys to their (x, y) at `now - render_delay`.
+        """
+        if now is None:
+            now = self.clock()
+        render_time = now - self.render_delay
+        return {key: self.sample_track(track, render_time) for key, track in self.tracks.items()}
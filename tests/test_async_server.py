@@ -0,0 +1,64 @@
+import asyncio
+
+import pong_codec
+import pong_server
+from pong_global import PacketType
+from pong_server_async import AsyncPongServer, LoopbackNetwork
+
+SERVER = ("server", 1)
+CLIENTS = [("client", 1), ("client", 2)]
+
+class Inbox(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.received = []
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.received.append((data, addr))
+
+    def first(self, packet_type):
+        return next((data for data, _ in self.received if data[0] == packet_type), None)
+
+async def register_two_clients(state_type=PacketType.DELTA):
+    network = LoopbackNetwork()
+    server = AsyncPongServer(tick_rate=60)
+    await server.start(network.bind(SERVER, server.protocol))
+    inboxes = [Inbox() for _ in CLIENTS]
+    try:
+        for (x_pos, address), inbox in zip(((10, CLIENTS[0]), (140, CLIENTS[1])), inboxes):
+            network.bind(address, inbox).sendto(pong_codec.encode_request_id(x_pos, 40), SERVER)
+        # Wait for the first match state, at most one second of ticks.
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if all(inbox.first(state_type) is not None for inbox in inboxes):
+                break
+    finally:
+        await server.stop()
+    return server, network, inboxes
+
+def test_loopback_registration_and_first_state(monkeypatch):
+    monkeypatch.setattr(pong_server, "DEBUG_MODE", False)
+    server, network, inboxes = asyncio.run(register_two_clients())
+    assert [pong_codec.decode_id_response(inbox.first(PacketType.REQUEST_ID)) for inbox in inboxes] == [0, 1]
+    assert all(addr == SERVER for inbox in inboxes for _, addr in inbox.received)
+    assert set(server.match_maker.client_matches) == set(CLIENTS)
+    for inbox in inboxes:
+        # The first DELTA of a client is a keyframe holding both paddles and the ball.
+        _, state = pong_codec.decode_delta(inbox.first(PacketType.DELTA), {})
+        assert state[0] == (10, 40) and state[1] == (140, 40)
+        assert state[2] is not None and state[3] == (0, 0)
+    assert network.dropped == 0
+
+def test_loopback_snapshots(monkeypatch):
+    monkeypatch.setattr(pong_server, "DEBUG_MODE", False)
+    monkeypatch.setattr(pong_server, "DELTA_SNAPSHOTS", False)
+    _, _, inboxes = asyncio.run(register_two_clients(PacketType.SNAPSHOT))
+    for inbox in inboxes:
+        snapshot = inbox.first(PacketType.SNAPSHOT)
+        _, entity_count, scores = pong_codec.decode_snapshot(snapshot)
+        assert entity_count == 3 and tuple(scores) == (0, 0)
+        paddles = {entity[1]: entity[2:] for entity in pong_codec.iter_snapshot_entities(snapshot, entity_count)
+                   if entity[0] == pong_codec.OBJECT_PLAYER}
+        assert paddles == {0: (10, 40), 1: (140, 40)}
@@ -0,0 +1,100 @@
+import pytest
+
+import pong_client
+import pong_codec
+from managers import RenderManager, TickManager
+from pong_core import NullInput
+from pong_global import ObjectType, PacketType
+
+BALL = (ObjectType.BALL, 0)
+
+class QueuedSocket:
+    """
+    Non-blocking socket stand-in returning queued datagrams, then EWOULDBLOCK.
+    """
+    def __init__(self, datagrams):
+        self.datagrams = list(datagrams)
+        self.reads = 0
+
+    def recvfrom(self, size):
+        if not self.datagrams:
+            raise BlockingIOError
+        self.reads += 1
+        return self.datagrams.pop(0), ("localhost", 12345)
+
+    def sendto(self, data, destination):
+        pass
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def client():
+    client = pong_client.PongClient(TickManager(), RenderManager(), interpolation_delay=0,
+                                    input_source=NullInput())
+    yield client
+    client.client_socket.close()
+
+def drain(client, datagrams):
+    client.client_socket.close()
+    client.client_socket = QueuedSocket(datagrams)
+    client.receive_data([client.client_socket])
+    return client.client_socket
+
+def ball_at(counter, x_pos):
+    return pong_codec.encode_position(ObjectType.BALL, 0, counter, x_pos, 20)
+
+def test_in_order_sequences_are_accepted(client):
+    assert [client.accept_sequence(PacketType.SNAPSHOT, sequence) for sequence in (1, 2, 5)] == [True] * 3
+    assert client.last_sequences[PacketType.SNAPSHOT] == 5
+
+def test_duplicate_is_rejected(client):
+    assert client.accept_sequence(BALL, 7)
+    assert not client.accept_sequence(BALL, 7)
+    assert client.duplicate_packets == 1
+    assert client.last_sequences[BALL] == 7
+
+def test_sequence_wraps_from_255_to_0(client):
+    assert client.accept_sequence(BALL, 254)
+    assert client.accept_sequence(BALL, 255)
+    assert client.accept_sequence(BALL, 0)
+    # 255 is now one behind the wrapped counter.
+    assert not client.accept_sequence(BALL, 255)
+    assert client.reordered_packets == 1
+    assert client.last_sequences[BALL] == 0
+
+def test_late_packet_within_threshold_is_rejected(client):
+    assert client.accept_sequence(BALL, 100)
+    assert not client.accept_sequence(BALL, 100 - client.counter_threshold)
+    assert client.reordered_packets == 1
+
+def test_counter_beyond_threshold_is_a_restarted_sender(client):
+    assert client.accept_sequence(BALL, 100)
+    assert client.accept_sequence(BALL, 100 - client.counter_threshold - 1)
+    assert client.reordered_packets == 0
+    assert client.last_sequences[BALL] == 100 - client.counter_threshold - 1
+
+def test_streams_are_independent(client):
+    assert client.accept_sequence(BALL, 9)
+    assert client.accept_sequence((ObjectType.PLAYER, 1), 9)
+    assert client.accept_sequence(PacketType.DELTA, 9)
+
+def test_drain_applies_only_the_newest_position(client):
+    # Several datagrams in one frame: a late one, a duplicate and garbage among them.
+    fake_socket = drain(client, [ball_at(1, 10), ball_at(3, 30), ball_at(2, 20),
+                                 ball_at(3, 30), b"\x01", ball_at(4, 40)])
+    assert fake_socket.reads == 6
+    assert (client.ball.x, client.ball.y) == (40, 20)
+    assert (client.reordered_packets, client.duplicate_packets) == (1, 1)
+    # Positions 1, 3 and 4 were accepted; only the last is applied.
+    assert client.coalesced_packets == 2
+    assert client.received_positions == {}
+
+def test_drain_is_bounded_per_frame(client, monkeypatch):
+    monkeypatch.setattr(pong_client, "MAX_DATAGRAMS_PER_FRAME", 3)
+    fake_socket = drain(client, [ball_at(counter, counter) for counter in range(1, 6)])
+    assert fake_socket.reads == 3
+    assert client.ball.x == 3
+    client.receive_data([fake_socket])
+    assert fake_socket.reads == 5
+    assert client.ball.x == 5
@@ -0,0 +1,102 @@
+import pytest
+
+import pong_codec
+from link_quality import ReceiveWindow
+from pong_global import ObjectType
+
+STATE = ((10, 40), (140, 55), (80, 60), (3, 7))
+
+def test_position_round_trip():
+    data = pong_codec.encode_position(ObjectType.PLAYER, 1, 255, 10, 40)
+    assert pong_codec.decode_position(data) == (ObjectType.PLAYER, 1, 255, 10, 40)
+    assert pong_codec.position_error(data) is None
+
+def test_position_rejects_corruption():
+    data = bytearray(pong_codec.encode_position(ObjectType.BALL, 0, 7, 80, 60))
+    data[-1] ^= 0xFF
+    assert pong_codec.decode_position(bytes(data)) is None
+    assert pong_codec.position_error(bytes(data)) == "crc"
+    assert pong_codec.position_error(bytes(data[:-1])) == "length"
+
+def test_snapshot_round_trip():
+    entities = [(ObjectType.PLAYER, 0, 10, 40), (ObjectType.BALL, 0, 80, 60)]
+    packet = bytes(pong_codec.SnapshotWriter().encode(200, entities, (4, 9)))
+    counter, entity_count, scores = pong_codec.decode_snapshot(packet)
+    assert (counter, entity_count, scores) == (200, 2, (4, 9))
+    assert list(pong_codec.iter_snapshot_entities(packet, entity_count)) == entities
+
+def test_delta_keyframe_round_trip():
+    packet = pong_codec.encode_delta(5, STATE)
+    assert pong_codec.decode_delta(packet, {}) == (5, STATE)
+
+def test_delta_carries_only_changes():
+    state = ((10, 41), STATE[1], (81, 61), STATE[3])
+    keyframe = pong_codec.encode_delta(5, state)
+    packet = pong_codec.encode_delta(6, state, 5, STATE)
+    assert len(packet) < len(keyframe)
+    assert pong_codec.decode_delta(packet, {5: STATE}) == (6, state)
+
+def test_delta_base_across_sequence_wrap():
+    state = (STATE[0], STATE[1], (81, 59), (4, 7))
+    packet = pong_codec.encode_delta(2, state, 250, STATE)
+    assert pong_codec.decode_delta(packet, {250: STATE}) == (2, state)
+
+def test_delta_without_base_is_dropped():
+    packet = pong_codec.encode_delta(6, STATE, 5, STATE)
+    assert pong_codec.decode_delta(packet, {}) is None
+
+def test_delta_absent_paddle_and_large_scores():
+    state = (None, (140, 55), (80, 60), (300, 70000))
+    assert pong_codec.decode_delta(pong_codec.encode_delta(9, state), {}) == (9, state)
+
+def test_delta_quantizes_off_field_positions():
+    state = ((-5, 40.7), STATE[1], (9999, 60), STATE[3])
+    _, decoded = pong_codec.decode_delta(pong_codec.encode_delta(1, state), {})
+    assert decoded[0] == (0, 40)
+    assert decoded[2] == (pong_codec.FIELD_WIDTH, 60)
+
+def test_delta_rejects_corruption():
+    packet = bytearray(pong_codec.encode_delta(5, STATE))
+    packet[4] ^= 0x01
+    assert pong_codec.decode_delta(bytes(packet), {}) is None
+    assert pong_codec.decode_delta(pong_codec.encode_delta(5, STATE)[:3], {}) is None
+
+@pytest.mark.parametrize("sequence, reference, distance", [
+    (5, 3, 2), (3, 5, -2), (1, 255, 2), (255, 1, -2), (0, 0, 0), (127, 0, 127), (128, 0, -128)])
+def test_sequence_distance(sequence, reference, distance):
+    assert pong_codec.sequence_distance(sequence, reference) == distance
+
+def test_sequence_newer_across_wrap():
+    assert pong_codec.sequence_newer(0, 255)
+    assert not pong_codec.sequence_newer(255, 0)
+    assert not pong_codec.sequence_newer(7, 7)
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2 ** 32])
+def test_varint_round_trip(value):
+    packet = bytearray()
+    pong_codec.write_varint(packet, value)
+    assert pong_codec.read_varint(packet, 0) == (value, len(packet))
+
+def test_ack_round_trip_and_legacy_ack():
+    assert pong_codec.decode_ack(pong_codec.encode_ack(254, 0b1011)) == (254, 0b1011)
+    assert pong_codec.decode_ack(pong_codec.LEGACY_ACK_STRUCT.pack(pong_codec.ACK, 9)) == (9, None)
+
+def test_receive_window_bits_across_wrap():
+    window = ReceiveWindow()
+    for sequence in (253, 254, 0, 1):
+        window.note(sequence)
+    # Before 1: 0 and 254 arrived, 255 was lost, then 253.
+    assert window.ack_bits(1) == 0b1101
+
+def test_ping_pong_round_trip():
+    assert pong_codec.decode_ping(pong_codec.encode_ping(65535)) == 65535
+    sequence, loss = pong_codec.decode_pong(pong_codec.encode_pong(12, 0.5))
+    assert sequence == 12 and loss == pytest.approx(0.5, abs=1 / 254)
+    assert pong_codec.decode_pong(pong_codec.encode_pong(12)) == (12, None)
+
+def test_session_packets():
+    assert pong_codec.decode_subscribe(pong_codec.encode_subscribe(513)) == 513
+    assert pong_codec.decode_id_response(pong_codec.encode_id_response(1)) == 1
+    assert pong_codec.decode_request_id(pong_codec.encode_request_id(10, 40)) == (ObjectType.PLAYER, 10, 40)
+    assert pong_codec.encode_leave() == bytes((pong_codec.LEAVE,))
+    assert pong_codec.encode_reset() == bytes((pong_codec.RESET,))
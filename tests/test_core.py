@@ -0,0 +1,65 @@
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from pong_core import Ball, Field, ScriptedInput, move_paddle
+
+def paddles_at(field, left_y, right_y):
+    return {0: (field.paddle_width, left_y), 1: (field.width - 2 * field.paddle_width, right_y)}
+
+def test_move_paddle_stays_on_field():
+    field = Field()
+    assert move_paddle(0, True, False, field) == 0
+    bottom = field.height - field.paddle_height
+    assert move_paddle(bottom, False, True, field) == bottom
+    assert move_paddle(40, False, True, field) > 40
+
+def test_scripted_input():
+    keys = ScriptedInput([{1}, set()])
+    assert keys.btnp(1)
+    keys.advance()
+    assert not keys.btnp(1)
+    keys.advance()
+    assert not keys.btnp(1)
+
+def test_goal_resets_ball_towards_the_scorer():
+    field = Field()
+    ball = Ball(field.left_goal, 30, field.ball_size, field)
+    ball.dx = -1
+    assert ball.step({}) == 1
+    assert (ball.x, ball.y, ball.dx) == (*field.center(), 1)
+
+@pytest.mark.parametrize("speed", [2, 6, 13])
+def test_sweep_matches_one_pixel_steps(speed):
+    field = Field()
+    rng = random.Random(speed)
+    fine = Ball(37, 21, field.ball_size, field)
+    swept = Ball(37, 21, field.ball_size, field, speed)
+    left_y = right_y = 40
+    for tick in range(3000):
+        if tick % 10 == 0:
+            left_y = min(max(left_y + rng.choice((-10, 0, 10)), 0), field.height - field.paddle_height)
+            right_y = min(max(right_y + rng.choice((-10, 0, 10)), 0), field.height - field.paddle_height)
+        paddles = paddles_at(field, left_y, right_y)
+        fine_goals = [scorer for scorer in (fine.step(paddles) for _ in range(speed)) if scorer is not None]
+        scorer = swept.sweep(paddles)
+        assert fine_goals == ([] if scorer is None else [scorer])
+        if scorer is None:
+            assert (swept.x, swept.y, swept.dx, swept.dy) == (fine.x, fine.y, fine.dx, fine.dy)
+
+def test_sweep_stops_at_the_first_goal():
+    field = Field()
+    ball = Ball(field.left_goal, 60, field.ball_size, field, 400)
+    ball.dx, ball.dy = -1, 0
+    assert ball.sweep({}) == 1
+    assert (ball.x, ball.y) == field.center()
+    assert ball.carry == 399
+
+def test_headless_core_does_not_load_pyxel():
+    code = "import sys, pong_server, pong_core; print('pyxel' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=root)
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,62 @@
+import pong_codec
+import pong_launcher
+import pong_relay
+import pong_server
+
+WORKERS = [("127.0.0.1", 13001), ("127.0.0.1", 13002), ("127.0.0.1", 13003)]
+
+class SentPackets:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, destination):
+        self.sent.append((bytes(data), destination))
+
+def make_dispatcher():
+    return pong_launcher.Dispatcher("127.0.0.1", 0, WORKERS)
+
+def test_worker_match_ids_are_unique_and_name_their_worker():
+    match_makers = [pong_server.MatchMaker(match_id_offset=index, match_id_stride=len(WORKERS))
+                    for index in range(len(WORKERS))]
+    for index, match_maker in enumerate(match_makers):
+        ids = sorted({match_maker.join((f"10.0.{index}.{client}", 5000))[0].match_id for client in range(6)})
+        assert ids == [index, index + 3, index + 6]
+
+def test_dispatcher_routes_subscribe_by_match_id():
+    dispatcher = make_dispatcher()
+    try:
+        viewer = ("10.0.0.9", 7000)
+        assert dispatcher.route(viewer, 0.0, pong_codec.encode_subscribe(4)) == WORKERS[1]
+        assert dispatcher.route(viewer, 0.0, pong_codec.encode_subscribe(2)) == WORKERS[2]
+        # Subscribers take no seat in the pairing order.
+        assert dispatcher.joined_clients == 0 and viewer not in dispatcher.routes
+    finally:
+        dispatcher.close()
+
+def test_dispatcher_pairs_only_registering_clients():
+    dispatcher = make_dispatcher()
+    try:
+        request = pong_codec.encode_request_id(10, 40)
+        dispatcher.route(("10.0.0.1", 5000), 0.0, pong_codec.encode_stats_request())
+        routes = [dispatcher.route((f"10.0.1.{index}", 5000), 0.0, request) for index in range(4)]
+        assert routes == [WORKERS[0], WORKERS[0], WORKERS[1], WORKERS[1]]
+    finally:
+        dispatcher.close()
+
+def test_relay_accepts_states_from_any_port_of_its_upstream_host():
+    relay = pong_relay.RelayProtocol(("127.0.0.1", 13000), 4)
+    relay.connection_made(SentPackets())
+    viewer = ("127.0.0.1", 7000)
+    relay.datagram_received(pong_codec.encode_subscribe(4), viewer)
+    state = pong_codec.encode_delta(1, ((10, 40), (140, 40), (80, 60), (0, 0)))
+    relay.datagram_received(state, WORKERS[1])
+    relay.datagram_received(state, ("10.0.0.9", 13000))
+    assert relay.transport.sent == [(state, viewer)]
+    assert relay.counters["foreign_states"] == 1
+
+def test_subscriptions_can_be_refused(monkeypatch):
+    monkeypatch.setattr(pong_server, "ACCEPT_SUBSCRIPTIONS", False)
+    match_maker = pong_server.MatchMaker()
+    match, _ = match_maker.join(("10.0.0.1", 5000))
+    pong_server.subscribe(pong_codec.encode_subscribe(match.match_id), ("10.0.0.9", 7000), match_maker)
+    assert match.subscribers == {}
@@ -0,0 +1,91 @@
+import json
+
+import pong_codec
+import pong_server
+from pong_metrics import Histogram, Metrics, RateLimitedLog
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeSocket:
+    """
+    Serves queued datagrams, then raises BlockingIOError like a drained socket.
+    """
+    def __init__(self, datagrams, fail_sends=False):
+        self.datagrams = list(datagrams)
+        self.fail_sends = fail_sends
+        self.sent = []
+
+    def recvfrom(self, size):
+        if not self.datagrams:
+            raise BlockingIOError
+        return self.datagrams.pop(0)
+
+    def sendto(self, data, address):
+        if self.fail_sends:
+            raise OSError("Message too long")
+        self.sent.append((bytes(data), address))
+
+def test_histogram_percentiles():
+    histogram = Histogram(bounds=(1, 2, 4, 8))
+    for value in (0.5, 1.5, 3, 3, 7, 20):
+        histogram.observe(value)
+    summary = histogram.summary()
+    assert (summary["count"], summary["min"], summary["max"]) == (6, 0.5, 20)
+    assert summary["p50"] == 4
+    assert summary["p99"] == 20
+    assert Histogram().summary()["p50"] is None
+
+def test_to_json_omits_the_largest_gauges_first():
+    metrics = Metrics(clock=FakeClock())
+    metrics.counters["packets"] = 3
+    metrics.gauge("small", lambda: 1)
+    metrics.gauge("large", lambda: list(range(1000)))
+    assert "truncated" not in json.loads(metrics.to_json())
+    text = metrics.to_json(500)
+    assert len(text) <= 500
+    snapshot = json.loads(text)
+    assert snapshot["truncated"] is True
+    assert snapshot["gauges"] == {"large": "omitted", "small": 1}
+    assert snapshot["counters"] == {"packets": 3}
+    assert json.loads(metrics.to_json(40)) == {"truncated": True, "uptime": 0.0}
+
+def test_rate_limited_log_reports_suppressed_messages():
+    clock = FakeClock()
+    printed = []
+    log = RateLimitedLog(1.0, clock, printed.append)
+    assert log.log("drop", "dropped %s", 1)
+    assert not log.log("drop", "dropped %s", 2)
+    assert log.log("other", "other")
+    clock.now = 1.0
+    assert log.log("drop", "dropped %s", 3)
+    assert printed == ["dropped 1", "other", "dropped 3 (1 similar suppressed)"]
+
+def test_stats_reply_fits_one_datagram_with_many_clients():
+    match_maker = pong_server.MatchMaker()
+    sink = FakeSocket([])
+    for index in range(2000):
+        pong_server.handle_packet(sink, pong_codec.encode_request_id(10, 40),
+                                  (f"10.0.{index >> 8}.{index & 255}", 5000), match_maker)
+    pong_server.register_gauges(match_maker)
+    server_socket = FakeSocket([])
+    pong_server.send_stats(server_socket, ("127.0.0.1", 9000))
+    (reply, _), = server_socket.sent
+    assert len(reply) <= pong_codec.MAX_DATAGRAM_SIZE
+    links = json.loads(pong_codec.decode_stats_response(reply))["gauges"]["client_links"]
+    assert links["count"] == 2000
+    assert len(links["worst"]) == pong_server.LINK_REPORT_LIMIT
+
+def test_drain_socket_survives_failed_replies():
+    before = pong_server.counters["send_errors"]
+    datagrams = [(pong_codec.encode_request_id(10, 40), ("10.1.0.1", 5000)),
+                 (pong_codec.encode_stats_request(), ("127.0.0.1", 9000)),
+                 (b"", ("10.1.0.2", 5000))]
+    server_socket = FakeSocket(datagrams, fail_sends=True)
+    pong_server.drain_socket(server_socket, pong_server.MatchMaker())
+    assert not server_socket.datagrams
+    assert pong_server.counters["send_errors"] - before == 2
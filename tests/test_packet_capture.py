@@ -0,0 +1,93 @@
+import pytest
+
+import packet_capture
+import pong_codec
+import pong_server
+from pong_global import ObjectType
+
+PLAYERS = [("10.0.0.1", 5000), ("10.0.0.2", 5000)]
+
+class NullSocket:
+    def sendto(self, data, address):
+        return len(data)
+
+def record_session(path, tick_rate, ball_step, ticks=300):
+    """
+    Runs two players through the server logic the way start_server does,
+    recording every datagram and tick run.
+    """
+    recorder = packet_capture.PacketRecorder(str(path), tick_rate=tick_rate, ball_step=ball_step)
+    server_socket = packet_capture.RecordingSocket(NullSocket(), recorder)
+    match_maker = pong_server.MatchMaker(ball_step=ball_step, tick_rate=tick_rate)
+    interval = pong_server.snapshot_interval(tick_rate)
+
+    def receive(data, address):
+        recorder.record(packet_capture.RECORD_IN, address, data)
+        pong_server.handle_packet(server_socket, data, address, match_maker)
+
+    for address in PLAYERS:
+        receive(pong_codec.encode_request_id(10, 40), address)
+    for tick in range(ticks):
+        if tick % 5 == 0:
+            for client_id, address in enumerate(PLAYERS):
+                y_pos = 20 + (tick // 5 * (client_id + 1)) % 60
+                receive(pong_codec.encode_position(ObjectType.PLAYER, client_id, tick // 5 % 256,
+                                                   10 if client_id == 0 else 140, y_pos), address)
+        broadcast = tick % interval == 0
+        recorder.record_ticks(1, broadcast)
+        pong_server.tick_matches(server_socket, match_maker, 1, broadcast)
+    recorder.close()
+    return match_maker
+
+def outbound(records):
+    return [(bytes(data), address) for _, kind, address, data in records if kind == packet_capture.RECORD_OUT]
+
+def test_capture_round_trip(tmp_path):
+    path = tmp_path / "session.cap"
+    record_session(path, 30, 4, ticks=30)
+    settings, records = packet_capture.read_capture(str(path))
+    assert settings == {"tick_rate": 30, "ball_step": 4}
+    kinds = {kind for _, kind, _, _ in records}
+    assert kinds == {packet_capture.RECORD_IN, packet_capture.RECORD_OUT, packet_capture.RECORD_TICK}
+    assert records[0][2] == PLAYERS[0]
+
+def test_replay_reproduces_the_outbound_packets(tmp_path):
+    path = tmp_path / "session.cap"
+    record_session(path, 30, 4)
+    settings, records = packet_capture.read_capture(str(path))
+    replay_socket, _ = packet_capture.replay(records, tick_rate=settings["tick_rate"],
+                                             ball_step=settings["ball_step"])
+    assert packet_capture.output_digest(replay_socket.sent) == packet_capture.output_digest(outbound(records))
+
+def test_replay_with_other_settings_diverges(tmp_path):
+    path = tmp_path / "session.cap"
+    record_session(path, 30, 4)
+    _, records = packet_capture.read_capture(str(path))
+    replay_socket, _ = packet_capture.replay(records)
+    assert packet_capture.output_digest(replay_socket.sent) != packet_capture.output_digest(outbound(records))
+
+def test_truncated_last_record_is_dropped(tmp_path):
+    path = tmp_path / "session.cap"
+    record_session(path, 30, 4, ticks=10)
+    _, records = packet_capture.read_capture(str(path))
+    path.write_bytes(path.read_bytes()[:-1])
+    _, truncated = packet_capture.read_capture(str(path))
+    assert len(truncated) == len(records) - 1
+
+def test_legacy_capture_has_no_settings(tmp_path):
+    path = tmp_path / "legacy.cap"
+    data = pong_codec.encode_leave()
+    path.write_bytes(packet_capture.LEGACY_MAGIC
+                     + packet_capture.RECORD_STRUCT.pack(0.5, packet_capture.RECORD_IN, bytes((10, 0, 0, 1)),
+                                                         5000, len(data))
+                     + data)
+    settings, records = packet_capture.read_capture(str(path))
+    assert settings == {"tick_rate": None, "ball_step": None}
+    assert [(kind, address, bytes(payload)) for _, kind, address, payload in records] == [
+        (packet_capture.RECORD_IN, ("10.0.0.1", 5000), data)]
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.cap"
+    path.write_bytes(b"NOTACAPTURE")
+    with pytest.raises(ValueError):
+        packet_capture.read_capture(str(path))
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from managers import GridPhysicsManager, PhysicsManager
+from pong_core import Field
+
+class Box:
+    """
+    Moving box logging its collisions and border hits into a shared event list.
+    """
+    def __init__(self, name, x, y, width, height, dx, dy, events):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.dx = dx
+        self.dy = dy
+        self.events = events
+
+    def move(self, field):
+        self.x = min(max(self.x + self.dx, 0), field.width - self.width)
+        self.y = min(max(self.y + self.dy, 0), field.height - self.height)
+
+    def on_collide(self, other):
+        self.events.append(("collide", self.name, other.name))
+
+    def on_out_of_bounds(self, vertical):
+        self.events.append(("border", self.name, vertical))
+        if vertical:
+            self.dy = -self.dy
+        else:
+            self.dx = -self.dx
+
+def make_boxes(seed, count, field, events):
+    rng = random.Random(seed)
+    return [Box(index, rng.uniform(0, field.width - 12), rng.uniform(0, field.height - 12),
+                rng.choice((2, 4, 10)), rng.choice((2, 4, 30)),
+                rng.choice((-3, -1, 1, 2)), rng.choice((-2, -1, 1, 3)), events)
+            for index in range(count)]
+
+def run(manager_class, seed, frames=200, count=60):
+    """
+    Moves random boxes for `frames` frames; a third of the way through, more boxes
+    are registered, and two thirds of the way, some are unregistered.
+
+    :return: Events of every frame.
+    """
+    field = Field()
+    events = []
+    manager = manager_class(field=field)
+    boxes = make_boxes(seed, count, field, events)
+    late = make_boxes(seed + 1000, 10, field, events)
+    for box in late:
+        box.name += count
+    for box in boxes:
+        manager.register_object(box)
+    rng = random.Random(seed)
+    frame_events = []
+    for frame in range(frames):
+        if frame == frames // 3:
+            for box in late:
+                manager.register_object(box)
+        if frame == 2 * frames // 3:
+            for box in rng.sample(manager.managed_objects, 15):
+                manager.unregister_object(box)
+        for box in manager.managed_objects:
+            box.move(field)
+        manager.manage()
+        frame_events.append(list(events))
+        events.clear()
+    return frame_events
+
+@pytest.mark.parametrize("seed", range(5))
+def test_grid_reports_the_same_collisions_as_all_pairs(seed):
+    reference = run(PhysicsManager, seed)
+    assert any(event[0] == "collide" for frame in reference for event in frame)
+    assert run(GridPhysicsManager, seed) == reference
+
+def test_unregister_then_manage():
+    manager = GridPhysicsManager()
+    events = []
+    first = Box("a", 10, 10, 4, 4, 0, 0, events)
+    second = Box("b", 12, 12, 4, 4, 0, 0, events)
+    third = Box("c", 13, 13, 4, 4, 0, 0, events)
+    for box in (first, second, third):
+        manager.register_object(box)
+    manager.manage()
+    manager.unregister_object(second)
+    events.clear()
+    manager.manage()
+    assert events == [("collide", "a", "c"), ("collide", "c", "a")]
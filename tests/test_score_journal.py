@@ -0,0 +1,84 @@
+import pytest
+
+from leaderboard import Leaderboard, write_leaderboard
+from score_journal import JOURNAL_HEADER_PREFIX, JOURNAL_SUFFIX, ScoreJournal
+
+def open_leaderboard(path):
+    """
+    Reopens the save the way a restarted game does: snapshot plus journal.
+    """
+    leaderboard = Leaderboard(str(path))
+    journal = ScoreJournal(leaderboard)
+    return leaderboard, journal
+
+def test_scores_survive_a_restart(tmp_path):
+    path = tmp_path / "scores"
+    leaderboard, journal = open_leaderboard(path)
+    journal.record("ann", 3)
+    journal.record("bob", 5)
+    journal.record("ann", 4)
+    journal.close()
+    leaderboard, _ = open_leaderboard(path)
+    assert dict(leaderboard) == {"ann": 4, "bob": 5}
+
+def test_torn_last_line_is_dropped_and_appends_continue(tmp_path):
+    path = tmp_path / "scores"
+    journal_path = tmp_path / f"scores{JOURNAL_SUFFIX}"
+    journal_path.write_text(f"{JOURNAL_HEADER_PREFIX}0\nann:3\nbob:1")
+    leaderboard, journal = open_leaderboard(path)
+    assert dict(leaderboard) == {"ann": 3}
+    journal.record("cid", 2)
+    journal.close()
+    assert journal_path.read_text() == f"{JOURNAL_HEADER_PREFIX}0\nann:3\ncid:2\n"
+    leaderboard, _ = open_leaderboard(path)
+    assert dict(leaderboard) == {"ann": 3, "cid": 2}
+
+def test_stale_journal_is_ignored_after_a_compaction_crash(tmp_path):
+    path = tmp_path / "scores"
+    # The snapshot of generation 2 was written, the journal not yet replaced.
+    write_leaderboard(str(path), [(-7, "ann")], generation=2)
+    journal_path = tmp_path / f"scores{JOURNAL_SUFFIX}"
+    journal_path.write_text(f"{JOURNAL_HEADER_PREFIX}1\nann:1\nbob:9\n")
+    leaderboard, journal = open_leaderboard(path)
+    assert dict(leaderboard) == {"ann": 7}
+    journal.record("bob", 2)
+    journal.close()
+    assert journal_path.read_text() == f"{JOURNAL_HEADER_PREFIX}2\nbob:2\n"
+
+def test_compaction_starts_a_new_generation(tmp_path):
+    path = tmp_path / "scores"
+    leaderboard, journal = open_leaderboard(path)
+    journal.record("ann", 3)
+    journal.request_compaction()
+    journal.close()
+    assert leaderboard.generation == 1
+    assert (tmp_path / f"scores{JOURNAL_SUFFIX}").read_text().startswith(f"{JOURNAL_HEADER_PREFIX}1\n")
+    leaderboard, _ = open_leaderboard(path)
+    assert dict(leaderboard) == {"ann": 3}
+
+def test_scores_recorded_while_loading_are_kept(tmp_path):
+    path = tmp_path / "scores"
+    write_leaderboard(str(path), [(-9, "bob"), (-5, "ann")])
+    leaderboard, journal = open_leaderboard(path)
+    # The writer thread loads the file; the game does not wait for it.
+    journal.record("ann", 6)
+    journal.close()
+    assert dict(leaderboard) == {"ann": 6, "bob": 9}
+    leaderboard, _ = open_leaderboard(path)
+    assert dict(leaderboard) == {"ann": 6, "bob": 9}
+
+def test_reset_before_loading_clears_the_save(tmp_path):
+    path = tmp_path / "scores"
+    write_leaderboard(str(path), [(-9, "bob")])
+    leaderboard, journal = open_leaderboard(path)
+    journal.reset()
+    journal.record("ann", 1)
+    journal.close()
+    leaderboard, _ = open_leaderboard(path)
+    assert dict(leaderboard) == {"ann": 1}
+
+def test_record_rejects_line_breaks(tmp_path):
+    _, journal = open_leaderboard(tmp_path / "scores")
+    with pytest.raises(ValueError):
+        journal.record("ann\nbob:99", 1)
+    journal.close()
@@ -0,0 +1,93 @@
+import pong_codec
+import pong_server
+from pong_global import ObjectType
+
+def address(index):
+    return (f"10.0.0.{index}", 5000)
+
+class SentPackets:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, destination):
+        self.sent.append((bytes(data), destination))
+
+def test_join_pairs_clients_into_matches():
+    match_maker = pong_server.MatchMaker()
+    seats = [match_maker.join(address(index)) for index in range(3)]
+    assert [(match.match_id, client_id) for match, client_id in seats] == [(0, 0), (0, 1), (1, 0)]
+    assert list(match_maker.open_matches) == [1]
+    assert match_maker.lookup(address(1)) is seats[1][0]
+
+def test_leave_frees_the_seat_and_restarts_the_game():
+    match_maker = pong_server.MatchMaker()
+    match, _ = match_maker.join(address(1))
+    match_maker.join(address(2))
+    match.scores = [3, 1]
+    assert match_maker.leave(address(1)) is match
+    assert match_maker.lookup(address(1)) is None
+    assert match.scores == [0, 0]
+    assert match_maker.join(address(3)) == (match, 0)
+    assert match_maker.leave(address(1)) is None
+
+def test_closed_match_id_is_held_then_reused():
+    match_maker = pong_server.MatchMaker(tick_rate=10)
+    match, _ = match_maker.join(address(1))
+    match_maker.leave(address(1))
+    assert match_maker.matches == {}
+    # Held for SUBSCRIPTION_TIMEOUT: a new match gets a fresh ID.
+    assert match_maker.join(address(2))[0].match_id == 1
+    match_maker.join(address(3))
+    match_maker.tick_count = match_maker.match_id_hold
+    assert match_maker.join(address(4))[0].match_id == 0
+
+def test_subscriptions_keep_a_closed_match_id_held():
+    match_maker = pong_server.MatchMaker(tick_rate=10)
+    match_maker.join(address(1))
+    match_maker.leave(address(1))
+    relay = ("127.0.0.1", 7000)
+    for tick in range(0, 3 * match_maker.match_id_hold, 10):
+        match_maker.tick_count = tick
+        pong_server.subscribe(pong_codec.encode_subscribe(0), relay, match_maker)
+        match, _ = match_maker.join(address(100 + tick))
+        assert match.match_id != 0
+        match_maker.leave(address(100 + tick))
+    match_maker.tick_count += match_maker.match_id_hold
+    assert match_maker.join(address(2))[0].match_id == 0
+
+def test_evict_idle_removes_silent_clients():
+    match_maker = pong_server.MatchMaker(tick_rate=10)
+    sent = SentPackets()
+    for index in (1, 2, 3):
+        pong_server.handle_packet(sent, pong_codec.encode_request_id(10, 40), address(index), match_maker)
+    match_maker.tick_count = match_maker.client_timeout
+    pong_server.handle_packet(sent, pong_codec.encode_ping(1), address(2), match_maker)
+    match_maker.tick_count += 1
+    assert match_maker.evict_idle() == 2
+    assert set(match_maker.client_matches) == {address(2)}
+    assert list(match_maker.matches) == [0]
+
+def test_session_table_is_bounded(monkeypatch):
+    monkeypatch.setattr(pong_server, "MAX_SESSIONS", 2)
+    match_maker = pong_server.MatchMaker()
+    assert match_maker.join(address(1)) is not None
+    assert match_maker.join(address(2)) is not None
+    assert match_maker.join(address(3)) is None
+
+def test_leave_packet_ends_the_session():
+    match_maker = pong_server.MatchMaker()
+    sent = SentPackets()
+    pong_server.handle_packet(sent, pong_codec.encode_request_id(10, 40), address(1), match_maker)
+    pong_server.handle_packet(sent, pong_codec.encode_leave(), address(1), match_maker)
+    assert match_maker.client_matches == {}
+    # A second LEAVE from the now unknown address is ignored.
+    pong_server.handle_packet(sent, pong_codec.encode_leave(), address(1), match_maker)
+    assert sent.sent == [(pong_codec.encode_id_response(0), address(1))]
+
+def test_unknown_session_packets_are_answered_with_reset():
+    match_maker = pong_server.MatchMaker()
+    sent = SentPackets()
+    position = pong_codec.encode_position(ObjectType.PLAYER, 0, 1, 10, 40)
+    pong_server.handle_packet(sent, position, address(1), match_maker)
+    assert sent.sent == [(pong_codec.encode_reset(), address(1))]
+    assert match_maker.client_matches == {}
@@ -0,0 +1,72 @@
+import pytest
+
+from snapshot_buffer import SnapshotBuffer
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def buffer(clock):
+    return SnapshotBuffer(depth=8, render_delay=0.1, max_extrapolation=0.2, clock=clock)
+
+def push_at(buffer, clock, timestamp, x_pos, y_pos=0):
+    clock.now = timestamp
+    buffer.push("ball", x_pos, y_pos)
+
+def sample_at(buffer, clock, now):
+    clock.now = now
+    return buffer.sample()["ball"]
+
+def test_interpolates_between_surrounding_samples(buffer, clock):
+    push_at(buffer, clock, 1.0, 0, 0)
+    push_at(buffer, clock, 1.1, 10, 20)
+    push_at(buffer, clock, 1.2, 20, 20)
+    # Rendered 0.1 s in the past: a quarter of the way from the first sample to the second.
+    assert sample_at(buffer, clock, 1.125) == pytest.approx((2.5, 5))
+    assert sample_at(buffer, clock, 1.25) == pytest.approx((15, 20))
+    assert sample_at(buffer, clock, 1.3) == pytest.approx((20, 20))
+
+def test_older_than_the_buffer_shows_the_oldest_sample(buffer, clock):
+    push_at(buffer, clock, 1.0, 5, 5)
+    push_at(buffer, clock, 1.1, 10, 5)
+    assert sample_at(buffer, clock, 1.05) == (5, 5)
+
+def test_underrun_extrapolates_the_last_motion(buffer, clock):
+    push_at(buffer, clock, 1.0, 0)
+    push_at(buffer, clock, 1.1, 10)
+    # Samples stopped: 0.05 s past the newest one, it keeps moving at 100 px/s.
+    assert sample_at(buffer, clock, 1.25) == pytest.approx((15, 0))
+
+def test_extrapolation_is_capped(buffer, clock):
+    push_at(buffer, clock, 1.0, 0)
+    push_at(buffer, clock, 1.1, 10)
+    capped = sample_at(buffer, clock, 1.4)
+    assert capped == pytest.approx((30, 0))
+    # Past the cap the position is held instead of running off.
+    assert sample_at(buffer, clock, 5.0) == pytest.approx(capped)
+
+def test_underrun_with_one_sample_holds_it(buffer, clock):
+    push_at(buffer, clock, 1.0, 7, 9)
+    assert sample_at(buffer, clock, 3.0) == (7, 9)
+
+def test_jumps_are_not_interpolated(buffer, clock):
+    push_at(buffer, clock, 1.0, 0)
+    push_at(buffer, clock, 1.1, 100)
+    # A goal reset: the old position until the new sample, no sweep and no extrapolation.
+    assert sample_at(buffer, clock, 1.15) == (0, 0)
+    assert sample_at(buffer, clock, 1.5) == (100, 0)
+
+def test_depth_bounds_each_track(buffer, clock):
+    for step in range(20):
+        push_at(buffer, clock, step * 0.1, step)
+    assert len(buffer.tracks["ball"]) == 8
+    buffer.remove("ball")
+    assert buffer.sample() == {}
@@ -0,0 +1,50 @@
+import time
+
+class TickScheduler:
+    """
+    Fixed-timestep scheduler for the authoritative server simulation.
+    Tells the caller how long it may wait for network input and how many
+    simulation steps are due, independently of how often packets arrive.
+    """
+    def __init__(self, tick_rate=60, max_catch_up_ticks=5, clock=time.monotonic):
+        self.tick_rate = tick_rate
+        self.tick_interval = 1.0 / tick_rate
+        # Maximum number of steps run back-to-back after a stall.
+        self.max_catch_up_ticks = max_catch_up_ticks
+        self.clock = clock
+        self.next_tick_time = clock() + self.tick_interval
+        self.tick_count = 0
+        self.skipped_ticks = 0
+
+    def time_until_next_tick(self):
+        """
+        Returns the seconds left before the next tick is due (never negative).
+        """
+        return max(0.0, self.next_tick_time - self.clock())
+
+    def due_ticks(self):
+        """
+        Returns how many simulation steps should run now.
+        When the loop has fallen further behind than `max_catch_up_ticks`,
+        the surplus ticks are dropped so the server never spirals.
+        """
+        now = self.clock()
+        if now < self.next_tick_time:
+            return 0
+        due = int((now - self.next_tick_time) / self.tick_interval) + 1
+        if due > self.max_catch_up_ticks:
+            self.skipped_ticks += due - self.max_catch_up_ticks
+            due = self.max_catch_up_ticks
+            # Re-anchor the schedule instead of trying to replay the stall.
+            self.next_tick_time = now + self.tick_interval
+        else:
+            self.next_tick_time += due * self.tick_interval
+        self.tick_count += due
+        return due
+
+    def interval_elapsed(self, ticks, interval):
+        """
+        Returns True when the last `ticks` steps crossed a multiple of `interval`
+        ticks, e.g. to send snapshots at a fraction of the tick rate.
+        """
+        return self.tick_count // interval != (self.tick_count - ticks) // interval